@@ -0,0 +1,377 @@
+"""
+Ähnliche Rezepte aus vorberechneten Zutatenvektoren.
+
+Jedes Rezept ist ein dünn besetzter Vektor über seine Zutaten, gewichtet mit
+TF-IDF: tf ist 1 (Mengen in verschiedenen Einheiten sind nicht vergleichbar),
+idf = ln((1 + N) / (1 + df)) + 1, d.h. Salz und Zwiebeln zählen wenig,
+seltene Zutaten viel. Die Vektoren sind L2-normiert, das Skalarprodukt zweier
+Rezepte ist also ihre Kosinus-Ähnlichkeit.
+
+Die Matrix liegt zweimal in NumPy-Arrays: als CSR (pro Rezept seine Zutaten)
+und als CSC (pro Zutat ihre Rezepte). Das Produkt eines Blocks von Rezepten
+mit allen Rezepten ist ein Gather über die CSC-Spalten ihrer Zutaten und ein
+``bincount`` in eine dichte Block-Matrix; für die besten k pro Zeile wird
+nur sortiert, was über einer aus Stichproben geschätzten Schwelle liegt.
+Die Blockgröße begrenzt BLOCK_WERTE.
+
+Das Ergebnis steht in ``aehnliches_rezept`` (Primärschlüssel rezept_id,
+aehnlich_id): Nachschlagen ist ein einziger Lesezugriff über den Index.
+
+Trigger auf ``rezept_zutat`` merken jedes Rezept, dessen Zutaten sich
+ändern, in ``aehnlichkeit_offen`` vor (mit Zähler, damit eine Änderung
+während der Berechnung nicht verloren geht). compute_pending() rechnet nur
+diese Rezepte neu: ihre eigene Liste und ihren Platz in den Listen der
+übrigen Rezepte; eine fremde Liste wird nur dann ganz neu berechnet, wenn ein
+geändertes Rezept darin abgerutscht oder verschwunden ist. Die idf-Gewichte
+der übrigen Listen bleiben dabei auf dem Stand ihrer letzten Berechnung. Sind
+viele Rezepte offen (ANTEIL_VOLL) oder ist die Tabelle leer, wird alles neu
+berechnet.
+
+Rechnen und Speichern sind getrennt (compute_* liest, store() schreibt in
+einer kurzen Transaktion), damit die Schreibsperre nicht während der
+Berechnung gehalten wird. NumPy wird nur zum Rechnen gebraucht und erst dann
+importiert. Das Modul kennt die Flask-App nicht.
+"""
+
+import itertools
+import math
+from collections import namedtuple
+
+from sqlalchemy import text
+
+import nachladen
+
+np = None  # set by load_numpy()
+
+# Höchstzahl an Werten der dichten Ähnlichkeitsmatrix eines Blocks (Zeilen x Rezepte, float64)
+BLOCK_WERTE = 1 << 22
+# Ab diesem Anteil offener Rezepte rechnet compute_pending() alles neu
+ANTEIL_VOLL = 0.05
+# Zeilen pro executemany beim Speichern
+SCHREIB_BLOCK = 50000
+
+Aehnlich = namedtuple('Aehnlich', ['id', 'name', 'score'])
+
+# voll: alle Listen ersetzen; ersetzt: rezept_ids, deren Listen ersetzt werden;
+# paare: (rezept_ids, aehnlich_ids, scores) als Arrays; einfuegen: [(rezept_id, aehnlich_id, score)]
+# in fremde Listen; offen: [(rezept_id, stand)] der berechneten Vormerkungen
+Ergebnis = namedtuple('Ergebnis', ['voll', 'ersetzt', 'paare', 'einfuegen', 'offen', 'k'])
+
+
+def load_numpy():
+    """Returns the numpy module, imported on the first call, or None if it is not installed."""
+    global np
+    np = nachladen.optional_import('numpy')
+    return np
+
+
+def is_available():
+    return load_numpy() is not None
+
+
+def _pointers(indizes, anzahl):
+    """CSR/CSC pointer array for sorted group indices 0..anzahl-1."""
+    pointer = np.zeros(anzahl + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indizes, minlength=anzahl), out=pointer[1:])
+    return pointer
+
+
+def _ranges(starts, laengen):
+    """Concatenation of range(start, start + laenge) for all pairs, vectorised."""
+    enden = np.cumsum(laengen)
+    return np.arange(int(enden[-1]) if len(enden) else 0) - np.repeat(enden - laengen - starts, laengen)
+
+
+class Vektoren:
+    """TF-IDF vectors of all recipes that have ingredients, as CSR and CSC arrays."""
+
+    def __init__(self, rezept_ids, zutat_ids):
+        """From parallel int arrays of distinct (rezept_id, zutat_id) pairs in any order."""
+        self.ids, zeilen = np.unique(rezept_ids, return_inverse=True)
+        _, spalten = np.unique(zutat_ids, return_inverse=True)
+        n = len(self.ids)
+        df = np.bincount(spalten)
+        gewichte = (np.log((1 + n) / (1 + df)) + 1)[spalten]
+        werte = gewichte / np.sqrt(np.bincount(zeilen, weights=gewichte * gewichte, minlength=n))[zeilen]
+
+        order = np.argsort(zeilen, kind='stable')
+        self.zeilen_pointer = _pointers(zeilen, n)
+        self.zeilen_spalten = spalten[order]
+        self.zeilen_werte = werte[order]
+        order = np.argsort(spalten, kind='stable')
+        self.spalten_pointer = _pointers(spalten, len(df))
+        self.spalten_zeilen = zeilen[order]
+        self.spalten_werte = werte[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_of(self, rezept_ids):
+        """Row indices of the given recipe ids; recipes without vector are left out."""
+        rezept_ids = np.asarray(rezept_ids, dtype=np.int64)
+        zeilen = np.searchsorted(self.ids, rezept_ids)
+        gefunden = zeilen < len(self.ids)
+        gefunden[gefunden] = self.ids[zeilen[gefunden]] == rezept_ids[gefunden]
+        return zeilen[gefunden]
+
+    def block_size(self):
+        return max(1, min(len(self.ids), BLOCK_WERTE // max(len(self.ids), 1)))
+
+    def scores(self, zeilen):
+        """Similarity of the given rows with all rows as a dense (len(zeilen), n) array; 0 on the diagonal."""
+        n = len(self.ids)
+        starts = self.zeilen_pointer[zeilen]
+        laengen = self.zeilen_pointer[zeilen + 1] - starts
+        eintraege = _ranges(starts, laengen)
+        spalten = self.zeilen_spalten[eintraege]
+        spalten_starts = self.spalten_pointer[spalten]
+        spalten_laengen = self.spalten_pointer[spalten + 1] - spalten_starts
+        treffer = _ranges(spalten_starts, spalten_laengen)
+        ziel = np.repeat(np.repeat(np.arange(len(zeilen)) * n, laengen), spalten_laengen)
+        ziel += self.spalten_zeilen[treffer]
+        produkte = np.repeat(self.zeilen_werte[eintraege], spalten_laengen) * self.spalten_werte[treffer]
+        matrix = np.bincount(ziel, weights=produkte, minlength=len(zeilen) * n).reshape(len(zeilen), n)
+        matrix[np.arange(len(zeilen)), zeilen] = 0.0
+        return matrix
+
+    def top_k(self, matrix, k):
+        """
+        The k best columns with a score > 0 per row of a scores() block as flat
+        arrays (row in the block, column, score), by row and best first; ties go
+        to the lower column. Only entries at or above a lower bound of the k-th
+        best score are sorted: the k-th best of every schritt-th column.
+        """
+        n = matrix.shape[1]
+        schritt = max(1, int(math.sqrt(n / max(k, 1)) / 2))
+        probe = matrix[:, ::schritt]
+        if probe.shape[1] >= k > 0:
+            schwelle = np.partition(probe, probe.shape[1] - k, axis=1)[:, probe.shape[1] - k]
+        else:
+            schwelle = np.zeros(len(matrix))
+        # Zero scores (nothing in common) are never a result
+        kandidaten = np.flatnonzero(matrix >= np.maximum(schwelle, np.finfo(float).tiny)[:, None])
+        zeile, spalte = np.divmod(kandidaten, n)
+        werte = matrix.ravel()[kandidaten]
+        # Scores are at most 1, so row * 2 + (1 - score) orders by row, then best first;
+        # the stable sort keeps the column order of equal scores
+        order = np.argsort(zeile * 2.0 + (1.0 - werte), kind='stable')
+        zeile, spalte, werte = zeile[order], spalte[order], werte[order]
+        behalten = np.arange(len(zeile)) - np.searchsorted(zeile, zeile) < k
+        return zeile[behalten], spalte[behalten], werte[behalten]
+
+    def pairs(self, zeilen, lokal, spalten, werte):
+        """(rezept_ids, aehnlich_ids, scores) arrays of a top_k() result for the block of the given rows."""
+        return self.ids[zeilen[lokal]], self.ids[spalten], werte
+
+
+def load_vectors(connection):
+    """The vectors of all recipes from rezept_zutat, or None if there are no ingredients."""
+    load_numpy()
+    # Straight from the sqlite3 cursor: SQLAlchemy's Row objects cost twice the time for millions of pairs
+    cursor = connection.connection.driver_connection.cursor()
+    try:
+        rows = cursor.execute('SELECT rezept_id, zutat_id FROM rezept_zutat').fetchall()
+    finally:
+        cursor.close()
+    if not rows:
+        return None
+    paare = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+    return Vektoren(paare[:, 0], paare[:, 1])
+
+
+def _pending(connection):
+    return connection.execute(text('SELECT rezept_id, stand FROM aehnlichkeit_offen ORDER BY rezept_id')).all()
+
+
+def _concat(teile):
+    if not teile:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return tuple(np.concatenate(spalte) for spalte in zip(*teile))
+
+
+def compute_all(connection, k, vektoren=None, offen=None):
+    """The k most similar recipes of every recipe (Ergebnis replacing all lists)."""
+    offen = _pending(connection) if offen is None else offen
+    vektoren = load_vectors(connection) if vektoren is None else vektoren
+    teile = []
+    if vektoren is not None:
+        block = vektoren.block_size()
+        for start in range(0, len(vektoren), block):
+            zeilen = np.arange(start, min(start + block, len(vektoren)))
+            teile.append(vektoren.pairs(zeilen, *vektoren.top_k(vektoren.scores(zeilen), k)))
+    return Ergebnis(True, [], _concat(teile), [], offen, k)
+
+
+def compute_pending(connection, k):
+    """
+    Recomputes the recipes marked in aehnlichkeit_offen and the lists of other
+    recipes they enter or leave. Returns an Ergebnis, or None if nothing is pending.
+    """
+    offen = _pending(connection)
+    if not offen:
+        return None
+    vektoren = load_vectors(connection)
+    if vektoren is None or len(offen) > ANTEIL_VOLL * len(vektoren) or not connection.execute(
+        text('SELECT EXISTS (SELECT 1 FROM aehnliches_rezept)')
+    ).scalar():
+        return compute_all(connection, k, vektoren, offen)
+
+    geaendert = {rezept_id for rezept_id, _ in offen}
+    n = len(vektoren)
+    # Smallest stored score and list length per recipe (row order of the vectors)
+    minimum = np.zeros(n)
+    laenge = np.zeros(n, dtype=np.int64)
+    rows = connection.execute(text(
+        'SELECT rezept_id, MIN(score), COUNT(*) FROM aehnliches_rezept GROUP BY rezept_id'
+    )).all()
+    if rows:
+        ids, minima, laengen = (np.array(spalte) for spalte in zip(*rows))
+        gespeichert = np.isin(ids, vektoren.ids)
+        zeilen = np.searchsorted(vektoren.ids, ids[gespeichert])
+        minimum[zeilen] = minima[gespeichert]
+        laenge[zeilen] = laengen[gespeichert]
+    # Lists of other recipes that contain a changed recipe: {geaendert_id: [(rezept_id, score)]}
+    enthalten = {}
+    for rezept_id, aehnlich_id, score in connection.execute(text("""
+        SELECT rezept_id, aehnlich_id, score FROM aehnliches_rezept
+        WHERE aehnlich_id IN (SELECT rezept_id FROM aehnlichkeit_offen)
+    """)):
+        if rezept_id not in geaendert:
+            enthalten.setdefault(aehnlich_id, []).append((rezept_id, score))
+
+    neu_berechnen = set()
+    einfuegen = {}
+    teile = []
+    zeilen_geaendert = vektoren.rows_of(sorted(geaendert))
+    # Changed recipes without ingredients (or deleted) leave every list they were in
+    for rezept_id in geaendert.difference(vektoren.ids[zeilen_geaendert].tolist()):
+        neu_berechnen.update(andere for andere, _ in enthalten.get(rezept_id, ()))
+    block = vektoren.block_size()
+    for start in range(0, len(zeilen_geaendert), block):
+        zeilen = zeilen_geaendert[start:start + block]
+        matrix = vektoren.scores(zeilen)
+        teile.append(vektoren.pairs(zeilen, *vektoren.top_k(matrix, k)))
+        for zeile, scores in zip(zeilen.tolist(), matrix):
+            rezept_id = int(vektoren.ids[zeile])
+            drin = {}
+            for andere, alt in enthalten.get(rezept_id, ()):
+                drin[andere] = alt
+            kandidaten = np.flatnonzero((scores > 0) & ((scores > minimum) | (laenge < k)))
+            for andere, score in zip(vektoren.ids[kandidaten].tolist(), scores[kandidaten].tolist()):
+                if andere not in geaendert and andere not in drin:
+                    einfuegen[andere, rezept_id] = score
+            for andere, alt in drin.items():
+                zeile_andere = vektoren.rows_of([andere])
+                neu = float(scores[zeile_andere[0]]) if len(zeile_andere) else 0.0
+                if neu >= alt:
+                    einfuegen[andere, rezept_id] = neu
+                else:
+                    # Slipped down: an unstored recipe may now rank higher
+                    neu_berechnen.add(andere)
+
+    zeilen_neu = vektoren.rows_of(sorted(neu_berechnen))
+    for start in range(0, len(zeilen_neu), block):
+        zeilen = zeilen_neu[start:start + block]
+        teile.append(vektoren.pairs(zeilen, *vektoren.top_k(vektoren.scores(zeilen), k)))
+    return Ergebnis(
+        False,
+        sorted(geaendert | neu_berechnen),
+        _concat(teile),
+        [(andere, rezept_id, score) for (andere, rezept_id), score in einfuegen.items()
+         if andere not in neu_berechnen],
+        offen,
+        k
+    )
+
+
+def store(connection, ergebnis):
+    """Writes an Ergebnis and clears the pending marks it covered. Returns the number of stored pairs."""
+    if ergebnis.voll:
+        connection.execute(text('DELETE FROM aehnliches_rezept'))
+    elif ergebnis.ersetzt:
+        connection.exec_driver_sql(
+            'DELETE FROM aehnliches_rezept WHERE rezept_id = ?', [(rezept_id,) for rezept_id in ergebnis.ersetzt]
+        )
+    von, aehnlich, scores = ergebnis.paare
+    for start in range(0, len(von), SCHREIB_BLOCK):
+        ende = start + SCHREIB_BLOCK
+        connection.exec_driver_sql(
+            'INSERT INTO aehnliches_rezept (rezept_id, aehnlich_id, score) VALUES (?, ?, ?)',
+            list(zip(von[start:ende].tolist(), aehnlich[start:ende].tolist(), scores[start:ende].tolist()))
+        )
+    if ergebnis.einfuegen:
+        connection.exec_driver_sql("""
+            INSERT INTO aehnliches_rezept (rezept_id, aehnlich_id, score) VALUES (?, ?, ?)
+            ON CONFLICT (rezept_id, aehnlich_id) DO UPDATE SET score = excluded.score
+        """, ergebnis.einfuegen)
+        # Keep the k best per list
+        connection.exec_driver_sql("""
+            DELETE FROM aehnliches_rezept WHERE rezept_id = ?1 AND aehnlich_id NOT IN (
+                SELECT aehnlich_id FROM aehnliches_rezept WHERE rezept_id = ?1
+                ORDER BY score DESC, aehnlich_id LIMIT ?2
+            )
+        """, [(rezept_id, ergebnis.k) for rezept_id in sorted({row[0] for row in ergebnis.einfuegen})])
+    if ergebnis.offen:
+        connection.exec_driver_sql(
+            'DELETE FROM aehnlichkeit_offen WHERE rezept_id = ? AND stand = ?', [tuple(row) for row in ergebnis.offen]
+        )
+    return len(von) + len(ergebnis.einfuegen)
+
+
+def similar(connection, rezept_id, limit):
+    """The most similar recipes of a recipe, best first, as Aehnlich tuples."""
+    return [Aehnlich(*row) for row in connection.execute(text("""
+        SELECT r.id, r.name, a.score
+        FROM aehnliches_rezept a JOIN rezept r ON r.id = a.aehnlich_id
+        WHERE a.rezept_id = :id
+        ORDER BY a.score DESC, a.aehnlich_id
+        LIMIT :limit
+    """), {'id': rezept_id, 'limit': limit})]
+
+
+def _vormerken(zeile):
+    return f"""
+        INSERT INTO aehnlichkeit_offen (rezept_id, stand) VALUES ({zeile}.rezept_id, 1)
+        ON CONFLICT (rezept_id) DO UPDATE SET stand = stand + 1;
+    """
+
+
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_zutat_aehnlichkeit_ai AFTER INSERT ON rezept_zutat BEGIN
+        {_vormerken('new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_zutat_aehnlichkeit_ad AFTER DELETE ON rezept_zutat BEGIN
+        {_vormerken('old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_zutat_aehnlichkeit_au
+    AFTER UPDATE OF rezept_id, zutat_id ON rezept_zutat BEGIN
+        {_vormerken('old')}
+        {_vormerken('new')}
+    END
+    """,
+]
+
+
+def install(connection):
+    """
+    Creates the marking triggers if they do not exist yet. If nothing has been
+    computed yet, marks all recipes with ingredients as pending.
+    Returns True if there are pending recipes and nothing computed yet, i.e.
+    the first computation still has to run.
+    """
+    for trigger in _TRIGGERS:
+        connection.execute(text(trigger))
+    connection.execute(text("""
+        INSERT INTO aehnlichkeit_offen (rezept_id, stand)
+        SELECT DISTINCT rezept_id, 1 FROM rezept_zutat
+        WHERE NOT EXISTS (SELECT 1 FROM aehnliches_rezept)
+        ON CONFLICT (rezept_id) DO NOTHING
+    """))
+    return bool(connection.execute(text(
+        'SELECT EXISTS (SELECT 1 FROM aehnlichkeit_offen) AND NOT EXISTS (SELECT 1 FROM aehnliches_rezept)'
+    )).scalar())
@@ -3,27 +3,49 @@
 Flask-Anwendung zur Verwaltung von Rezepten und Einkaufslisten.
 """
 
+import io
 import os
-import uuid
+import json
+import base64
+import time
+import hashlib
 import datetime
-from collections import defaultdict
+import binascii
+import functools
+import threading
 
 # Third-party imports
+import click
 from flask import (
     Flask, render_template, request, redirect, url_for,
-    abort, flash, session # Session hinzugefügt für potenzielle spätere Nutzung
+    abort, flash, session, # Session hinzugefügt für potenzielle spätere Nutzung
+    jsonify, send_from_directory, g, make_response, get_template_attribute,
+    stream_with_context, has_request_context
 )
 from flask_sqlalchemy import SQLAlchemy
-from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed # FileRequired entfernt, da optional
-from wtforms import (
-    StringField, TextAreaField, IntegerField, SubmitField,
-    FloatField, SelectField
-)
-from wtforms.validators import DataRequired, Optional, Length
 from werkzeug.utils import secure_filename
+from sqlalchemy import tuple_
 from sqlalchemy.orm import joinedload
 
+# Local imports
+import aehnlichkeit
+import auftraege
+import ausgabe
+import austausch
+import bilder
+import datenbank
+import einheiten
+import einkaufsliste
+import kategorien
+import messung
+import schnittstelle
+import seitencache
+import suche
+import wochenplan
+import zutatnamen
+import zutatenvorschlag
+from zutaten_index import ZutatenIndex, ADD, REMOVE
+
 # --- Application Setup ---
 basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__)
@@ -36,65 +58,152 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
     'sqlite:///' + os.path.join(basedir, 'rezepte.db') # Lokaler Fallback
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite-Betrieb (siehe datenbank.py): Profil 'produktion' (WAL, busy_timeout, ...) oder 'standard'
+app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'produktion')
+# Einzelne PRAGMAs überschreiben, z.B. "cache_size=-32000,mmap_size=0"
+app.config['SQLITE_PRAGMAS'] = datenbank.parse_pragmas(os.environ.get('SQLITE_PRAGMAS'))
+# Verbindungspool: 'threads' (ein Prozess, viele Threads) oder 'prozesse' (z.B. gunicorn sync workers)
+app.config['DB_POOL_MODE'] = os.environ.get('DB_POOL_MODE', 'threads')
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = datenbank.engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'],
+    pool_mode=app.config['DB_POOL_MODE'],
+    pool_size=app.config['DB_POOL_SIZE']
+)
 
 # Upload Configuration
-UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+# Außerhalb von static/: Bilder gibt es nur über /bilder (nur fertige, inhaltsadressierte Dateien)
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(app.instance_path, 'uploads'))
+# Ablage älterer Versionen; init-db verschiebt die Bilder von dort nach UPLOAD_FOLDER
+LEGACY_UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
+ALLOWED_EXTENSIONS = bilder.ERLAUBTE_ENDUNGEN
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Bild-URLs sind inhaltsadressiert und ändern sich nie -> ein Jahr cachebar
+app.config['IMAGE_MAX_AGE'] = int(os.environ.get('IMAGE_MAX_AGE', 365 * 24 * 3600))
 # Optional: Maximale Dateigröße (z.B. 16MB)
 # app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
-# Ensure upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True) # exist_ok=True verhindert Fehler, wenn Ordner schon da ist
+# Pagination der Rezeptübersicht (Keyset-Pagination über (name, id))
+app.config['INDEX_PAGE_SIZE'] = int(os.environ.get('INDEX_PAGE_SIZE', 50))
+app.config['INDEX_MAX_PAGE_SIZE'] = int(os.environ.get('INDEX_MAX_PAGE_SIZE', 200))
+# Trefferanzahl pro Seite der Volltextsuche
+app.config['SEARCH_PAGE_SIZE'] = int(os.environ.get('SEARCH_PAGE_SIZE', 20))
+# Cache für gerenderte Seitenteile: 'speicher' (im Prozess), 'geteilt' oder 'aus'
+app.config['PAGE_CACHE_BACKEND'] = os.environ.get('PAGE_CACHE_BACKEND', 'speicher')
+# Für 'geteilt': redis://... oder Pfad einer SQLite-Datei als lokaler Ersatz
+app.config['PAGE_CACHE_URL'] = os.environ.get('PAGE_CACHE_URL', os.path.join(basedir, 'seitencache.db'))
+app.config['PAGE_CACHE_MAX_BYTES'] = int(os.environ.get('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+app.config['PAGE_CACHE_TTL'] = int(os.environ.get('PAGE_CACHE_TTL', 24 * 3600))
+# Messung pro Request (SQL, Rendern, Handler) mit /metrics und Server-Timing; aus = ohne Overhead
+app.config['PROFILING'] = os.environ.get('PROFILING', '0').lower() in ('1', 'true', 'ja')
+# Ab so vielen Ausführungen desselben Statements in einem Request wird ein N+1-Muster gemeldet
+app.config['PROFILING_N_PLUS_1'] = int(os.environ.get('PROFILING_N_PLUS_1', 5))
+
+# Einkaufsliste als CSV/Text/PDF (/einkaufsliste/export.<art>): Höchstzahl an Rezepten pro Auswahl
+app.config['SHOPPING_LIST_MAX_IDS'] = int(os.environ.get('SHOPPING_LIST_MAX_IDS', 5000))
+
+# JSON-API v1: Höchstzahl an Datensätzen pro ?ids=
+app.config['API_MAX_IDS'] = int(os.environ.get('API_MAX_IDS', 100))
+
+# Hintergrundaufträge (flask rezepte worker, siehe auftraege.py): gleichzeitige Aufträge pro Worker
+app.config['JOB_WORKER_THREADS'] = int(os.environ.get('JOB_WORKER_THREADS', 4))
+# Versuche pro Auftrag, danach bleibt er als 'fehlgeschlagen' liegen
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+# Sekunden, nach denen ein laufender Auftrag als verwaist gilt und erneut vergeben wird
+app.config['JOB_LOCK_SECONDS'] = int(os.environ.get('JOB_LOCK_SECONDS', 300))
+
+# "Ähnliche Rezepte" auf der Detailseite (siehe aehnlichkeit.py): gespeicherte Nachbarn pro Rezept
+app.config['SIMILAR_RECIPES'] = int(os.environ.get('SIMILAR_RECIPES', 8))
+# Sekunden, die der Neuberechnungs-Auftrag nach einer Zutatenänderung wartet (sammelt Folgeänderungen)
+app.config['SIMILAR_RECIPES_DELAY'] = int(os.environ.get('SIMILAR_RECIPES_DELAY', 5))
+
+# ASGI-Betrieb (uvicorn asgi:anwendung, siehe asgi.py): Pool des asynchronen SQLite-Treibers
+app.config['ASGI_DB_POOL_SIZE'] = int(os.environ.get('ASGI_DB_POOL_SIZE', 10))
+# Threads für alle übrigen (synchronen) Routen im ASGI-Betrieb
+app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 8))
+# Request-Bodies bis zu dieser Größe bleiben im Speicher, größere werden in eine temporäre Datei gestreamt
+app.config['ASGI_SPOOL_BYTES'] = int(os.environ.get('ASGI_SPOOL_BYTES', 1024 * 1024))
 
 # --- Database Setup ---
 db = SQLAlchemy(app)
 
+def is_write_request():
+    """True inside a request that is about to write (its transactions take the write lock up front)."""
+    return has_request_context() and g.get('schreibsperre', False)
+
+def writes(view):
+    """
+    Marks a view that writes: its POST transactions take the write lock with
+    the first statement (BEGIN IMMEDIATE). Read-only POSTs (forms that only
+    compute something) stay unmarked and never block other writers.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            g.schreibsperre = True
+        return view(*args, **kwargs)
+    return wrapper
+
+def begin_write():
+    """
+    Ends the request's read transaction; from here on its transactions take
+    the write lock up front. For views that read and validate first and do
+    slow work (storing an upload) before their writes: call it before that work.
+    """
+    db.session.rollback()
+    g.schreibsperre = True
+
+with app.app_context():
+    datenbank.install(
+        db.engine,
+        datenbank.get_profil(app.config['SQLITE_PROFILE'], app.config['SQLITE_PRAGMAS']),
+        wants_write_lock=is_write_request
+    )
+
+# Per-request profiling (see messung.py); nothing is registered when it is off
+profiler = None
+if app.config['PROFILING']:
+    profiler = messung.Profiler(n_plus_1=app.config['PROFILING_N_PLUS_1'])
+    with app.app_context():
+        profiler.install(app, db.engine)
+
+# Rendered page fragments, keyed by data version (see seitencache.py)
+seiten_cache = seitencache.SeitenCache(seitencache.create_backend(
+    app.config['PAGE_CACHE_BACKEND'],
+    url=app.config['PAGE_CACHE_URL'],
+    max_bytes=app.config['PAGE_CACHE_MAX_BYTES'],
+    ttl=app.config['PAGE_CACHE_TTL']
+))
+# Computed shopping lists per (recipes, portions, data version); same backend and budget
+einkaufs_cache = seitencache.SeitenCache(seiten_cache.backend)
+
 # --- Context Processors ---
 @app.context_processor
 def inject_current_time():
     """Inject current time into templates."""
     return {'current_time': datetime.datetime.now()}
 
-# --- Forms ---
-class RecipeForm(FlaskForm):
-    """Form for adding or editing recipes."""
-    name = StringField(
-        'Rezeptname',
-        validators=[DataRequired(), Length(min=3, max=150)]
-    )
-    beschreibung = TextAreaField('Beschreibung (optional)')
-    anleitung = TextAreaField('Anleitung', validators=[DataRequired()])
-    kochzeit_minuten = IntegerField('Kochzeit (Minuten)', validators=[Optional()])
-    portionen = IntegerField('Portionen', validators=[Optional()])
-    quelle = StringField(
-        'Quelle (z.B. URL)',
-        validators=[Optional(), Length(max=255)]
-    )
-    image = FileField(
-        'Rezeptbild (optional, max. 16MB)',
-        validators=[
-            FileAllowed(ALLOWED_EXTENSIONS, 'Nur Bilder sind erlaubt! (png, jpg, jpeg, gif)')
-        ]
-    )
-    # Choices are set dynamically in the route
-    # coerce=int entfernt! Die Verarbeitung erfolgt in der Route.
-    category = SelectField('Kategorie', validators=[Optional()])
-    submit = SubmitField('Rezept Speichern')
-
-class IngredientForm(FlaskForm):
-    """Form for adding ingredients to a recipe."""
-    zutat_name = StringField(
-        'Zutat',
-        validators=[DataRequired(), Length(min=1, max=100)]
-    )
-    # Menge can be float (e.g., 0.5) or omitted
-    menge = FloatField('Menge', validators=[Optional()])
-    einheit = StringField(
-        'Einheit',
-        validators=[Optional(), Length(max=50)] # e.g., g, ml, Stück, Prise
-    )
-    submit = SubmitField('Zutat hinzufügen')
+@app.template_global()
+def bild_quellen(filename, art):
+    """
+    Returns src, srcset and sizes for a recipe image in the given layout
+    ('liste' or 'detail'). Falls back to the original while no variants exist.
+    """
+    original = url_for('bild', filename=filename)
+    varianten = bilder.existing_variants(app.config['UPLOAD_FOLDER'], filename, art)
+    if not varianten:
+        if bilder.is_available():
+            g.bilder_ausstehend = True  # Variants may still be generated, see cached_fragments()
+        return {'src': original, 'srcset': None, 'sizes': None}
+    urls = [
+        (url_for('bild', filename=bilder.variant_filename(filename, v)), v.breite)
+        for v in varianten
+    ]
+    return {
+        'src': urls[-1][0],
+        'srcset': ', '.join(f'{url} {breite}w' for url, breite in urls),
+        'sizes': '50px' if art == 'liste' else '(max-width: 1320px) 100vw, 1296px'
+    }
 
 # --- Database Models ---
 class RezeptZutat(db.Model):
@@ -104,6 +213,10 @@ class RezeptZutat(db.Model):
     zutat_id = db.Column(db.Integer, db.ForeignKey('zutat.id'), primary_key=True)
     menge = db.Column(db.Float, nullable=True)
     einheit = db.Column(db.String(50), nullable=True)
+    # Normalised at write time (see einheiten.py): quantity in the base unit
+    # of its dimension (g, ml, Stück, ...), so shopping lists only sum numbers
+    menge_basis = db.Column(db.Float, nullable=True)
+    dimension = db.Column(db.String(60), nullable=True)
 
     # Relationships defined in Rezept and Zutat using back_populates
 
@@ -117,10 +230,15 @@ class Rezept(db.Model):
     kochzeit_minuten = db.Column(db.Integer, nullable=True)
     portionen = db.Column(db.Integer, nullable=True)
     quelle = db.Column(db.String(255), nullable=True)
-    image_file = db.Column(db.String(100), nullable=True, default=None)
+    # Content-addressed file name; indexed for the reference count in delete_image()
+    image_file = db.Column(db.String(100), nullable=True, default=None, index=True)
 
     # Foreign key to Category table
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
+    # Part of the page cache key; taken from the global counter 'rezept_version'
+    # (trigger on insert, bump_recipe_version() on writes), so a new recipe that
+    # gets a deleted recipe's id never shares its (id, version)
+    version = db.Column(db.Integer, nullable=True, default=0)
 
     # Relationships
     zutaten_association = db.relationship(
@@ -131,6 +249,13 @@ class Rezept(db.Model):
     )
     # category relationship is defined via backref in Category model
 
+    __table_args__ = (
+        # Covers ORDER BY name, id and the keyset condition of the index page
+        db.Index('ix_rezept_name_id', 'name', 'id'),
+        # Category pages: WHERE category_id = ? ORDER BY name, id (the rowid completes the key)
+        db.Index('ix_rezept_category_name', 'category_id', 'name'),
+    )
+
     def __repr__(self):
         cat_name = self.category.name if self.category else 'None'
         return f'<Rezept {self.name} (Kategorie: {cat_name})>'
@@ -140,6 +265,8 @@ class Zutat(db.Model):
     __tablename__ = 'zutat'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
+    # Lookup key (see zutatnamen.normalize_name), kept in sync with name
+    name_norm = db.Column(db.String(100), nullable=True, index=True)
 
     # Relationships
     rezepte_association = db.relationship(
@@ -148,6 +275,11 @@ class Zutat(db.Model):
         lazy='dynamic' # Use dynamic loading if many recipes per ingredient
     )
 
+    @db.validates('name')
+    def _sync_name_norm(self, key, name):
+        self.name_norm = zutatnamen.normalize_name(name)
+        return name
+
     def __repr__(self):
         return f'<Zutat {self.name}>'
 
@@ -164,6 +296,134 @@ class Category(db.Model):
     def __repr__(self):
         return f'<Category {self.name}>'
 
+class Datenstand(db.Model):
+    """
+    Change counters per data area, bumped by SQLite triggers on every row change.
+    Lets in-process caches detect writes made by other worker processes.
+    'rezept_version' is the counter recipe versions are taken from.
+    """
+    __tablename__ = 'datenstand'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class Wochenplan(db.Model):
+    """A weekly meal plan; its shopping list is materialised in plan_posten (see wochenplan.py)."""
+    __tablename__ = 'wochenplan'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+
+    def __repr__(self):
+        return f'<Wochenplan {self.name}>'
+
+class PlanEintrag(db.Model):
+    """One planned recipe: day x meal x recipe x portions."""
+    __tablename__ = 'plan_eintrag'
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey('wochenplan.id'), nullable=False, index=True)
+    tag = db.Column(db.Integer, nullable=False)  # 0 = Montag
+    mahlzeit = db.Column(db.String(20), nullable=False)
+    # Indexed: a changed recipe updates every plan that contains it
+    rezept_id = db.Column(db.Integer, db.ForeignKey('rezept.id'), nullable=False, index=True)
+    portionen = db.Column(db.Integer, nullable=False)
+
+class PlanPosten(db.Model):
+    """Materialised shopping list row of a plan, updated by deltas (see wochenplan.py)."""
+    __tablename__ = 'plan_posten'
+    plan_id = db.Column(db.Integer, db.ForeignKey('wochenplan.id'), primary_key=True)
+    zutat_id = db.Column(db.Integer, db.ForeignKey('zutat.id'), primary_key=True)
+    dimension = db.Column(db.String(60), primary_key=True)
+    # Sum of the scaled quantities in the base unit of the dimension
+    menge_basis = db.Column(db.Float, nullable=False, default=0.0)
+    # Number of contributing recipe rows; the row is deleted when it reaches 0
+    anzahl = db.Column(db.Integer, nullable=False, default=0)
+
+class KategorieZaehler(db.Model):
+    """Number of recipes per category and cooking time stufe, kept by SQLite triggers (see kategorien.py)."""
+    __tablename__ = 'kategorie_zaehler'
+    # 0 = ohne Kategorie
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    kochzeit = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    anzahl = db.Column(db.Integer, nullable=False, default=0)
+
+class Auftrag(db.Model):
+    """A background job (image variants, file cleanup) waiting for the worker (see auftraege.py)."""
+    __tablename__ = 'auftrag'
+    id = db.Column(db.Integer, primary_key=True)
+    art = db.Column(db.String(50), nullable=False)
+    schluessel = db.Column(db.String(255), nullable=False)
+    daten = db.Column(db.Text, nullable=False)
+    # 'wartend', 'laeuft' or 'fehlgeschlagen'; finished jobs are deleted
+    status = db.Column(db.String(20), nullable=False, default='wartend')
+    versuche = db.Column(db.Integer, nullable=False, default=0)
+    # Unix timestamps
+    faellig_ab = db.Column(db.Float, nullable=False)
+    gesperrt_bis = db.Column(db.Float, nullable=True)
+    angelegt = db.Column(db.Float, nullable=False)
+    fehler = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        # The worker's claim: due waiting jobs and expired locks
+        db.Index('ix_auftrag_status_faellig', 'status', 'faellig_ab'),
+        # At most one waiting job per art and key (target of the upsert in auftraege.enqueue)
+        db.Index('ux_auftrag_wartend', 'art', 'schluessel', unique=True,
+                 sqlite_where=db.text("status = 'wartend'")),
+    )
+
+class AehnlichesRezept(db.Model):
+    """The most similar recipes of a recipe by TF-IDF ingredient vectors (see aehnlichkeit.py)."""
+    __tablename__ = 'aehnliches_rezept'
+    rezept_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    aehnlich_id = db.Column(db.Integer, primary_key=True, autoincrement=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+class AehnlichkeitOffen(db.Model):
+    """Recipes whose ingredients changed since their similar recipes were computed; set by triggers."""
+    __tablename__ = 'aehnlichkeit_offen'
+    rezept_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Counts the changes, so a change during a computation stays pending
+    stand = db.Column(db.Integer, nullable=False, default=0)
+
+# Trigger, die den Datenstand 'rezept_zutat' bei jeder Zeilenänderung hochzählen
+DATENSTAND_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS rezept_zutat_datenstand_{event} AFTER {event} ON rezept_zutat BEGIN
+        UPDATE datenstand SET version = version + 1 WHERE name = 'rezept_zutat';
+    END
+    """.format(event=event)
+    for event in ('INSERT', 'DELETE', 'UPDATE')
+] + [
+    # Datenstand 'rezept': alles, was die Rezeptübersicht zeigt
+    """
+    CREATE TRIGGER IF NOT EXISTS rezept_datenstand_{name} AFTER {event} ON rezept BEGIN
+        UPDATE datenstand SET version = version + 1 WHERE name = 'rezept';
+    END
+    """.format(name=event.split()[0], event=event)
+    for event in ('INSERT', 'DELETE', 'UPDATE OF name, category_id, image_file')
+] + [
+    # Versionen neuer Rezepte aus dem globalen Zähler 'rezept_version' (siehe Rezept.version)
+    """
+    CREATE TRIGGER IF NOT EXISTS rezept_version_insert AFTER INSERT ON rezept BEGIN
+        UPDATE datenstand SET version = version + 1 WHERE name = 'rezept_version';
+        UPDATE rezept SET version = (SELECT version FROM datenstand WHERE name = 'rezept_version')
+        WHERE id = NEW.id;
+    END
+    """
+] + [
+    # Kochzeit: nur für die Facetten der Seitenleiste (siehe kategorien.py)
+    """
+    CREATE TRIGGER IF NOT EXISTS rezept_datenstand_kochzeit AFTER UPDATE OF kochzeit_minuten ON rezept BEGIN
+        UPDATE datenstand SET version = version + 1 WHERE name = 'rezept';
+    END
+    """
+]
+
+# In-process inverted index zutat_id -> recipe ids (see zutaten_index.py)
+zutaten_index = ZutatenIndex()
+# In-process cache normalised ingredient name -> (id, name) (see zutatnamen.py)
+zutat_namen_cache = zutatnamen.NamenCache()
+# In-process prefix/trigram index for ingredient suggestions (see zutatenvorschlag.py)
+zutat_vorschlaege = zutatenvorschlag.VorschlagIndex()
+
 # --- Helper Functions ---
 def allowed_file(filename):
     """Checks if the file extension is allowed."""
@@ -171,15 +431,15 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def save_image(file_storage):
-    """Saves an uploaded image file with a unique name and returns the filename."""
+    """
+    Saves an uploaded image content-addressed (<sha256>.<ext>) and returns the filename.
+    Identical uploads share one file.
+    """
     if file_storage and allowed_file(file_storage.filename):
         filename = secure_filename(file_storage.filename)
         ext = os.path.splitext(filename)[1]
-        unique_filename = uuid.uuid4().hex + ext
         try:
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file_storage.save(file_path)
-            return unique_filename
+            return bilder.store_upload(file_storage.stream, app.config['UPLOAD_FOLDER'], ext)
         except Exception as e:
             app.logger.error(f"Fehler beim Speichern des Bildes {filename}: {e}")
             flash(f'Fehler beim Speichern des Bildes: {e}', 'danger')
@@ -188,18 +448,204 @@ def save_image(file_storage):
         flash('Ungültiger Dateityp für das Bild.', 'warning')
     return None # No file or error
 
-def delete_image(filename):
-    """Deletes an image file from the upload folder."""
-    if filename:
-        try:
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-        except Exception as e:
-            app.logger.error(f"Fehler beim Löschen des Bildes {filename}: {e}")
-            flash(f'Fehler beim Löschen des alten Bildes: {e}', 'warning')
-    return False
+def delete_image(filename, behalten_ab=None):
+    """
+    Deletes an image file (and its variants) from the upload folder,
+    but only if no recipe references it any more. Call after commit.
+    A file stored again at or after behalten_ab (Unix time) is kept: an upload
+    of the same content may be about to be committed.
+    Returns True if the file was deleted.
+    """
+    if not filename:
+        return False
+    in_use = db.session.query(Rezept.id).filter_by(image_file=filename).first()
+    if in_use:
+        return False
+    folder = app.config['UPLOAD_FOLDER']
+    file_path = os.path.join(folder, filename)
+    try:
+        if behalten_ab is not None and os.path.getmtime(file_path) >= behalten_ab:
+            return False
+        bilder.delete_variants(folder, filename)
+        os.remove(file_path)
+        return True
+    except FileNotFoundError:
+        bilder.delete_variants(folder, filename)
+        return False
+
+# --- Background Jobs ---
+def enqueue_job(art, daten, schluessel=None, verzoegerung=0):
+    """
+    Queues a background job in the session's transaction: the worker sees it
+    once the route commits, a rollback discards it (see auftraege.py).
+    """
+    auftraege.enqueue(db.session.connection(), art, daten, schluessel=schluessel, verzoegerung=verzoegerung)
+
+def enqueue_similar_recipes():
+    """Queues the recomputation of the recipes the rezept_zutat triggers marked (one waiting job for all)."""
+    enqueue_job('aehnliche_rezepte', {}, schluessel='offen', verzoegerung=app.config['SIMILAR_RECIPES_DELAY'])
+
+def enqueue_image_deletion(filename):
+    """Queues the removal of an image that the current transaction stops referencing."""
+    enqueue_job('bild_loeschen', {'datei': filename, 'behalten_ab': time.time()}, schluessel=filename)
+
+def discard_upload(filename):
+    """Queues the removal of an upload whose recipe change was rolled back (own transaction)."""
+    if not filename:
+        return
+    try:
+        enqueue_image_deletion(filename)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Aufräumen des Bildes {filename} konnte nicht eingeplant werden: {e}")
+
+def job_image_variants(daten):
+    """Job 'bild_varianten': writes the missing variants of an image; nothing to do if all exist or it is gone."""
+    folder = app.config['UPLOAD_FOLDER']
+    filename = daten['datei']
+    if not bilder.is_available() or not os.path.exists(os.path.join(folder, filename)):
+        return
+    if len(bilder.existing_variants(folder, filename, 'liste')) \
+            + len(bilder.existing_variants(folder, filename, 'detail')) < len(bilder.all_variants()):
+        bilder.generate_variants(folder, filename)
+
+def job_delete_image(daten):
+    """Job 'bild_loeschen': see delete_image(); a second run finds nothing to delete."""
+    delete_image(daten['datei'], behalten_ab=daten.get('behalten_ab'))
+
+def update_similar_recipes(voll=False):
+    """
+    Recomputes the pending (or with voll all) similar recipes: computed on a
+    read connection, stored in a short write transaction. Returns the number
+    of written pairs.
+    """
+    with db.engine.connect() as connection:
+        if voll:
+            ergebnis = aehnlichkeit.compute_all(connection, app.config['SIMILAR_RECIPES'])
+        else:
+            ergebnis = aehnlichkeit.compute_pending(connection, app.config['SIMILAR_RECIPES'])
+    if ergebnis is None:
+        return 0
+    with db.engine.begin() as connection:
+        return aehnlichkeit.store(connection, ergebnis)
+
+def job_similar_recipes(daten):
+    """Job 'aehnliche_rezepte': see update_similar_recipes(); pending marks are only cleared once stored."""
+    if not aehnlichkeit.is_available():
+        app.logger.warning("NumPy ist nicht installiert, ähnliche Rezepte werden nicht berechnet.")
+        return
+    update_similar_recipes()
+
+# Handlers of the background jobs by art
+AUFTRAG_HANDLER = {
+    'bild_varianten': job_image_variants,
+    'bild_loeschen': job_delete_image,
+    'aehnliche_rezepte': job_similar_recipes,
+}
+
+def create_worker(threads=None):
+    """A job worker for this app; every job runs in its own app context."""
+    return auftraege.Worker(
+        db.engine, AUFTRAG_HANDLER,
+        threads=threads or app.config['JOB_WORKER_THREADS'],
+        sperrfrist=app.config['JOB_LOCK_SECONDS'],
+        max_versuche=app.config['JOB_MAX_ATTEMPTS'],
+        kontext=app.app_context
+    )
+
+def get_datenstand(name):
+    """Returns the current change counter of a data area."""
+    return db.session.query(Datenstand.version).filter_by(name=name).scalar() or 0
+
+def load_zutaten_index():
+    """(Re)builds the inverted ingredient index from the rezept_zutat table."""
+    version = get_datenstand('rezept_zutat')
+    # Core select on the plain table: plain tuples, no ORM row processing
+    table = RezeptZutat.__table__
+    rows = db.session.connection().execute(db.select(table.c.rezept_id, table.c.zutat_id))
+    zutaten_index.build(rows, version)
+    app.logger.info(f"Zutaten-Index aufgebaut (Datenstand {version}).")
+
+def get_zutaten_index():
+    """
+    Returns the ingredient index, rebuilding it if another process changed the
+    data (or on the first call of a worker).
+    """
+    if zutaten_index.version != get_datenstand('rezept_zutat'):
+        load_zutaten_index()
+    return zutaten_index
+
+def load_zutat_vorschlaege():
+    """(Re)builds the ingredient suggestion index from the zutat table."""
+    table = Zutat.__table__
+    rows = db.session.connection().execute(db.select(table.c.id, table.c.name))
+    zutat_vorschlaege.build(rows)
+    app.logger.info(f"Zutaten-Vorschläge aufgebaut ({len(zutat_vorschlaege)} Zutaten).")
+
+def update_zutat_vorschlaege():
+    """
+    Adds ingredients created since the index was built (by this or another
+    process). Ingredients are append-only, so one indexed range query suffices.
+    The first call of a worker builds the whole index.
+    """
+    if not zutat_vorschlaege.is_loaded:
+        load_zutat_vorschlaege()
+        return
+    table = Zutat.__table__
+    rows = db.session.connection().execute(
+        db.select(table.c.id, table.c.name)
+        .where(table.c.id > zutat_vorschlaege.max_id)
+        .order_by(table.c.id)
+    )
+    zutat_vorschlaege.add(rows)
+
+def update_zutaten_index(changes):
+    """Applies committed link changes [(ADD|REMOVE, rezept_id, zutat_id)] to the index."""
+    if changes:
+        zutaten_index.apply(changes, get_datenstand('rezept_zutat'))
+
+def find_recipes_by_ingredients(zutat_names, limit=20, max_fehlend=None):
+    """
+    Finds recipes that can be cooked with the given ingredient names.
+    Results are ranked by the number of missing ingredients (fewest first),
+    then by the number of covered ones, then by id (see ZutatenIndex.query).
+    Returns a tuple: (results, unknown_names). Each result is a dict with
+    id, name, vorhanden, gesamt and the list of missing ingredient names.
+    """
+    names = {
+        zutatnamen.normalize_name(name): name.strip() for name in zutat_names if name and name.strip()
+    }
+    if not names:
+        return [], []
+
+    bekannte = zutatnamen.lookup(db.session.connection(), names.values(), zutat_namen_cache)
+    unknown_names = [original for key, original in names.items() if key not in bekannte]
+
+    treffer = get_zutaten_index().query(
+        [zutat_id for zutat_id, _ in bekannte.values()], limit=limit, max_fehlend=max_fehlend
+    )
+    if not treffer:
+        return [], unknown_names
+
+    # Resolve recipe and missing ingredient names with one query each
+    rezept_names = dict(db.session.query(Rezept.id, Rezept.name)
+                        .filter(Rezept.id.in_([t.rezept_id for t in treffer])))
+    fehlend_ids = {zutat_id for t in treffer for zutat_id in t.fehlend}
+    zutat_names_by_id = dict(db.session.query(Zutat.id, Zutat.name)
+                             .filter(Zutat.id.in_(fehlend_ids))) if fehlend_ids else {}
+
+    results = [
+        {
+            'id': t.rezept_id,
+            'name': rezept_names.get(t.rezept_id),
+            'vorhanden': t.vorhanden,
+            'gesamt': t.gesamt,
+            'fehlend': sorted(zutat_names_by_id.get(z, '?') for z in t.fehlend)
+        }
+        for t in treffer
+    ]
+    return results, unknown_names
 
 def get_category_choices():
     """Returns a list of category choices for SelectFields."""
@@ -208,21 +654,285 @@ def get_category_choices():
     choices.insert(0, ('', '--- Bitte wählen ---')) # Add default empty choice
     return choices
 
+def encode_cursor(*values):
+    """Encodes keyset values (e.g. name and id of a row) as an opaque URL token."""
+    raw = json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """
+    Decodes a (name, id) token created by encode_cursor. Aborts with 400 if it
+    is invalid, so only a str and an int in SQLite's range reach the query.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        abort(400)
+    if not isinstance(values, list) or len(values) != 2:
+        abort(400)
+    name, id_ = values
+    # bool is an int subclass; JSON true/false is not an id
+    if not isinstance(name, str) or type(id_) is not int or not -2**63 <= id_ < 2**63:
+        abort(400)
+    return values
+
+def get_page_size():
+    """Reads the page size from the request, clamped to the configured maximum."""
+    page_size = request.args.get('pro_seite', type=int) or app.config['INDEX_PAGE_SIZE']
+    return max(1, min(page_size, app.config['INDEX_MAX_PAGE_SIZE']))
+
+def recipe_list_query(page_size, after=None, before=None, category_id=None, kochzeit=None):
+    """
+    Select for one page of the recipe list using keyset pagination on (name, id).
+    Only the columns shown in the list are selected, so no ORM objects and no
+    ingredient rows are loaded. Cost depends on the page size, not the table size.
+    Fetches one row more than the page to tell whether another page follows.
+    category_id and kochzeit (a kategorien.Kochzeit) restrict the list.
+    """
+    query = db.select(
+        Rezept.id,
+        Rezept.name,
+        Rezept.image_file,
+        Category.name.label('category_name')
+    ).outerjoin(Category, Rezept.category_id == Category.id)
+    if category_id is not None:
+        query = query.where(Rezept.category_id == category_id)
+    if kochzeit is not None:
+        query = query.where(kategorien.kochzeit_filter(Rezept.kochzeit_minuten, kochzeit))
+
+    if before is not None:
+        # Backwards: seek below the cursor in descending order (flipped in recipe_list_result)
+        return query.where(tuple_(Rezept.name, Rezept.id) < tuple(before)) \
+            .order_by(Rezept.name.desc(), Rezept.id.desc()) \
+            .limit(page_size + 1)
+    if after is not None:
+        query = query.where(tuple_(Rezept.name, Rezept.id) > tuple(after))
+    return query.order_by(Rezept.name, Rezept.id).limit(page_size + 1)
+
+def recipe_list_result(rows, page_size, after=None, before=None):
+    """
+    Turns the rows of recipe_list_query into a page.
+    Returns a tuple: (rows, next_cursor, prev_cursor)
+    """
+    if before is not None:
+        has_prev = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = after is not None
+
+    next_cursor = encode_cursor(rows[-1].name, rows[-1].id) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0].name, rows[0].id) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+def recipe_list_page(page_size, after=None, before=None, category_id=None, kochzeit=None):
+    """Loads one page of the recipe list. Returns a tuple: (rows, next_cursor, prev_cursor)"""
+    rows = db.session.execute(recipe_list_query(
+        page_size, after=after, before=before, category_id=category_id, kochzeit=kochzeit
+    )).all()
+    return recipe_list_result(rows, page_size, after=after, before=before)
+
+def recipe_list_fragments(page, page_size, facetten, kategorie=None, kochzeit=None):
+    """The cacheable fragments of a recipe list page: the list and the facet sidebar."""
+    rezepte, next_cursor, prev_cursor = page
+    return {
+        'liste': render_fragment('uebersicht', rezepte, next_cursor, prev_cursor, page_size, kategorie, kochzeit),
+        'facetten': render_fragment('facetten', facetten, kategorie, kochzeit)
+    }
+
+def recipe_detail_query(rezept_id):
+    """Select for a recipe with ingredients and category, as shown on its detail page."""
+    # Using joinedload here ensures ingredients and their names are loaded efficiently
+    return db.select(Rezept).options(
+        joinedload(Rezept.zutaten_association).joinedload(RezeptZutat.zutat),
+        joinedload(Rezept.category) # Also load category if displayed
+    ).where(Rezept.id == rezept_id)
+
+# --- Page Cache ---
+def render_fragment(macro_name, *args):
+    """Renders one macro of seitenteile.html to a string."""
+    if profiler is not None:
+        with profiler.rendering():
+            return str(get_template_attribute('seitenteile.html', macro_name)(*args))
+    return str(get_template_attribute('seitenteile.html', macro_name)(*args))
+
+def render_fragments(render):
+    """
+    Calls render() and returns (fragments, cacheable). Fragments that fell back
+    to an original image while its variants may still be generated are not
+    cacheable.
+    """
+    g.bilder_ausstehend = False
+    teile = render()
+    return teile, not g.bilder_ausstehend
+
+def cached_fragments(key, render):
+    """
+    Returns the page fragments {name: html} stored under key, or calls render()
+    and stores its result if it is cacheable.
+    """
+    teile = seiten_cache.get(key)
+    if teile is None:
+        teile, cacheable = render_fragments(render)
+        if cacheable:
+            seiten_cache.set(key, teile)
+    return teile
+
+def index_cache_key(version, page_size, after, before):
+    return f'index:v{version}:{page_size}:{after or ""}:{before or ""}'
+
+def category_cache_key(category_id, kochzeit, version, page_size, after, before):
+    schluessel = kochzeit.schluessel if kochzeit else ''
+    return f'kategorie:{category_id}:{schluessel}:v{version}:{page_size}:{after or ""}:{before or ""}'
+
+def recipe_cache_key(rezept_id, version):
+    return f'rezept:{rezept_id}:v{version or 0}'
+
+def bump_recipe_version(rezept):
+    """
+    Gives a recipe a new version from the global counter (in SQL, so concurrent
+    writers never share one, and no other recipe with the same id ever had it).
+    """
+    rezept.version = db.session.execute(db.text(
+        "UPDATE datenstand SET version = version + 1 WHERE name = 'rezept_version' RETURNING version"
+    )).scalar_one()
+
+def page_etag(*parts):
+    """
+    ETag of a page assembled from cached fragments. Besides the data version it
+    covers the session (pages contain its CSRF token) and a time slot of half
+    the token lifetime, so a revalidated page never carries an expired token.
+    """
+    time_limit = app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    slot = int(time.time() // (time_limit / 2)) if time_limit else 0
+    raw = '|'.join(str(part) for part in parts + (session.get('csrf_token', ''), slot))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def page_not_modified(etag):
+    """True if the client already has this version of the page. Pending flash messages always get a full page."""
+    return etag in request.if_none_match and not session.get('_flashes')
+
+def page_response(etag, body=None):
+    """The page with its ETag, or 304 if body is None."""
+    response = make_response(body, 200) if body is not None else make_response('', 304)
+    response.set_etag(etag)
+    # Pages are per session (flash messages, CSRF token): revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def conditional_page(etag, render):
+    """Answers with 304 if the client already has this version of the page, otherwise with render()."""
+    if page_not_modified(etag):
+        return page_response(etag)
+    return page_response(etag, render())
+
+@app.route('/metrics')
+def metrics():
+    """Request metrics of this process in the Prometheus text format (PROFILING=1)."""
+    if profiler is None:
+        abort(404)
+    response = make_response(profiler.metrics_text())
+    response.mimetype = 'text/plain'
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+@app.route('/api/seitencache')
+def page_cache_stats():
+    """Hit/miss counters of this process and the size of the page cache."""
+    return jsonify(seiten_cache.stats())
+
 # --- Routes ---
 @app.route('/')
 def index():
-    """Displays the list of all recipes."""
-    # Eager load category and image information if frequently accessed on index
-    rezepte = Rezept.query.options(joinedload(Rezept.category)).order_by(Rezept.name).all()
-    return render_template('index.html', rezepte=rezepte)
+    """Displays one page of the recipe list (keyset pagination via ?nach= / ?vor=)."""
+    page_size = get_page_size()
+    after = request.args.get('nach')
+    before = request.args.get('vor')
+    # Trigger-maintained, changes whenever anything shown in the list changes
+    version = get_datenstand('rezept')
+
+    def render_list():
+        page = recipe_list_page(
+            page_size,
+            after=decode_cursor(after) if after else None,
+            before=decode_cursor(before) if before else None
+        )
+        return recipe_list_fragments(page, page_size, kategorien.facets(db.session.connection()))
+
+    def render_page():
+        key = index_cache_key(version, page_size, after, before)
+        return render_template('index.html', teile=cached_fragments(key, render_list))
+
+    return conditional_page(page_etag('index', version, page_size, after, before), render_page)
+
+@app.route('/kategorie/<int:category_id>')
+def category_recipes(category_id):
+    """One page of the recipes of a category; ?kochzeit=bis-30 filters by cooking time."""
+    kategorie = db.session.get(Category, category_id)
+    if kategorie is None:
+        abort(404)
+    try:
+        kochzeit = kategorien.parse_kochzeit(request.args['kochzeit']) if request.args.get('kochzeit') else None
+    except ValueError:
+        abort(400)
+    page_size = get_page_size()
+    after = request.args.get('nach')
+    before = request.args.get('vor')
+    # Covers the recipes of the category and their counts (see DATENSTAND_TRIGGERS)
+    version = get_datenstand('rezept')
+
+    def render_list():
+        page = recipe_list_page(
+            page_size,
+            after=decode_cursor(after) if after else None,
+            before=decode_cursor(before) if before else None,
+            category_id=category_id,
+            kochzeit=kochzeit
+        )
+        return recipe_list_fragments(
+            page, page_size, kategorien.facets(db.session.connection()), kategorie, kochzeit
+        )
+
+    def render_page():
+        key = category_cache_key(category_id, kochzeit, version, page_size, after, before)
+        return render_template('index.html', teile=cached_fragments(key, render_list), titel=kategorie.name)
+
+    etag = page_etag('kategorie', category_id, kochzeit and kochzeit.schluessel, version, page_size, after, before)
+    return conditional_page(etag, render_page)
+
+@app.route('/bilder/<path:filename>')
+def bild(filename):
+    """
+    Serves uploaded images and their variants. Names are derived from the
+    content, so responses are immutable and carry the content hash as ETag.
+    Other files in the folder (uploads in progress, pre-hash names before
+    'flask rezepte dedupe-images') are not served.
+    """
+    if not bilder.is_servable(filename):
+        abort(404)
+    response = send_from_directory(
+        app.config['UPLOAD_FOLDER'], filename,
+        etag=filename,
+        max_age=app.config['IMAGE_MAX_AGE']
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/add', methods=['GET', 'POST'])
 def add_recipe():
     """Handles adding a new recipe."""
+    from formulare import RecipeForm
     form = RecipeForm()
     form.category.choices = get_category_choices() # Dynamically set choices
 
     if form.validate_on_submit():
+        # The upload is stored outside any transaction, so no writer waits for the copy
+        begin_write()
         image_filename = save_image(form.image.data)
         # If save_image returned None due to an error, image_filename will be None
 
@@ -239,6 +949,9 @@ def add_recipe():
         )
         db.session.add(neues_rezept)
         try:
+            if image_filename:
+                # Thumbnails are generated by the job worker
+                enqueue_job('bild_varianten', {'datei': image_filename})
             db.session.commit()
             flash(f'Rezept "{neues_rezept.name}" wurde erfolgreich hinzugefügt!', 'success')
             return redirect(url_for('index'))
@@ -246,9 +959,8 @@ def add_recipe():
             db.session.rollback()
             app.logger.error(f"Fehler beim Speichern des Rezepts {form.name.data}: {e}")
             flash(f'Fehler beim Speichern des Rezepts: {e}', 'danger')
-            # Delete uploaded image if DB commit failed
-            if image_filename:
-                delete_image(image_filename)
+            # The uploaded image is removed in the background unless it is shared
+            discard_upload(image_filename)
 
     # Render form again if GET request or validation failed
     return render_template('rezept_form.html', form=form, title='Neues Rezept hinzufügen')
@@ -256,40 +968,96 @@ def add_recipe():
 
 @app.route('/rezept/<int:rezept_id>')
 def recipe_detail(rezept_id):
-    """Displays the details of a single recipe."""
-    # Using joinedload here ensures ingredients and their names are loaded efficiently
-    rezept = Rezept.query.options(
-        joinedload(Rezept.zutaten_association).joinedload(RezeptZutat.zutat),
-        joinedload(Rezept.category) # Also load category if displayed
-    ).get_or_404(rezept_id)
+    """Displays the details of a single recipe (fragments cached per recipe version)."""
+    row = db.session.execute(db.select(Rezept.version).where(Rezept.id == rezept_id)).first()
+    if row is None:
+        abort(404)
+
+    def render_recipe():
+        rezept = db.session.execute(recipe_detail_query(rezept_id)).unique().scalar_one_or_none()
+        if rezept is None:
+            abort(404)
+        return recipe_fragments(rezept)
+
+    plan_choices = get_plan_choices()
+    # Not part of the cached fragments: changes with other recipes' ingredients
+    aehnliche = aehnlichkeit.similar(db.session.connection(), rezept_id, app.config['SIMILAR_RECIPES'])
+
+    def render_page():
+        teile = cached_fragments(recipe_cache_key(rezept_id, row.version), render_recipe)
+        return render_recipe_page(rezept_id, teile, plan_choices, aehnliche)
+
+    return conditional_page(page_etag('rezept', rezept_id, row.version, plan_choices, aehnliche), render_page)
+
+def recipe_fragments(rezept):
+    """The cacheable fragments of a recipe's detail page."""
+    return {
+        'name': rezept.name,
+        'kopf': render_fragment('detail_kopf', rezept),
+        'zutaten': render_fragment('detail_zutaten', rezept),
+        'anleitung': render_fragment('detail_anleitung', rezept)
+    }
+
+def render_recipe_page(rezept_id, teile, plan_choices, aehnliche=()):
+    """The detail page around the cached fragments (forms carry the session's CSRF token)."""
+    from formulare import IngredientForm, PlanEintragForm
+    plan_form = PlanEintragForm()
+    plan_form.plan.choices = plan_choices
+    return render_template(
+        'rezept_detail.html',
+        rezept_id=rezept_id,
+        teile=teile,
+        ingredient_form=IngredientForm(), # For adding new ingredients
+        plan_form=plan_form if plan_choices else None,
+        aehnliche=aehnliche
+    )
 
-    ingredient_form = IngredientForm() # For adding new ingredients
-    return render_template('rezept_detail.html', rezept=rezept, ingredient_form=ingredient_form)
+@app.route('/api/rezepte/<int:rezept_id>')
+def api_recipe(rezept_id):
+    """A recipe with ingredients as JSON (same fields as a line of the export)."""
+    rezept = db.session.execute(recipe_detail_query(rezept_id)).unique().scalar_one_or_none()
+    if rezept is None:
+        abort(404)
+    return jsonify(recipe_json(rezept))
+
+def recipe_json(rezept):
+    return {
+        'id': rezept.id,
+        'name': rezept.name,
+        'beschreibung': rezept.beschreibung,
+        'anleitung': rezept.anleitung,
+        'kochzeit_minuten': rezept.kochzeit_minuten,
+        'portionen': rezept.portionen,
+        'quelle': rezept.quelle,
+        'kategorie': rezept.category.name if rezept.category else None,
+        'zutaten': [
+            {'name': assoc.zutat.name, 'menge': assoc.menge, 'einheit': assoc.einheit}
+            for assoc in rezept.zutaten_association
+        ],
+    }
 
 @app.route('/edit/<int:rezept_id>', methods=['GET', 'POST'])
 def edit_recipe(rezept_id):
     """Handles editing an existing recipe."""
+    from formulare import RecipeForm
     rezept = Rezept.query.get_or_404(rezept_id)
     form = RecipeForm(obj=rezept) # Pre-populate form with recipe data on GET
     form.category.choices = get_category_choices()
 
     if form.validate_on_submit():
+        # The upload is stored outside any transaction, so no writer waits for the copy;
+        # the recipe is read again under the write lock below
+        begin_write()
+        uploaded_filename = save_image(form.image.data) if form.image.data else None
+
         original_image = rezept.image_file
-        new_image_filename = original_image # Assume old image is kept
-
-        if form.image.data: # New image uploaded
-            # Attempt to save the new image
-            uploaded_filename = save_image(form.image.data)
-            if uploaded_filename:
-                new_image_filename = uploaded_filename
-                # Delete the old image *after* new one is saved successfully
-                if original_image:
-                    delete_image(original_image)
-            else:
-                # Keep old image if upload failed, flash message already shown by save_image
-                new_image_filename = original_image
+        # Keep old image if there was no upload or it failed (flash message already shown by save_image)
+        new_image_filename = uploaded_filename or original_image
 
 
+        # Plans hold the recipe scaled by its current portions (see wochenplan.py)
+        portionen_geaendert = form.portionen.data != rezept.portionen
+
         # Update recipe fields from form
         rezept.name = form.name.data
         rezept.beschreibung = form.beschreibung.data
@@ -300,9 +1068,20 @@ def edit_recipe(rezept_id):
         rezept.image_file = new_image_filename
         # WTForms handles the conversion for category_id
         rezept.category_id = form.category.data
+        bump_recipe_version(rezept)
 
 
         try:
+            if portionen_geaendert:
+                connection = db.session.connection()
+                wochenplan.subtract_recipe(connection, rezept.id)  # Reads the old portions, not flushed yet
+                db.session.flush()
+                wochenplan.add_recipe(connection, rezept.id)
+            if new_image_filename != original_image:
+                enqueue_job('bild_varianten', {'datei': new_image_filename})
+                # The job deletes the old image only if the commit no longer references it
+                if original_image:
+                    enqueue_image_deletion(original_image)
             db.session.commit()
             flash('Rezept erfolgreich aktualisiert!', 'success')
             return redirect(url_for('recipe_detail', rezept_id=rezept.id))
@@ -310,9 +1089,9 @@ def edit_recipe(rezept_id):
             db.session.rollback()
             app.logger.error(f"Fehler beim Aktualisieren von Rezept {rezept.id}: {e}")
             flash(f'Fehler beim Aktualisieren des Rezepts: {e}', 'danger')
-            # If DB commit failed, but a new image was saved and old one deleted,
-            # we might be in an inconsistent state. Reverting image changes is complex.
-            # Consider adding logic to restore the old image if needed.
+            # The old image is untouched; drop the new upload unless it is shared
+            if new_image_filename != original_image:
+                discard_upload(new_image_filename)
 
     elif request.method == 'GET':
         # Ensure category is pre-selected correctly on GET
@@ -321,7 +1100,7 @@ def edit_recipe(rezept_id):
     # Provide current image URL to template for display
     current_image_url = None
     if rezept.image_file:
-        current_image_url = url_for('static', filename=f'uploads/{rezept.image_file}')
+        current_image_url = url_for('bild', filename=rezept.image_file)
 
     return render_template(
         'rezept_form.html',
@@ -333,18 +1112,26 @@ def edit_recipe(rezept_id):
 
 
 @app.route('/delete/<int:rezept_id>', methods=['POST'])
+@writes
 def delete_recipe(rezept_id):
     """Deletes a recipe."""
     rezept = Rezept.query.get_or_404(rezept_id)
     image_to_delete = rezept.image_file # Get image filename before deleting recipe
     recipe_name = rezept.name # Get name for flash message
+    removed_links = [(REMOVE, rezept.id, assoc.zutat_id) for assoc in rezept.zutaten_association]
+    cache_key = recipe_cache_key(rezept.id, rezept.version)
 
     try:
+        wochenplan.remove_recipe(db.session.connection(), rezept.id)
         db.session.delete(rezept)
-        db.session.commit()
-        # Delete image only after successful DB commit
         if image_to_delete:
-            delete_image(image_to_delete)
+            # Runs after the commit, only if no other recipe shares the file
+            enqueue_image_deletion(image_to_delete)
+        if removed_links:
+            enqueue_similar_recipes()
+        db.session.commit()
+        update_zutaten_index(removed_links)
+        seiten_cache.delete(cache_key)
         flash(f'Rezept "{recipe_name}" wurde gelöscht.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -354,8 +1141,10 @@ def delete_recipe(rezept_id):
     return redirect(url_for('index'))
 
 @app.route('/rezept/<int:rezept_id>/add_ingredient', methods=['POST'])
+@writes
 def add_ingredient(rezept_id):
     """Adds an ingredient to a specific recipe."""
+    from formulare import IngredientForm
     rezept = Rezept.query.get_or_404(rezept_id)
     form = IngredientForm() # Process data from the request
 
@@ -364,35 +1153,47 @@ def add_ingredient(rezept_id):
         menge = form.menge.data # WTForms FloatField handles conversion or None
         einheit = form.einheit.data.strip() if form.einheit.data else None
 
-        # Find or create the Zutat globally (case-insensitive search)
-        zutat = Zutat.query.filter(db.func.lower(Zutat.name) == db.func.lower(zutat_name)).first()
-        if not zutat:
-            zutat = Zutat(name=zutat_name.capitalize()) # Store capitalized
-            db.session.add(zutat)
-            # Flush to get the ID if needed immediately (SQLAlchemy often handles this)
-            # db.session.flush()
-
-        # Check if this ingredient is already linked to this recipe
-        existing_assoc = RezeptZutat.query.filter_by(rezept_id=rezept.id, zutat_id=zutat.id).first()
-
-        if existing_assoc:
-            flash(f'Die Zutat "{zutat.name}" ist bereits in diesem Rezept vorhanden.', 'warning')
-        else:
-            # Create the association
-            neue_zuordnung = RezeptZutat(
-                rezept_id=rezept.id,
-                zutat=zutat, # Pass the object, SQLAlchemy handles the ID
-                menge=menge,
-                einheit=einheit
+        created = 0
+        try:
+            # Find or create the Zutat globally (normalised name via cache/index, see zutatnamen.py)
+            gefunden, created = zutatnamen.resolve(
+                db.session.connection(), [zutat_name], zutat_namen_cache
             )
-            db.session.add(neue_zuordnung)
-            try:
+            zutat_id, zutat_display_name = gefunden[zutatnamen.normalize_name(zutat_name)]
+
+            # The recipe's associations were loaded together with it, no extra query
+            if any(assoc.zutat_id == zutat_id for assoc in rezept.zutaten_association):
+                flash(f'Die Zutat "{zutat_display_name}" ist bereits in diesem Rezept vorhanden.', 'warning')
+            else:
+                # Create the association (quantity normalised once, here)
+                menge_basis, dimension = einheiten.normalize(menge, einheit)
+                neue_zuordnung = RezeptZutat(
+                    rezept_id=rezept.id,
+                    zutat_id=zutat_id,
+                    menge=menge,
+                    einheit=einheit,
+                    menge_basis=menge_basis,
+                    dimension=dimension
+                )
+                # Rebook the recipe in the plans that contain it (see wochenplan.py)
+                connection = db.session.connection()
+                wochenplan.subtract_recipe(connection, rezept.id)
+                db.session.add(neue_zuordnung)
+                bump_recipe_version(rezept)
+                db.session.flush()
+                wochenplan.add_recipe(connection, rezept.id)
+                enqueue_similar_recipes()
                 db.session.commit()
-                flash(f'Zutat "{zutat.name}" hinzugefügt.', 'success')
-            except Exception as e:
-                db.session.rollback()
-                app.logger.error(f"Fehler beim Hinzufügen Zutat zu Rezept {rezept_id}: {e}")
-                flash(f'Fehler beim Hinzufügen der Zutat: {e}', 'danger')
+                update_zutaten_index([(ADD, rezept.id, zutat_id)])
+                if created:
+                    update_zutat_vorschlaege()
+                flash(f'Zutat "{zutat_display_name}" hinzugefügt.', 'success')
+        except Exception as e:
+            db.session.rollback()
+            if created:
+                zutat_namen_cache.clear()  # Cached ids of the rolled back insert
+            app.logger.error(f"Fehler beim Hinzufügen Zutat zu Rezept {rezept_id}: {e}")
+            flash(f'Fehler beim Hinzufügen der Zutat: {e}', 'danger')
 
     else:
         # Form validation failed, flash errors
@@ -407,6 +1208,7 @@ def add_ingredient(rezept_id):
     return redirect(url_for('recipe_detail', rezept_id=rezept_id))
 
 @app.route('/rezept/<int:rezept_id>/delete_ingredient/<int:zutat_id>', methods=['POST'])
+@writes
 def delete_ingredient(rezept_id, zutat_id):
     """Removes an ingredient association from a recipe."""
     # Find the specific association link
@@ -414,8 +1216,15 @@ def delete_ingredient(rezept_id, zutat_id):
     zutat_name = assoc.zutat.name # For flash message
 
     try:
+        connection = db.session.connection()
+        wochenplan.subtract_recipe(connection, rezept_id)
+        bump_recipe_version(assoc.rezept)
         db.session.delete(assoc)
+        db.session.flush()
+        wochenplan.add_recipe(connection, rezept_id)
+        enqueue_similar_recipes()
         db.session.commit()
+        update_zutaten_index([(REMOVE, rezept_id, zutat_id)])
         flash(f'Zutat "{zutat_name}" aus dem Rezept entfernt.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -424,77 +1233,325 @@ def delete_ingredient(rezept_id, zutat_id):
 
     return redirect(url_for('recipe_detail', rezept_id=rezept_id))
 
+# --- Search ---
+def run_search(query_text):
+    """Runs the full-text search for the current request. Returns (results, page)."""
+    page = max(1, request.args.get('seite', 1, type=int))
+    page_size = app.config['SEARCH_PAGE_SIZE']
+    results = suche.search(
+        db.session.connection(), query_text,
+        limit=page_size, offset=(page - 1) * page_size
+    )
+    return results, page
+
+@app.route('/suche')
+def search():
+    """Displays BM25-ranked full-text search results with highlighted snippets."""
+    query_text = request.args.get('q', '').strip()
+    results, page = run_search(query_text) if query_text else ([], 1)
+    return render_template(
+        'suche.html',
+        q=query_text,
+        results=results,
+        page=page,
+        has_next=len(results) == app.config['SEARCH_PAGE_SIZE']
+    )
+
+@app.route('/api/suche')
+def api_search():
+    """JSON variant of the full-text search."""
+    query_text = request.args.get('q', '').strip()
+    results, page = run_search(query_text) if query_text else ([], 1)
+    return jsonify({
+        'q': query_text,
+        'seite': page,
+        'treffer': [
+            {
+                'id': r['id'],
+                'name': r['name'],
+                'url': url_for('recipe_detail', rezept_id=r['id']),
+                'rank': r['rank'],
+                'snippet': str(r['snippet'])
+            }
+            for r in results
+        ]
+    })
+
+# --- Cooking With What's There ---
+def parse_zutaten_param(value):
+    """Splits a comma or newline separated list of ingredient names."""
+    return [name for name in (value or '').replace('\n', ',').split(',') if name.strip()]
+
+@app.route('/was-kann-ich-kochen')
+def cook_with_ingredients():
+    """Shows recipes ranked by how well the given pantry covers their ingredients."""
+    zutaten_text = request.args.get('zutaten', '')
+    max_fehlend = request.args.get('max_fehlend', type=int)
+    results, unknown_names = find_recipes_by_ingredients(
+        parse_zutaten_param(zutaten_text), max_fehlend=max_fehlend
+    )
+    if unknown_names:
+        flash(f'Unbekannte Zutaten: {", ".join(unknown_names)}', 'warning')
+    return render_template(
+        'was_kann_ich_kochen.html',
+        zutaten=zutaten_text,
+        max_fehlend=max_fehlend,
+        results=results
+    )
+
+@app.route('/api/rezepte/mit-zutaten')
+def api_cook_with_ingredients():
+    """JSON variant: ?zutaten=Mehl,Eier,Milch[&max_fehlend=2][&limit=20]"""
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    results, unknown_names = find_recipes_by_ingredients(
+        parse_zutaten_param(request.args.get('zutaten')),
+        limit=limit,
+        max_fehlend=request.args.get('max_fehlend', type=int)
+    )
+    return jsonify({'rezepte': results, 'unbekannte_zutaten': unknown_names})
+
+# --- Ingredient Suggestions ---
+@app.route('/api/zutaten/vorschlag')
+def api_suggest_ingredients():
+    """Ingredient name suggestions for the form: ?q=toma[&limit=10]"""
+    query_text = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    if not query_text:
+        return jsonify({'q': query_text, 'vorschlaege': []})
+    update_zutat_vorschlaege()
+    return jsonify({
+        'q': query_text,
+        'vorschlaege': [
+            {'id': v.zutat_id, 'name': v.name, 'aehnlichkeit': v.aehnlichkeit}
+            for v in zutat_vorschlaege.suggest(query_text, limit=limit)
+        ]
+    })
+
+# --- JSON API v1 (see schnittstelle.py) ---
+# Each *_request() parses the query string and returns load(connection) -> data,
+# so the same request runs on the session here or on the async engine (asgi.py).
+def api_error(message, status=400):
+    """Aborts with a JSON error body."""
+    abort(make_response(jsonify({'fehler': message}), status))
+
+def api_json(data):
+    return app.response_class(schnittstelle.dumps(data), mimetype='application/json')
+
+def api_fields(ressource, standard=None):
+    try:
+        return schnittstelle.parse_fields(request.args.get('fields'), ressource, standard)
+    except ValueError as e:
+        api_error(str(e))
+
+def api_list_request(ressource, name):
+    """?ids=1,2,3 loads those records in one query, otherwise one page (?nach=, ?pro_seite=)."""
+    if request.args.get('ids'):
+        try:
+            ids = schnittstelle.parse_ids(request.args['ids'], app.config['API_MAX_IDS'])
+        except ValueError as e:
+            api_error(str(e))
+        felder = api_fields(ressource, standard=tuple(ressource.felder))
+
+        def load_ids(connection):
+            items, fehlend = schnittstelle.by_ids(connection, ressource, felder, ids)
+            return {name: items, 'fehlend': fehlend}
+        return load_ids
+
+    felder = api_fields(ressource)
+    page_size = get_page_size()
+    after = request.args.get('nach')
+    after_values = decode_cursor(after) if after else None
+
+    def load_page(connection):
+        items, last = schnittstelle.page(connection, ressource, felder, page_size, after=after_values)
+        return {name: items, 'nach': encode_cursor(*last) if last else None}
+    return load_page
+
+def api_v1_recipes_request():
+    return api_list_request(schnittstelle.REZEPTE, 'rezepte')
+
+def api_v1_recipe_request(rezept_id):
+    felder = api_fields(schnittstelle.REZEPTE, standard=tuple(schnittstelle.REZEPTE.felder))
+
+    def load(connection):
+        items, _ = schnittstelle.by_ids(connection, schnittstelle.REZEPTE, felder, [rezept_id])
+        if not items:
+            api_error('Rezept nicht gefunden.', 404)
+        return items[0]
+    return load
+
+def api_v1_ingredients_request():
+    return api_list_request(schnittstelle.ZUTATEN, 'zutaten')
+
+def api_v1_categories_request():
+    felder = api_fields(schnittstelle.KATEGORIEN)
+    return lambda connection: {'kategorien': schnittstelle.all_items(connection, schnittstelle.KATEGORIEN, felder)}
+
+@app.route('/api/v1/rezepte')
+def api_v1_recipes():
+    """Recipes: ?ids=1,2,3 or one page (?nach=, ?pro_seite=); ?fields=name,portionen,zutaten selects fields."""
+    return api_json(api_v1_recipes_request()(db.session.connection()))
+
+@app.route('/api/v1/rezepte/<int:rezept_id>')
+def api_v1_recipe(rezept_id):
+    """One recipe, all fields unless ?fields= is given."""
+    return api_json(api_v1_recipe_request(rezept_id)(db.session.connection()))
+
+@app.route('/api/v1/zutaten')
+def api_v1_ingredients():
+    """Ingredients: ?ids= or one page ordered by name."""
+    return api_json(api_v1_ingredients_request()(db.session.connection()))
+
+@app.route('/api/v1/kategorien')
+def api_v1_categories():
+    """All categories; ?fields=id,name,anzahl_rezepte adds the number of recipes."""
+    return api_json(api_v1_categories_request()(db.session.connection()))
+
+# --- Bulk Import/Export (JSON Lines) ---
+@app.route('/api/rezepte/export')
+def api_export_recipes():
+    """Streams all recipes as JSON Lines, one recipe per line."""
+    def generate():
+        with db.engine.connect() as connection:
+            yield from austausch.export_lines(connection)
+
+    return app.response_class(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=rezepte.jsonl'}
+    )
+
+@app.route('/api/rezepte/import', methods=['POST'])
+@writes
+def api_import_recipes():
+    """Imports recipes from a JSON Lines request body, read as a stream."""
+    try:
+        # Buffered: the raw WSGI stream would read lines byte by byte
+        lines = io.BufferedReader(request.stream, buffer_size=64 * 1024)
+        bericht = austausch.import_lines(db.engine, lines, zutaten_cache=zutat_namen_cache)
+        if bericht.zuordnungen:
+            enqueue_similar_recipes()
+            db.session.commit()
+    except Exception as e:
+        app.logger.error(f"Fehler beim Rezept-Import: {e}")
+        return jsonify({'fehler': [f'Import abgebrochen: {e}']}), 500
+    return jsonify({
+        'rezepte': bericht.rezepte,
+        'zuordnungen': bericht.zuordnungen,
+        'neue_zutaten': bericht.neue_zutaten,
+        'fehler_anzahl': bericht.fehler_anzahl,
+        'fehler': bericht.fehler,
+        'sekunden': round(bericht.sekunden, 3),
+        'rezepte_pro_sekunde': round(austausch.durchsatz(bericht), 1)
+    })
+
 # --- Shopping List Logic ---
 def calculate_shopping_list(recipe_ids, desired_portions):
     """
     Calculates an aggregated shopping list for selected recipes and portions.
+    Loads flat columns with two queries and aggregates them array-based
+    (see einkaufsliste.py) instead of walking ORM objects.
     Returns a tuple: (aggregated_dict, warnings_list)
     """
-    aggregated_list = defaultdict(lambda: defaultdict(float))
-    scaling_warnings = []
-
     if not recipe_ids or desired_portions is None or desired_portions < 1:
         return None, ["Keine Rezepte ausgewählt oder ungültige Portionsanzahl."]
 
-    # Efficiently load selected recipes with their ingredients and ingredient names
-    selected_recipes = Rezept.query.filter(Rezept.id.in_(recipe_ids)).options(
-        joinedload(Rezept.zutaten_association).joinedload(RezeptZutat.zutat)
+    recipes = db.session.execute(
+        db.select(Rezept.id, Rezept.name, Rezept.portionen)
+        .where(Rezept.id.in_(recipe_ids))
+        .order_by(Rezept.id)
     ).all()
 
-    if not selected_recipes:
+    if not recipes:
         return None, ["Ausgewählte Rezepte nicht gefunden."]
 
-    for rezept in selected_recipes:
-        recipe_portions = rezept.portionen
-        scaling_factor = 1.0
-
-        # Calculate scaling factor if possible
-        if recipe_portions and recipe_portions > 0:
-            scaling_factor = float(desired_portions) / float(recipe_portions)
-        elif desired_portions > 0: # Only warn if scaling was requested but not possible
-             scaling_warnings.append(
-                 f"Für Rezept '{rezept.name}' konnte keine Skalierung vorgenommen werden "
-                 f"(Standardportionen nicht definiert oder 0). Mengen wurden nicht angepasst."
-            )
+    factors, scaling_warnings = einkaufsliste.scaling_factors(recipes, desired_portions)
 
-        # Aggregate ingredients
-        for assoc in rezept.zutaten_association:
-            zutat_name = assoc.zutat.name.strip().capitalize()
-            # Treat None or empty string as the same 'unit' category
-            einheit = (assoc.einheit or '').strip().lower()
-            menge = assoc.menge
-            scaled_menge = menge # Default: original quantity
-
-            # Scale quantity if numeric and scaling is possible
-            if isinstance(menge, (int, float)) and scaling_factor != 1.0:
-                scaled_menge = menge * scaling_factor
-            elif not isinstance(menge, (int, float)) and menge is not None:
-                # Handle non-numeric quantities like "Prise", "n.B." -> Treat as string
-                scaled_menge = str(menge) # Ensure it's a string
-
-            # Aggregate: Sum numeric values, handle strings separately
-            if isinstance(scaled_menge, (int, float)):
-                aggregated_list[zutat_name][einheit] += scaled_menge
-            elif isinstance(scaled_menge, str):
-                # Combine unit and string amount for uniqueness, e.g., " ('1 Prise')"
-                # Using a tuple key ensures 'Prise' and '1 Prise' are distinct if needed
-                string_key = f"{einheit} ({scaled_menge})"
-                aggregated_list[zutat_name][string_key] = aggregated_list[zutat_name].get(string_key, 0) + 1
-            else: # Menge was None
-                 # Ensure the Zutat/Einheit exists in the list even with 0 amount initially
-                 aggregated_list[zutat_name][einheit] = aggregated_list[zutat_name].get(einheit, 0.0)
-
-
-    # Convert defaultdicts back to regular dicts for the template
-    final_list = {k: dict(v) for k, v in aggregated_list.items()}
+    # Core execution on the connection: plain rows, no ORM result processing
+    connection = db.session.connection()
+    rows = connection.execute(
+        db.select(
+            RezeptZutat.rezept_id, RezeptZutat.zutat_id,
+            RezeptZutat.menge_basis, RezeptZutat.dimension,
+            RezeptZutat.menge, RezeptZutat.einheit
+        )
+        .where(RezeptZutat.rezept_id.in_(factors.keys()))
+        .order_by(RezeptZutat.rezept_id)
+    ).all()
+    rezept_ids, zutat_ids, mengen_basis, dimensionen, mengen, einheit_texte = \
+        list(zip(*rows)) or [(), (), (), (), (), ()]
+    if None in dimensionen:
+        # Rows not yet normalised (see backfill_normalized_quantities)
+        mengen_basis, dimensionen = map(list, (mengen_basis, dimensionen))
+        for i, dimension in enumerate(dimensionen):
+            if dimension is None:
+                mengen_basis[i], dimensionen[i] = einheiten.normalize(mengen[i], einheit_texte[i])
+    # Ingredient names once per distinct ingredient instead of a join per row
+    zutat_names = dict(connection.execute(
+        db.select(Zutat.id, Zutat.name).where(Zutat.id.in_(set(zutat_ids)))
+    ).all()) if rows else {}
+
+    final_list = einkaufsliste.aggregate(
+        rezept_ids, zutat_ids, mengen_basis, dimensionen, factors, zutat_names
+    )
     return final_list, scaling_warnings
 
 
+def shopping_list_cache_key(recipe_ids, desired_portions):
+    """
+    Key of a computed list: portions, the ingredient data version and the
+    sorted recipe ids with their versions (edits bump them, e.g. new portions).
+    """
+    rows = db.session.execute(
+        db.select(Rezept.id, Rezept.version).where(Rezept.id.in_(recipe_ids)).order_by(Rezept.id)
+    ).all()
+    auswahl = ','.join(f'{row.id}.{row.version or 0}' for row in rows)
+    digest = hashlib.sha1(auswahl.encode('ascii')).hexdigest()
+    return f'einkaufsliste:{desired_portions}:v{get_datenstand("rezept_zutat")}:{digest}'
+
+def cached_shopping_list(recipe_ids, desired_portions):
+    """
+    The shopping list sorted once (see einkaufsliste.sort_items) and its
+    warnings, served from einkaufs_cache for a repeated selection.
+    Returns a tuple: (cache_key, items or None, warnings_list)
+    """
+    key = shopping_list_cache_key(recipe_ids, desired_portions)
+    cached = einkaufs_cache.get(key)
+    if cached is not None:
+        return key, cached['posten'], cached['hinweise']
+    aggregated_list, warnings = calculate_shopping_list(recipe_ids, desired_portions)
+    if aggregated_list is None:
+        return key, None, warnings
+    posten = einkaufsliste.sort_items(aggregated_list)
+    einkaufs_cache.set(key, {'posten': posten, 'hinweise': warnings})
+    return key, posten, warnings
+
+# Export formats: art -> (mimetype, generator of byte chunks)
+EXPORT_FORMATE = {
+    'csv': ('text/csv', lambda posten, titel, hinweise: ausgabe.csv_chunks(posten)),
+    'txt': ('text/plain', ausgabe.text_chunks),
+    'pdf': ('application/pdf', ausgabe.pdf_chunks),
+}
+
+def shopping_list_download(art, posten, titel, hinweise, dateiname, etag):
+    """Streams a sorted shopping list in one of EXPORT_FORMATE as a download (304 if unchanged)."""
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        mimetype, chunks = EXPORT_FORMATE[art]
+        response = app.response_class(chunks(posten, titel, hinweise), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{dateiname}.{art}"'
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/einkaufsliste', methods=['GET', 'POST'])
 def shopping_list():
     """Displays the shopping list based on selected recipes."""
     aggregated_list = None
     desired_portions_display = None # For displaying in template
+    selected_ids = []
 
     if request.method == 'POST':
         selected_ids = request.form.getlist('recipe_ids', type=int)
@@ -508,7 +1565,7 @@ def shopping_list():
             flash('Bitte gib eine gültige Anzahl an Portionen (mindestens 1) an.', 'warning')
             return redirect(url_for('index'))
 
-        aggregated_list, warnings = calculate_shopping_list(selected_ids, desired_portions)
+        _, aggregated_list, warnings = cached_shopping_list(selected_ids, desired_portions)
 
         for warning in warnings:
             flash(warning, 'warning')
@@ -523,9 +1580,185 @@ def shopping_list():
     return render_template(
         'einkaufsliste.html',
         shopping_list=aggregated_list,
-        desired_portions=desired_portions_display # Pass desired portions
+        desired_portions=desired_portions_display, # Pass desired portions
+        recipe_ids=selected_ids
     )
 
+@app.route('/einkaufsliste/export.<any(csv, txt, pdf):art>', methods=['GET', 'POST'])
+def export_shopping_list(art):
+    """
+    Downloads the shopping list as CSV, text or PDF. Recipes and portions come
+    from the form of the list page (recipe_ids, desired_portions) or the query
+    string (?ids=1,2,3&portionen=4).
+    """
+    if request.method == 'POST':
+        selected_ids = list(dict.fromkeys(request.form.getlist('recipe_ids', type=int)))
+        desired_portions = request.form.get('desired_portions', type=int)
+    else:
+        try:
+            selected_ids = schnittstelle.parse_ids(request.args.get('ids', ''), app.config['SHOPPING_LIST_MAX_IDS'])
+        except ValueError:
+            abort(400)
+        desired_portions = request.args.get('portionen', type=int)
+    if not selected_ids or len(selected_ids) > app.config['SHOPPING_LIST_MAX_IDS'] \
+            or desired_portions is None or desired_portions < 1:
+        abort(400)
+
+    key, posten, warnings = cached_shopping_list(selected_ids, desired_portions)
+    if posten is None:
+        abort(404)
+    titel = f'Einkaufsliste für {desired_portions} Portionen ({len(selected_ids)} Rezepte)'
+    etag = hashlib.sha1(key.encode('ascii')).hexdigest()
+    return shopping_list_download(art, posten, titel, warnings, 'einkaufsliste', etag)
+
+# --- Weekly Meal Plans ---
+def plan_choices_query():
+    return db.select(Wochenplan.id, Wochenplan.name).order_by(Wochenplan.name, Wochenplan.id)
+
+def get_plan_choices():
+    """Returns (id, name) of all meal plans for select fields."""
+    return [tuple(row) for row in db.session.execute(plan_choices_query())]
+
+@app.route('/wochenplan', methods=['GET', 'POST'])
+@writes
+def meal_plans():
+    """Lists the weekly meal plans and creates new ones."""
+    from formulare import PlanForm
+    form = PlanForm()
+    if form.validate_on_submit():
+        plan = Wochenplan(name=form.name.data.strip())
+        db.session.add(plan)
+        try:
+            db.session.commit()
+            flash(f'Wochenplan "{plan.name}" angelegt.', 'success')
+            return redirect(url_for('meal_plan', plan_id=plan.id))
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Fehler beim Anlegen des Wochenplans: {e}")
+            flash(f'Fehler beim Anlegen des Wochenplans: {e}', 'danger')
+    return render_template('wochenplaene.html', plans=get_plan_choices(), form=form)
+
+@app.route('/wochenplan/<int:plan_id>')
+def meal_plan(plan_id):
+    """Shows a plan by day and meal together with its materialised shopping list."""
+    plan = Wochenplan.query.get_or_404(plan_id)
+    connection = db.session.connection()
+    eintraege = wochenplan.entries(connection, plan_id)
+    raster = {}
+    for eintrag in eintraege:
+        raster.setdefault((eintrag.tag, eintrag.mahlzeit), []).append(eintrag)
+    return render_template(
+        'wochenplan.html',
+        plan=plan,
+        raster=raster,
+        anzahl=len(eintraege),
+        tage=wochenplan.TAGE,
+        mahlzeiten=wochenplan.MAHLZEITEN,
+        shopping_list=einkaufsliste.sort_items(wochenplan.shopping_list(connection, plan_id))
+    )
+
+@app.route('/rezept/<int:rezept_id>/einplanen', methods=['POST'])
+@writes
+def plan_recipe(rezept_id):
+    """Adds a recipe to a weekly meal plan; only its contribution is booked."""
+    from formulare import PlanEintragForm
+    if db.session.get(Rezept, rezept_id) is None:
+        abort(404)
+    form = PlanEintragForm()
+    form.plan.choices = get_plan_choices()
+    if form.validate_on_submit():
+        try:
+            wochenplan.add_entry(
+                db.session.connection(), form.plan.data, form.tag.data,
+                form.mahlzeit.data, rezept_id, form.portionen.data
+            )
+            db.session.commit()
+            flash(f'Rezept für {wochenplan.TAGE[form.tag.data]} eingeplant.', 'success')
+            return redirect(url_for('meal_plan', plan_id=form.plan.data))
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Fehler beim Einplanen von Rezept {rezept_id}: {e}")
+            flash(f'Fehler beim Einplanen: {e}', 'danger')
+    else:
+        for field, errors in form.errors.items():
+            for error in errors:
+                label = getattr(getattr(form, field, None), 'label', None)
+                field_name = label.text if label else field
+                flash(f"Fehler im Feld '{field_name}': {error}", 'danger')
+    return redirect(url_for('recipe_detail', rezept_id=rezept_id))
+
+@app.route('/wochenplan/<int:plan_id>/eintrag/<int:eintrag_id>/portionen', methods=['POST'])
+@writes
+def change_plan_portions(plan_id, eintrag_id):
+    """Changes the portions of a plan entry; only the difference is booked."""
+    portionen = request.form.get('portionen', type=int)
+    if portionen is None or portionen < 1:
+        flash('Bitte gib eine gültige Anzahl an Portionen (mindestens 1) an.', 'warning')
+        return redirect(url_for('meal_plan', plan_id=plan_id))
+    try:
+        if wochenplan.change_portions(db.session.connection(), plan_id, eintrag_id, portionen):
+            db.session.commit()
+            flash('Portionen geändert.', 'success')
+        else:
+            flash('Planeintrag nicht gefunden.', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Fehler beim Ändern von Planeintrag {eintrag_id}: {e}")
+        flash(f'Fehler beim Ändern der Portionen: {e}', 'danger')
+    return redirect(url_for('meal_plan', plan_id=plan_id))
+
+@app.route('/wochenplan/<int:plan_id>/eintrag/<int:eintrag_id>/loeschen', methods=['POST'])
+@writes
+def delete_plan_entry(plan_id, eintrag_id):
+    """Removes a recipe from a plan; its contribution is taken back."""
+    try:
+        if wochenplan.remove_entry(db.session.connection(), plan_id, eintrag_id):
+            db.session.commit()
+            flash('Rezept aus dem Plan entfernt.', 'success')
+        else:
+            flash('Planeintrag nicht gefunden.', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Fehler beim Entfernen von Planeintrag {eintrag_id}: {e}")
+        flash(f'Fehler beim Entfernen aus dem Plan: {e}', 'danger')
+    return redirect(url_for('meal_plan', plan_id=plan_id))
+
+@app.route('/wochenplan/<int:plan_id>/loeschen', methods=['POST'])
+@writes
+def delete_meal_plan(plan_id):
+    """Deletes a plan with its entries and shopping list."""
+    plan = Wochenplan.query.get_or_404(plan_id)
+    plan_name = plan.name
+    try:
+        wochenplan.delete_plan(db.session.connection(), plan_id)
+        db.session.commit()
+        flash(f'Wochenplan "{plan_name}" wurde gelöscht.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Fehler beim Löschen von Wochenplan {plan_id}: {e}")
+        flash(f'Fehler beim Löschen des Wochenplans: {e}', 'danger')
+    return redirect(url_for('meal_plans'))
+
+@app.route('/wochenplan/<int:plan_id>/export')
+def export_meal_plan(plan_id):
+    """Downloads a plan with its entries and shopping list as JSON."""
+    daten = wochenplan.export_plan(db.session.connection(), plan_id)
+    if daten is None:
+        abort(404)
+    response = make_response(json.dumps(daten, ensure_ascii=False, indent=2))
+    response.mimetype = 'application/json'
+    response.headers['Content-Disposition'] = f'attachment; filename="wochenplan-{plan_id}.json"'
+    return response
+
+@app.route('/wochenplan/<int:plan_id>/einkaufsliste.<any(csv, txt, pdf):art>')
+def export_meal_plan_list(plan_id, art):
+    """Downloads the materialised shopping list of a plan as CSV, text or PDF."""
+    plan = db.get_or_404(Wochenplan, plan_id)
+    posten = einkaufsliste.sort_items(wochenplan.shopping_list(db.session.connection(), plan_id))
+    # The list is read from plan_posten, which every plan change rewrites
+    etag = hashlib.sha1(json.dumps([plan.name, posten]).encode('utf-8')).hexdigest()
+    return shopping_list_download(art, posten, f'Einkaufsliste: {plan.name}', (), f'wochenplan-{plan_id}', etag)
+
 # --- Database Initialization ---
 def create_default_categories():
     """Creates default categories if the category table is empty."""
@@ -548,16 +1781,317 @@ def create_default_categories():
         app.logger.error(f"Fehler beim Erstellen der Standardkategorien: {e}")
         db.session.rollback()
 
-# Create tables and default categories within app context
-# This ensures it runs after the app and db are configured
-with app.app_context():
+def upgrade_schema():
+    """
+    Adds schema objects that db.create_all() skips for already existing tables:
+    new nullable columns and indexes. Safe to run multiple times.
+    """
+    inspector = db.inspect(db.engine)
+    added_columns = set()
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    connection.execute(db.text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    ))
+                    app.logger.info(f"Spalte {table.name}.{column.name} hinzugefügt.")
+                    added_columns.add(f'{table.name}.{column.name}')
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.begin() as connection:
+            connection.execute(db.text(
+                "INSERT OR IGNORE INTO datenstand (name, version) VALUES ('rezept_zutat', 0), ('rezept', 0)"
+            ))
+            # Above every version handed out so far, also in databases from before the counter
+            connection.execute(db.text("""
+                INSERT OR IGNORE INTO datenstand (name, version)
+                SELECT 'rezept_version', COALESCE(MAX(version), 0) FROM rezept
+            """))
+            for trigger in DATENSTAND_TRIGGERS:
+                connection.execute(db.text(trigger))
+            if suche.install(connection):
+                app.logger.info("Volltextindex für die Suche angelegt.")
+            if kategorien.install(connection):
+                app.logger.info("Rezepte pro Kategorie gezählt.")
+            if aehnlichkeit.install(connection):
+                auftraege.enqueue(connection, 'aehnliche_rezepte', {}, schluessel='offen')
+                app.logger.info("Ähnliche Rezepte zur Berechnung vorgemerkt (flask rezepte worker).")
+    if 'zutat.name_norm' in added_columns:
+        updated = backfill_zutat_names()
+        app.logger.info(f"{updated} Zutatennamen normalisiert.")
+    if 'rezept_zutat.dimension' in added_columns:
+        # Data migration for the new normalised quantity columns
+        updated = backfill_normalized_quantities()
+        app.logger.info(f"{updated} Rezeptzutaten normalisiert.")
+
+def backfill_normalized_quantities(batch_size=1000):
+    """
+    Fills menge_basis/dimension for rezept_zutat rows written before the
+    columns existed. Works in keyset-ordered batches with one short write
+    transaction each, so concurrent requests are not blocked for long.
+    Returns the number of updated rows.
+    """
+    table = RezeptZutat.__table__
+    last_key = (0, 0)
+    updated = 0
+    while True:
+        batch = db.session.execute(
+            db.select(table.c.rezept_id, table.c.zutat_id, table.c.menge,
+                      table.c.einheit, table.c.dimension)
+            .where(tuple_(table.c.rezept_id, table.c.zutat_id) > last_key)
+            .order_by(table.c.rezept_id, table.c.zutat_id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_key = (batch[-1].rezept_id, batch[-1].zutat_id)
+        params = []
+        for row in batch:
+            if row.dimension is None:
+                menge_basis, dimension = einheiten.normalize(row.menge, row.einheit)
+                params.append({
+                    'r_id': row.rezept_id, 'z_id': row.zutat_id,
+                    'menge_basis': menge_basis, 'dimension': dimension
+                })
+        if params:
+            db.session.execute(
+                table.update()
+                .where(table.c.rezept_id == db.bindparam('r_id'))
+                .where(table.c.zutat_id == db.bindparam('z_id'))
+                .values(menge_basis=db.bindparam('menge_basis'), dimension=db.bindparam('dimension')),
+                params
+            )
+            updated += len(params)
+        db.session.commit()
+    return updated
+
+def backfill_zutat_names(batch_size=1000):
+    """
+    Fills zutat.name_norm for rows written before the column existed, in
+    id-ordered batches with one short transaction each. Returns the number
+    of updated rows.
+    """
+    table = Zutat.__table__
+    last_id = 0
+    updated = 0
+    while True:
+        batch = db.session.execute(
+            db.select(table.c.id, table.c.name)
+            .where(table.c.id > last_id, table.c.name_norm.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('z_id'))
+            .values(name_norm=db.bindparam('name_norm')),
+            [{'z_id': row.id, 'name_norm': zutatnamen.normalize_name(row.name)} for row in batch]
+        )
+        updated += len(batch)
+        db.session.commit()
+    zutat_namen_cache.clear()
+    return updated
+
+def migrate_legacy_images():
+    """
+    Renames images stored under pre-hash names (uuid4().hex) to content-addressed
+    names, merging duplicates, so /bilder serves them. Their variants are queued
+    for the worker. Idempotent; returns the number of renamed files.
+    """
+    folder = app.config['UPLOAD_FOLDER']
+    filenames = db.session.scalars(
+        db.select(Rezept.image_file).where(Rezept.image_file.isnot(None)).distinct()
+    ).all()
+    renamed = 0
+    for filename in filenames:
+        path = os.path.join(folder, filename)
+        if bilder.is_content_addressed(filename) or not os.path.exists(path):
+            continue
+        with open(path, 'rb') as stream:
+            new_filename = bilder.store_upload(stream, folder, os.path.splitext(filename)[1])
+        db.session.execute(
+            db.update(Rezept).where(Rezept.image_file == filename).values(image_file=new_filename)
+        )
+        enqueue_job('bild_varianten', {'datei': new_filename})
+        db.session.commit()
+        delete_image(filename)
+        renamed += 1
+    return renamed
+
+def init_db():
+    """
+    Creates the upload folder, missing tables, indexes and triggers and the
+    default categories, and migrates images from older versions. Idempotent; runs once per deployment (flask rezepte
+    init-db), not on import, so workers start without touching the database.
+    """
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    moved = bilder.move_folder(LEGACY_UPLOAD_FOLDER, app.config['UPLOAD_FOLDER'])
+    if moved:
+        app.logger.info(f"{moved} Bilder aus {LEGACY_UPLOAD_FOLDER} nach {app.config['UPLOAD_FOLDER']} verschoben.")
+    # Create tables if they don't exist. Safe to run multiple times.
+    db.create_all()
+    # Bring existing databases up to date (indexes added after table creation)
+    upgrade_schema()
+    # Populate default categories if needed
+    create_default_categories()
+    # Images from before content addressing are not served under their old names
+    renamed = migrate_legacy_images()
+    if renamed:
+        app.logger.info(f"{renamed} ältere Bilder auf inhaltsadressierte Namen umgestellt.")
+
+
+# --- CLI Commands ---
+@app.cli.group('rezepte')
+def rezepte_cli():
+    """Verwaltungsbefehle für Rezeptor."""
+
+@rezepte_cli.command('init-db')
+def init_db_command():
+    """Legt Upload-Ordner, Tabellen, Indizes und Standardkategorien an (idempotent)."""
+    init_db()
+    click.echo("Datenbank initialisiert.")
+
+@rezepte_cli.command('rebuild-search')
+def rebuild_search_command():
+    """Baut den Volltextindex der Suche komplett neu auf."""
+    with db.engine.begin() as connection:
+        suche.install(connection)
+        count = suche.rebuild(connection)
+    click.echo(f"Suchindex neu aufgebaut: {count} Rezepte.")
+
+@rezepte_cli.command('rebuild-kategorien')
+def rebuild_categories_command():
+    """Zählt die Rezepte pro Kategorie und Kochzeit neu (Reparatur der Facetten)."""
+    with db.engine.begin() as connection:
+        count = kategorien.rebuild(connection)
+    click.echo(f"Facetten neu gezählt: {count} Zähler.")
+
+@rezepte_cli.command('rebuild-aehnliche')
+def rebuild_similar_command():
+    """Berechnet die ähnlichen Rezepte aller Rezepte neu (aktuelle idf-Gewichte)."""
+    if not aehnlichkeit.is_available():
+        raise click.ClickException("NumPy ist nicht installiert.")
+    started = time.perf_counter()
+    count = update_similar_recipes(voll=True)
+    click.echo(f"Ähnliche Rezepte neu berechnet: {count} Paare in {time.perf_counter() - started:.1f} s.")
+
+@rezepte_cli.command('backfill-units')
+@click.option('--batch-size', default=1000, show_default=True, help='Zeilen pro Transaktion.')
+def backfill_units_command(batch_size):
+    """Normalisiert Mengen/Einheiten bestehender Rezeptzutaten (Migration)."""
+    updated = backfill_normalized_quantities(batch_size=batch_size)
+    click.echo(f"{updated} Rezeptzutaten normalisiert.")
+
+@rezepte_cli.command('rebuild-plans')
+def rebuild_plans_command():
+    """Berechnet die Einkaufslisten aller Wochenpläne neu (Reparatur)."""
+    with db.engine.begin() as connection:
+        count = wochenplan.rebuild(connection)
+    click.echo(f"Einkaufslisten von {count} Wochenplänen neu berechnet.")
+
+@rezepte_cli.command('backfill-names')
+@click.option('--batch-size', default=1000, show_default=True, help='Zeilen pro Transaktion.')
+def backfill_names_command(batch_size):
+    """Füllt die normalisierten Zutatennamen bestehender Zutaten (Migration)."""
+    updated = backfill_zutat_names(batch_size=batch_size)
+    click.echo(f"{updated} Zutatennamen normalisiert.")
+
+@rezepte_cli.command('backfill-images')
+@click.option('--force', is_flag=True, help='Auch vorhandene Varianten neu erzeugen.')
+def backfill_images_command(force):
+    """Erzeugt fehlende Bildvarianten (Thumbnails/WebP) für bestehende Rezeptbilder."""
+    if not bilder.is_available():
+        raise click.ClickException("Pillow mit WebP-Unterstützung ist nicht installiert.")
+    folder = app.config['UPLOAD_FOLDER']
+    filenames = db.session.scalars(
+        db.select(Rezept.image_file).where(Rezept.image_file.isnot(None)).distinct()
+    ).all()
+    created = failed = 0
+    for filename in filenames:
+        if not os.path.exists(os.path.join(folder, filename)):
+            continue
+        if not force and len(bilder.existing_variants(folder, filename, 'liste')) \
+                + len(bilder.existing_variants(folder, filename, 'detail')) == len(bilder.all_variants()):
+            continue
+        try:
+            bilder.generate_variants(folder, filename)
+            created += 1
+        except Exception as e:
+            failed += 1
+            click.echo(f"Fehler bei {filename}: {e}", err=True)
+    click.echo(f"Varianten erzeugt für {created} Bilder ({failed} Fehler).")
+
+@rezepte_cli.command('dedupe-images')
+def dedupe_images_command():
+    """Stellt ältere Bilder auf inhaltsadressierte Namen um und entfernt Duplikate (läuft auch in init-db)."""
+    renamed = migrate_legacy_images()
+    click.echo(f"{renamed} Bilder umbenannt, Varianten für den Worker eingeplant.")
+
+@rezepte_cli.command('worker')
+@click.option('--threads', type=int, help='Gleichzeitige Aufträge (Standard: JOB_WORKER_THREADS).')
+@click.option('--einmal', is_flag=True, help='Nur die fälligen Aufträge abarbeiten und beenden.')
+def worker_command(threads, einmal):
+    """Arbeitet die Hintergrundaufträge ab (Bildvarianten, Aufräumen von Dateien)."""
+    worker = create_worker(threads)
+    click.echo(f"Worker gestartet ({worker.threads} Threads).", err=True)
     try:
-        # Create tables if they don't exist. Safe to run multiple times.
-        db.create_all()
-        # Populate default categories if needed
-        create_default_categories()
-    except Exception as e:
-        app.logger.error(f"Fehler bei der Datenbankinitialisierung: {e}")
+        erledigt, fehler = worker.run(einmal=einmal)
+    except KeyboardInterrupt:
+        # Running jobs were finished on the way out; a killed worker's jobs are retaken after their lock expires
+        raise click.Abort()
+    click.echo(f"{erledigt} Aufträge erledigt, {fehler} fehlgeschlagene Versuche.")
+
+@rezepte_cli.command('auftraege')
+@click.option('--wiederholen', is_flag=True, help='Fehlgeschlagene Aufträge erneut einplanen.')
+def jobs_command(wiederholen):
+    """Zeigt die Hintergrundaufträge pro Art und Status und die letzten Fehler."""
+    with db.engine.begin() as connection:
+        if wiederholen:
+            click.echo(f"{auftraege.retry_failed(connection)} Aufträge erneut eingeplant.")
+        for (art, status), anzahl in auftraege.counts(connection).items():
+            click.echo(f"{art:20} {status:15} {anzahl}")
+        for row in auftraege.failed(connection):
+            click.echo(f"#{row.id} {row.art} {row.daten} ({row.versuche} Versuche): {row.fehler}", err=True)
+
+@rezepte_cli.command('import')
+@click.argument('datei', type=click.File('rb'))
+@click.option('--batch-size', default=austausch.BATCH_SIZE, show_default=True, help='Rezepte pro Transaktion.')
+def import_command(datei, batch_size):
+    """Importiert Rezepte aus einer JSON-Lines-Datei ('-' für stdin)."""
+    def fortschritt(bericht):
+        click.echo(f"{bericht.rezepte} Rezepte ... ({austausch.durchsatz(bericht):.0f} Rezepte/s)", err=True)
+
+    bericht = austausch.import_lines(
+        db.engine, datei, batch_size=batch_size, on_batch=fortschritt, zutaten_cache=zutat_namen_cache
+    )
+    if bericht.zuordnungen:
+        enqueue_similar_recipes()
+        db.session.commit()
+    for meldung in bericht.fehler:
+        click.echo(meldung, err=True)
+    click.echo(
+        f"{bericht.rezepte} Rezepte mit {bericht.zuordnungen} Zutaten importiert "
+        f"({bericht.neue_zutaten} neue Zutaten, {bericht.fehler_anzahl} fehlerhafte Zeilen) "
+        f"in {bericht.sekunden:.1f} s, {austausch.durchsatz(bericht):.0f} Rezepte/s."
+    )
+
+@rezepte_cli.command('export')
+@click.argument('datei', type=click.File('w', encoding='utf-8'), default='-')
+def export_command(datei):
+    """Exportiert alle Rezepte als JSON Lines (Standard: stdout)."""
+    count = 0
+    with db.engine.connect() as connection:
+        for line in austausch.export_lines(connection):
+            datei.write(line)
+            count += 1
+    click.echo(f"{count} Rezepte exportiert.", err=True)
 
 
 # --- Server Start ---
@@ -565,4 +2099,9 @@ if __name__ == '__main__':
     # Debug mode should be False in production!
     # Use environment variable for debug setting
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+    # Der Entwicklungsserver richtet die Datenbank selbst ein; Produktion: flask rezepte init-db
+    with app.app_context():
+        init_db()
+        # Ohne eigenen Worker-Prozess arbeitet der Entwicklungsserver die Aufträge in einem Thread ab
+        threading.Thread(target=create_worker().run, daemon=True, name='auftraege').start()
     app.run(debug=debug_mode, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
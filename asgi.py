@@ -0,0 +1,355 @@
+"""
+ASGI-Einstiegspunkt für leselastigen Betrieb.
+
+    uvicorn asgi:anwendung --workers 4
+
+Die Übersicht (``/``), die Rezeptdetails (``/rezept/<id>``) und die JSON-APIs
+(``/api/rezepte/<id>``, ``/api/v1/...``) laufen als Coroutinen im Event-Loop und
+lesen über eine asynchrone Engine (aiosqlite) mit begrenztem Pool
+(``ASGI_DB_POOL_SIZE``). Gerendert wird mit denselben Templates, Fragmenten
+und Cache-Schlüsseln wie in der Flask-App; Sitzung, Flash-Nachrichten und
+CSRF-Token kommen aus einem Flask-Request-Kontext, der für den Request
+aufgebaut wird.
+
+Alle anderen Routen gehen an die unveränderte Flask-App, in einem begrenzten
+Thread-Pool (``ASGI_THREADS``). Den Request-Body liest aber vorher der
+Event-Loop vollständig ein: bis ``ASGI_SPOOL_BYTES`` im Speicher, darüber in
+eine temporäre Datei (geschrieben in einem Hilfsthread). Ein langsamer Upload
+belegt so nur eine Coroutine und keinen der Threads; ``MAX_CONTENT_LENGTH``
+wird schon beim Einlesen geprüft.
+"""
+
+import asyncio
+import io
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, jsonify, render_template, request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+import aehnlichkeit
+import datenbank
+import kategorien
+from app import (
+    app, profiler, seiten_cache, Datenstand, Rezept,
+    api_json, api_v1_categories_request, api_v1_ingredients_request, api_v1_recipe_request,
+    api_v1_recipes_request,
+    decode_cursor, get_page_size, index_cache_key, page_etag, page_not_modified, page_response,
+    plan_choices_query, recipe_cache_key, recipe_detail_query, recipe_fragments, recipe_json,
+    recipe_list_fragments, recipe_list_query, recipe_list_result, render_fragments, render_recipe_page
+)
+
+
+class KoerperZuGross(Exception):
+    pass
+
+
+class VerbindungGetrennt(Exception):
+    pass
+
+
+async def read_body(receive, spool_bytes, max_bytes=None):
+    """
+    Reads the whole request body into a file object (in memory up to
+    spool_bytes, then a temporary file written off the event loop).
+    """
+    body = io.BytesIO()
+    size = 0
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise VerbindungGetrennt()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise KoerperZuGross()
+            if chunk:
+                if isinstance(body, io.BytesIO) and size > spool_bytes:
+                    datei = await asyncio.to_thread(tempfile.TemporaryFile)
+                    await asyncio.to_thread(datei.write, body.getvalue())
+                    body = datei
+                if isinstance(body, io.BytesIO):
+                    body.write(chunk)
+                else:
+                    await asyncio.to_thread(body.write, chunk)
+            if not message.get('more_body', False):
+                break
+    except BaseException:
+        body.close()
+        raise
+    body.seek(0)
+    return body, size
+
+
+def wsgi_environ(scope, body, content_length=None):
+    """The WSGI environ of an ASGI http scope, with body as wsgi.input."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    if content_length is not None:
+        # The body has been read completely, chunked uploads included
+        environ['CONTENT_LENGTH'] = str(content_length)
+    return environ
+
+
+def _headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+def run_wsgi(wsgi_app, environ, send):
+    """Runs a WSGI app in the calling (worker) thread; send() blocks until the chunk is handed over."""
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status[:] = [int(status_line.split(' ', 1)[0]), _headers(headers)]
+
+    started = False
+    iterable = wsgi_app(environ, start_response)
+    try:
+        for chunk in iterable:
+            if not chunk:
+                continue
+            if not started:
+                send({'type': 'http.response.start', 'status': status[0], 'headers': status[1]})
+                started = True
+            send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    if not started:
+        send({'type': 'http.response.start', 'status': status[0], 'headers': status[1]})
+    send({'type': 'http.response.body', 'body': b''})
+
+
+class AsgiAnwendung:
+    """ASGI app: async handlers for the read-heavy routes, the Flask app in a thread pool for the rest."""
+
+    def __init__(self, flask_app, pool_size=10, threads=8, spool_bytes=1024 * 1024):
+        self.flask_app = flask_app
+        self.spool_bytes = spool_bytes
+        self.engine = create_async_engine(
+            datenbank.async_url(flask_app.config['SQLALCHEMY_DATABASE_URI']),
+            **datenbank.async_engine_options(pool_size)
+        )
+        # Same pragmas as the sync engine; the async routes only read
+        datenbank.install(
+            self.engine.sync_engine,
+            datenbank.get_profil(flask_app.config['SQLITE_PROFILE'], flask_app.config['SQLITE_PRAGMAS'])
+        )
+        if profiler is not None:
+            profiler.watch_engine(self.engine.sync_engine)
+        self.threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='flask')
+        # Flask endpoint -> coroutine handling it
+        self.handlers = {
+            'index': self.index,
+            'recipe_detail': self.recipe_detail,
+            'api_recipe': self.api_recipe,
+            'api_v1_recipes': self.api_v1(api_v1_recipes_request),
+            'api_v1_recipe': self.api_v1(api_v1_recipe_request),
+            'api_v1_ingredients': self.api_v1(api_v1_ingredients_request),
+            'api_v1_categories': self.api_v1(api_v1_categories_request),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            handler = self._match(scope)
+            if handler is not None:
+                await self.run_async(handler, scope, send)
+            else:
+                await self.run_sync(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                self.threads.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _match(self, scope):
+        if scope['method'] not in ('GET', 'HEAD'):
+            return None
+        adapter = self.flask_app.url_map.bind_to_environ(wsgi_environ(scope, None))
+        try:
+            endpoint, _ = adapter.match()
+        except HTTPException:
+            return None  # 404, 405 and redirects are answered by Flask
+        return self.handlers.get(endpoint)
+
+    async def run_async(self, handler, scope, send):
+        """Runs a coroutine handler inside a Flask request context, like Flask's full_dispatch_request."""
+        flask_app = self.flask_app
+        ctx = flask_app.request_context(wsgi_environ(scope, io.BytesIO()))
+        error = None
+        try:
+            ctx.push()
+            try:
+                try:
+                    rv = flask_app.preprocess_request()
+                    if rv is None:
+                        rv = await handler(**request.view_args)
+                except Exception as e:
+                    rv = flask_app.handle_user_exception(e)
+                response = flask_app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = flask_app.handle_exception(e)
+            body = b'' if scope['method'] == 'HEAD' else response.get_data()
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': _headers(response.headers.items()),
+            })
+            await send({'type': 'http.response.body', 'body': body})
+        finally:
+            ctx.pop(error)
+
+    async def run_sync(self, scope, receive, send):
+        """Reads the body on the event loop, then runs the Flask app in the thread pool."""
+        try:
+            body, size = await read_body(receive, self.spool_bytes, self.flask_app.config.get('MAX_CONTENT_LENGTH'))
+        except VerbindungGetrennt:
+            return
+        except KoerperZuGross:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8'), (b'connection', b'close')]})
+            await send({'type': 'http.response.body', 'body': 'Die Anfrage ist zu groß.'.encode('utf-8')})
+            return
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        try:
+            await loop.run_in_executor(
+                self.threads, run_wsgi, self.flask_app, wsgi_environ(scope, body, size), send_from_thread
+            )
+        finally:
+            body.close()
+
+    # --- Cache ---
+    async def _cache(self, function, *args):
+        # The in-process cache answers at once; a shared one (Redis, SQLite) is I/O
+        backend = seiten_cache.backend
+        if backend is None or backend.name == 'speicher':
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    async def _fragments(self, key, load, render):
+        """Async counterpart of app.cached_fragments: load() is awaited only on a miss."""
+        teile = await self._cache(seiten_cache.get, key)
+        if teile is None:
+            daten = await load()
+            teile, cacheable = render_fragments(lambda: render(daten))
+            if cacheable:
+                await self._cache(seiten_cache.set, key, teile)
+        return teile
+
+    # --- Handlers ---
+    async def _load_recipe(self, rezept_id):
+        async with AsyncSession(self.engine) as session:
+            rezept = (await session.execute(recipe_detail_query(rezept_id))).unique().scalar_one_or_none()
+        if rezept is None:
+            abort(404)
+        return rezept
+
+    async def index(self):
+        page_size = get_page_size()
+        after = request.args.get('nach')
+        before = request.args.get('vor')
+        async with self.engine.connect() as connection:
+            version = (await connection.execute(
+                select(Datenstand.version).where(Datenstand.name == 'rezept')
+            )).scalar() or 0
+        etag = page_etag('index', version, page_size, after, before)
+        if page_not_modified(etag):
+            return page_response(etag)
+
+        after_values = decode_cursor(after) if after else None
+        before_values = decode_cursor(before) if before else None
+
+        async def load():
+            async with self.engine.connect() as connection:
+                rows = (await connection.execute(
+                    recipe_list_query(page_size, after=after_values, before=before_values)
+                )).all()
+                facetten = await connection.run_sync(kategorien.facets)
+            return recipe_list_result(rows, page_size, after=after_values, before=before_values), facetten
+
+        def render(daten):
+            page, facetten = daten
+            return recipe_list_fragments(page, page_size, facetten)
+
+        teile = await self._fragments(index_cache_key(version, page_size, after, before), load, render)
+        return page_response(etag, render_template('index.html', teile=teile))
+
+    async def recipe_detail(self, rezept_id):
+        async with self.engine.connect() as connection:
+            row = (await connection.execute(select(Rezept.version).where(Rezept.id == rezept_id))).first()
+            if row is None:
+                abort(404)
+            plan_choices = [tuple(choice) for choice in await connection.execute(plan_choices_query())]
+            aehnliche = await connection.run_sync(
+                aehnlichkeit.similar, rezept_id, self.flask_app.config['SIMILAR_RECIPES']
+            )
+        etag = page_etag('rezept', rezept_id, row.version, plan_choices, aehnliche)
+        if page_not_modified(etag):
+            return page_response(etag)
+        teile = await self._fragments(
+            recipe_cache_key(rezept_id, row.version),
+            lambda: self._load_recipe(rezept_id),
+            recipe_fragments
+        )
+        return page_response(etag, render_recipe_page(rezept_id, teile, plan_choices, aehnliche))
+
+    async def api_recipe(self, rezept_id):
+        return jsonify(recipe_json(await self._load_recipe(rezept_id)))
+
+    def api_v1(self, parse_request):
+        """Handler for a JSON API v1 endpoint: parses like the Flask view, loads on the async engine."""
+        async def handler(**view_args):
+            load = parse_request(**view_args)
+            async with self.engine.connect() as connection:
+                data = await connection.run_sync(load)
+            return api_json(data)
+        return handler
+
+
+anwendung = AsgiAnwendung(
+    app,
+    pool_size=app.config['ASGI_DB_POOL_SIZE'],
+    threads=app.config['ASGI_THREADS'],
+    spool_bytes=app.config['ASGI_SPOOL_BYTES']
+)
@@ -0,0 +1,222 @@
+"""
+Dauerhafte Auftragswarteschlange für langsame Nebenwirkungen schreibender Routen.
+
+Ein Auftrag ist eine Zeile in ``auftrag``: Art (z.B. 'bild_varianten'),
+Daten als JSON und ein Schlüssel. Routen legen Aufträge mit enqueue() in ihrer
+eigenen Transaktion an; sichtbar werden sie also genau mit dem Commit, ein
+Rollback nimmt sie wieder mit. Solange ein Auftrag derselben Art mit demselben
+Schlüssel noch wartet, ersetzt ein neuer nur dessen Daten (ein Eintrag pro
+Datei statt einer Flut gleicher Aufträge).
+
+Der Worker (``flask rezepte worker``) holt fällige Aufträge mit einem einzigen
+UPDATE ... RETURNING ab und markiert sie dabei als 'laeuft' mit einer
+Sperrfrist; mehrere Worker-Prozesse bekommen so nie denselben Auftrag.
+Stirbt ein Worker, läuft die Sperrfrist ab und ein anderer übernimmt.
+Erledigte Aufträge werden gelöscht, fehlerhafte mit exponentiellem Backoff
+erneut eingeplant und nach max_versuche als 'fehlgeschlagen' liegen gelassen.
+
+Weil ein Auftrag mehrfach laufen kann (Absturz nach getaner Arbeit, abgelaufene
+Sperre), müssen alle Handler idempotent sein: Sie prüfen den aktuellen Zustand
+und tun nichts, wenn es nichts mehr zu tun gibt.
+
+Das Modul kennt die Flask-App nicht; Handler und Kontext werden übergeben.
+"""
+
+import contextlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+Auftrag = namedtuple('Auftrag', ['id', 'art', 'daten', 'versuche'])
+
+
+def enqueue(connection, art, daten, schluessel=None, verzoegerung=0):
+    """
+    Adds a job in the caller's transaction. schluessel defaults to the JSON of
+    daten; a waiting job with the same art and schluessel gets the new daten.
+    """
+    daten_json = json.dumps(daten, sort_keys=True)
+    jetzt = time.time()
+    connection.execute(text("""
+        INSERT INTO auftrag (art, schluessel, daten, status, versuche, faellig_ab, angelegt)
+        VALUES (:art, :schluessel, :daten, 'wartend', 0, :faellig_ab, :jetzt)
+        ON CONFLICT (art, schluessel) WHERE status = 'wartend' DO UPDATE SET daten = excluded.daten
+    """), {
+        'art': art, 'schluessel': daten_json if schluessel is None else schluessel, 'daten': daten_json,
+        'faellig_ab': jetzt + verzoegerung, 'jetzt': jetzt
+    })
+
+
+def claim(connection, anzahl, sperrfrist):
+    """
+    Takes up to anzahl due jobs (waiting, or running with an expired lock)
+    and locks them for sperrfrist seconds. Returns a list of Auftrag.
+    """
+    jetzt = time.time()
+    rows = connection.execute(text("""
+        UPDATE auftrag SET status = 'laeuft', versuche = versuche + 1, gesperrt_bis = :bis
+        WHERE id IN (
+            SELECT id FROM auftrag
+            WHERE (status = 'wartend' AND faellig_ab <= :jetzt) OR (status = 'laeuft' AND gesperrt_bis < :jetzt)
+            ORDER BY faellig_ab, id
+            LIMIT :anzahl
+        )
+        RETURNING id, art, daten, versuche
+    """), {'jetzt': jetzt, 'bis': jetzt + sperrfrist, 'anzahl': anzahl})
+    return [Auftrag(row.id, row.art, json.loads(row.daten), row.versuche) for row in rows]
+
+
+# Nur der Worker, dem der Auftrag gerade gehört (gleiche Versuchsnummer), schließt ihn ab
+_EIGENER = "id = :id AND versuche = :versuche AND status = 'laeuft'"
+
+
+def complete(connection, auftrag):
+    """Removes a finished job."""
+    connection.execute(text(f'DELETE FROM auftrag WHERE {_EIGENER}'),
+                       {'id': auftrag.id, 'versuche': auftrag.versuche})
+
+
+def backoff(versuche, basis, maximum):
+    """Delay before the next attempt: basis * 2^(versuche-1), capped, with jitter (50-100 %)."""
+    return min(maximum, basis * 2 ** (versuche - 1)) * random.uniform(0.5, 1.0)
+
+
+def fail(connection, auftrag, fehler, verzoegerung=None):
+    """
+    Records a failed attempt. With a verzoegerung the job waits again that long,
+    without it is left as 'fehlgeschlagen'.
+    """
+    params = {'id': auftrag.id, 'versuche': auftrag.versuche, 'fehler': fehler[:2000]}
+    if verzoegerung is None:
+        connection.execute(text(f"""
+            UPDATE auftrag SET status = 'fehlgeschlagen', gesperrt_bis = NULL, fehler = :fehler WHERE {_EIGENER}
+        """), params)
+        return
+    geaendert = connection.execute(text(f"""
+        UPDATE OR IGNORE auftrag SET status = 'wartend', gesperrt_bis = NULL, fehler = :fehler,
+            faellig_ab = :faellig_ab
+        WHERE {_EIGENER}
+    """), dict(params, faellig_ab=time.time() + verzoegerung)).rowcount
+    if not geaendert:
+        # A newer job with the same key is already waiting and does the same work
+        complete(connection, auftrag)
+
+
+def retry_failed(connection):
+    """Lets all failed jobs wait again with fresh attempts. Returns their number."""
+    anzahl = connection.execute(text("""
+        UPDATE OR IGNORE auftrag SET status = 'wartend', versuche = 0, faellig_ab = :jetzt
+        WHERE status = 'fehlgeschlagen'
+    """), {'jetzt': time.time()}).rowcount
+    # Failed jobs that already have a waiting twin
+    connection.execute(text("DELETE FROM auftrag WHERE status = 'fehlgeschlagen'"))
+    return anzahl
+
+
+def counts(connection):
+    """Number of jobs per (art, status)."""
+    return {
+        (row.art, row.status): row.anzahl for row in connection.execute(text(
+            'SELECT art, status, COUNT(*) AS anzahl FROM auftrag GROUP BY art, status ORDER BY art, status'
+        ))
+    }
+
+
+def failed(connection, limit=20):
+    """The most recent failed jobs as (id, art, daten, versuche, fehler)."""
+    return connection.execute(text("""
+        SELECT id, art, daten, versuche, fehler FROM auftrag
+        WHERE status = 'fehlgeschlagen' ORDER BY id DESC LIMIT :limit
+    """), {'limit': limit}).all()
+
+
+class Worker:
+    """
+    Runs jobs with up to `threads` handlers at once. handlers maps an art to a
+    callable taking the job's daten; an exception counts as a failed attempt.
+    kontext is entered around every handler call (e.g. app.app_context).
+    """
+
+    def __init__(self, engine, handlers, threads=4, sperrfrist=300, max_versuche=5,
+                 backoff_basis=2.0, backoff_max=600.0, intervall=1.0, kontext=contextlib.nullcontext):
+        self.engine = engine
+        self.handlers = handlers
+        self.threads = threads
+        self.sperrfrist = sperrfrist
+        self.max_versuche = max_versuche
+        self.backoff_basis = backoff_basis
+        self.backoff_max = backoff_max
+        self.intervall = intervall
+        self.kontext = kontext
+
+    def run(self, stop=None, einmal=False):
+        """
+        Processes jobs until stop (a threading.Event) is set; with einmal only
+        until no job is due any more. Running jobs are finished before returning.
+        Returns (erledigt, fehler).
+        """
+        stop = stop or threading.Event()
+        laufend = set()
+        ergebnisse = []
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='auftraege') as executor:
+            while not stop.is_set():
+                fertig = {future for future in laufend if future.done()}
+                laufend -= fertig
+                ergebnisse.extend(future.result() for future in fertig)
+                frei = self.threads - len(laufend)
+                neue = self._claim(frei) if frei else []
+                laufend.update(executor.submit(self.run_job, auftrag) for auftrag in neue)
+                if neue:
+                    continue
+                if einmal and not laufend:
+                    break
+                if laufend:
+                    wait(laufend, timeout=self.intervall, return_when=FIRST_COMPLETED)
+                else:
+                    stop.wait(self.intervall)
+        ergebnisse.extend(future.result() for future in laufend)
+        return ergebnisse.count(True), ergebnisse.count(False)
+
+    def _claim(self, anzahl):
+        try:
+            with self.engine.begin() as connection:
+                return claim(connection, anzahl, self.sperrfrist)
+        except Exception:
+            # E.g. database locked beyond busy_timeout; try again next round
+            log.exception("Aufträge konnten nicht abgeholt werden")
+            return []
+
+    def run_job(self, auftrag):
+        """Runs one claimed job and records the outcome. Returns True on success."""
+        try:
+            handler = self.handlers.get(auftrag.art)
+            if handler is None:
+                raise LookupError(f"Unbekannte Auftragsart: {auftrag.art}")
+            with self.kontext():
+                handler(auftrag.daten)
+        except Exception as e:
+            erneut = auftrag.versuche < self.max_versuche
+            log.warning("Auftrag %s (%s) fehlgeschlagen, Versuch %d/%d: %s",
+                        auftrag.id, auftrag.art, auftrag.versuche, self.max_versuche, e,
+                        exc_info=not erneut)
+            verzoegerung = backoff(auftrag.versuche, self.backoff_basis, self.backoff_max) if erneut else None
+            self._record(fail, auftrag, f'{type(e).__name__}: {e}', verzoegerung)
+            return False
+        self._record(complete, auftrag)
+        return True
+
+    def _record(self, funktion, auftrag, *args):
+        try:
+            with self.engine.begin() as connection:
+                funktion(connection, auftrag, *args)
+        except Exception:
+            # The lock expires and the job runs again; handlers are idempotent
+            log.exception("Ergebnis von Auftrag %s konnte nicht gespeichert werden", auftrag.id)
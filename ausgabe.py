@@ -0,0 +1,145 @@
+"""
+Export der Einkaufsliste als CSV, Text und PDF.
+
+Eingabe ist die einmal sortierte Liste ``[(zutat, [(einheit, menge), ...])]``
+(siehe einkaufsliste.sort_items). Alle Formate sind Generatoren, die Bytes in
+Blöcken liefern: Die Antwort wird gestreamt, ohne die ganze Datei vorher im
+Speicher zusammenzusetzen.
+
+Das PDF wird ohne Bibliothek geschrieben: reiner Text in Helvetica
+(WinAnsiEncoding, d.h. Umlaute und ß gehen, andere Zeichen werden zu '?'),
+A4, eine Seite pro ZEILEN_PRO_SEITE Zeilen. Die Byte-Offsets für die
+Querverweistabelle werden beim Schreiben mitgezählt.
+"""
+
+import csv
+import io
+import textwrap
+
+BLOCK_ZEILEN = 500
+
+# A4 in Punkt, 10 pt Schrift mit 14 pt Zeilenabstand
+SEITE_BREITE, SEITE_HOEHE = 595, 842
+RAND = 56
+SCHRIFTGROESSE = 10
+ZEILENABSTAND = 14
+ZEILEN_PRO_SEITE = (SEITE_HOEHE - 2 * RAND) // ZEILENABSTAND
+
+
+def format_menge(menge, einheit):
+    """Quantity and unit as shown on the page ('1.5 kg', '3 Stück', '- g', '(benötigt)')."""
+    if isinstance(menge, (int, float)) and menge > 0:
+        text = str(int(menge)) if menge % 1 == 0 else f'{menge:.1f}'
+    elif isinstance(menge, str):
+        text = menge
+    elif einheit:
+        text = '-'
+    else:
+        return '(benötigt)'
+    return f'{text} {einheit}' if einheit else text
+
+
+def _blocks(zeilen, encoding='utf-8'):
+    """Joins str lines into encoded blocks of BLOCK_ZEILEN lines."""
+    block = []
+    for zeile in zeilen:
+        block.append(zeile)
+        if len(block) >= BLOCK_ZEILEN:
+            yield ''.join(block).encode(encoding)
+            block = []
+    if block:
+        yield ''.join(block).encode(encoding)
+
+
+def csv_chunks(posten):
+    """CSV with one row per ingredient and unit: zutat,menge,einheit (menge with '.' as decimal point)."""
+    def zeilen():
+        puffer = io.StringIO()
+        writer = csv.writer(puffer, lineterminator='\r\n')
+        # BOM, damit Tabellenprogramme die Datei als UTF-8 lesen
+        yield '\ufeff'
+        writer.writerow(['zutat', 'menge', 'einheit'])
+        for zutat, mengen in posten:
+            for einheit, menge in mengen:
+                writer.writerow([zutat, round(menge, 3) if isinstance(menge, (int, float)) else menge or '', einheit])
+                yield puffer.getvalue()
+                puffer.seek(0)
+                puffer.truncate()
+        yield puffer.getvalue()
+    return _blocks(zeilen())
+
+
+def text_lines(posten, titel, hinweise=()):
+    """The list as aligned plain text, one line (with line break) per item."""
+    breite = min(max((len(zutat) for zutat, _ in posten), default=0), 40)
+    yield titel + '\n'
+    yield '=' * len(titel) + '\n'
+    yield '\n'
+    for zutat, mengen in posten:
+        for i, (einheit, menge) in enumerate(mengen):
+            yield f"{zutat if i == 0 else '':<{breite}}  {format_menge(menge, einheit)}\n"
+    if hinweise:
+        yield '\n'
+        yield 'Hinweise:\n'
+        for hinweis in hinweise:
+            for zeile in textwrap.wrap(hinweis, 90, initial_indent='- ', subsequent_indent='  '):
+                yield zeile + '\n'
+
+
+def text_chunks(posten, titel, hinweise=()):
+    return _blocks(text_lines(posten, titel, hinweise))
+
+
+def _pdf_text(zeile):
+    """A PDF literal string in WinAnsiEncoding (cp1252)."""
+    raw = zeile.encode('cp1252', errors='replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def pdf_chunks(posten, titel, hinweise=()):
+    """The text lines of text_lines() as an A4 PDF, yielded one page at a time."""
+    offsets = {}
+    position = 0
+    seiten = []
+
+    def objekt(nummer, inhalt):
+        nonlocal position
+        offsets[nummer] = position
+        daten = b'%d 0 obj\n' % nummer + inhalt + b'\nendobj\n'
+        position += len(daten)
+        return daten
+
+    kopf = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(kopf)
+    # 1 Katalog, 2 Seitenbaum, 3 Schrift; danach je Seite Inhalt und Seite
+    yield kopf + objekt(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    def seite(zeilen):
+        nummer = 4 + 2 * len(seiten)
+        inhalt = [b'BT /F1 %d Tf %d TL %d %d Td' % (SCHRIFTGROESSE, ZEILENABSTAND, RAND, SEITE_HOEHE - RAND)]
+        inhalt.extend(_pdf_text(zeile) + b" '" for zeile in zeilen)
+        inhalt.append(b'ET')
+        stream = b'\n'.join(inhalt)
+        seiten.append(nummer + 1)
+        return objekt(nummer, b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream') + objekt(
+            nummer + 1,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 3 0 R >> >> >>' % (SEITE_BREITE, SEITE_HOEHE, nummer)
+        )
+
+    zeilen = []
+    for zeile in text_lines(posten, titel, hinweise):
+        zeilen.append(zeile.rstrip('\n'))
+        if len(zeilen) == ZEILEN_PRO_SEITE:
+            yield seite(zeilen)
+            zeilen = []
+    if zeilen or not seiten:
+        yield seite(zeilen)
+
+    kinder = b' '.join(b'%d 0 R' % nummer for nummer in seiten)
+    ende = objekt(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kinder, len(seiten)))
+    ende += objekt(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    anzahl = max(offsets) + 1
+    xref = [b'xref\n0 %d\n' % anzahl, b'0000000000 65535 f \n']
+    xref.extend(b'%010d 00000 n \n' % offsets[nummer] for nummer in range(1, anzahl))
+    yield ende + b''.join(xref) + b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (anzahl, position)
@@ -0,0 +1,316 @@
+"""
+Import und Export von Rezepten im JSON-Lines-Format (eine Zeile pro Rezept).
+
+Beispielzeile::
+
+    {"name": "Pfannkuchen", "anleitung": "...", "portionen": 4, "kategorie": "Dessert",
+     "zutaten": [{"name": "Mehl", "menge": 250, "einheit": "g"}]}
+
+Beide Richtungen arbeiten mit konstantem Speicher: Der Import liest die Zeilen
+als Strom und schreibt sie in Blöcken (eine Transaktion pro Block, Inserts per
+``executemany``), der Export liest die Rezepte über einen gestreamten Cursor
+und gibt sie Zeile für Zeile aus. Zutaten werden über ``zutatnamen.resolve``
+(Cache normalisierter Name -> ID) aufgelöst; neue Zutaten werden pro Block
+gesammelt angelegt.
+"""
+
+import itertools
+import json
+import math
+import time
+from collections import namedtuple
+
+from sqlalchemy import bindparam, text
+
+import einheiten
+import zutatnamen
+
+# Rezepte pro Block (Transaktion)
+BATCH_SIZE = 1000
+# Höchstzahl an Fehlermeldungen im Bericht (gezählt werden alle)
+MAX_FEHLER = 100
+# Wertebereich von SQLite-INTEGER
+MAX_INT = 2 ** 63
+
+REZEPT_SPALTEN = ('id', 'name', 'beschreibung', 'anleitung', 'kochzeit_minuten',
+                  'portionen', 'quelle', 'category_id')
+ZUORDNUNG_SPALTEN = ('rezept_id', 'zutat_id', 'menge', 'einheit', 'menge_basis', 'dimension')
+
+Bericht = namedtuple('Bericht', [
+    'rezepte', 'zuordnungen', 'neue_zutaten', 'fehler_anzahl', 'fehler', 'sekunden'
+])
+
+
+def durchsatz(bericht):
+    """Imported recipes per second."""
+    return bericht.rezepte / bericht.sekunden if bericht.sekunden else 0.0
+
+
+def name_key(name):
+    """Case-insensitive lookup key of a category name."""
+    return name.strip().lower()
+
+
+def _optional_text(value, feld):
+    """A non-empty string or None; anything but a string is an error."""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"'{feld}' muss ein Text sein")
+    return value
+
+
+def _optional_int(value, feld):
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+            raise ValueError
+    except (ValueError, OverflowError):  # int() of NaN / Infinity
+        raise ValueError(f"'{feld}' muss eine ganze Zahl sein")
+    if not -MAX_INT <= value < MAX_INT:
+        raise ValueError(f"'{feld}' ist zu groß")
+    return int(value)
+
+
+def _optional_menge(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        try:
+            menge = float(value.replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"Ungültige Menge: {value!r}")
+    elif isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Ungültige Menge: {value!r}")
+    else:
+        try:
+            menge = float(value)
+        except OverflowError:  # int beyond the float range
+            raise ValueError(f"Ungültige Menge: {value!r}")
+    if not math.isfinite(menge):
+        raise ValueError(f"Ungültige Menge: {value!r}")
+    return menge
+
+
+def parse_line(line):
+    """
+    Parses and validates one JSON line. Returns the recipe dict with cleaned
+    values, or None for blank lines. Raises ValueError for invalid input.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    if not line.strip():
+        return None
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Kein gültiges JSON: {e.msg}")
+    if not isinstance(data, dict):
+        raise ValueError("Jede Zeile muss ein JSON-Objekt sein")
+    # Every field is type-checked here: a wrong type must skip the line, not fail the block's insert
+    name = (_optional_text(data.get('name'), 'name') or '').strip()
+    anleitung = (_optional_text(data.get('anleitung'), 'anleitung') or '').strip()
+    if not name or not anleitung:
+        raise ValueError("'name' und 'anleitung' sind Pflichtfelder")
+
+    zutaten_liste = data.get('zutaten') or []
+    if not isinstance(zutaten_liste, list):
+        raise ValueError("'zutaten' muss eine Liste sein")
+    zutaten = []
+    for zutat in zutaten_liste:
+        if not isinstance(zutat, dict):
+            raise ValueError("Jede Zutat muss ein JSON-Objekt sein")
+        zutat_name = (_optional_text(zutat.get('name'), 'zutaten.name') or '').strip()
+        if not zutat_name:
+            raise ValueError("Jede Zutat braucht einen 'name'")
+        einheit = (_optional_text(zutat.get('einheit'), 'zutaten.einheit') or '').strip()
+        zutaten.append({
+            'name': zutat_name,
+            'menge': _optional_menge(zutat.get('menge')),
+            'einheit': einheit or None
+        })
+
+    return {
+        'name': name[:150],
+        'anleitung': anleitung,
+        'beschreibung': _optional_text(data.get('beschreibung'), 'beschreibung'),
+        'kochzeit_minuten': _optional_int(data.get('kochzeit_minuten'), 'kochzeit_minuten'),
+        'portionen': _optional_int(data.get('portionen'), 'portionen'),
+        'quelle': _optional_text(data.get('quelle'), 'quelle'),
+        'kategorie': (_optional_text(data.get('kategorie'), 'kategorie') or '').strip() or None,
+        'zutaten': zutaten,
+    }
+
+
+def _load_categories(connection):
+    """Category cache lower(name) -> id (few rows, loaded once per import)."""
+    cache = {}
+    for row_id, name in connection.execute(text('SELECT id, name FROM category')):
+        cache.setdefault(name_key(name), row_id)
+    return cache
+
+
+def _create_categories(connection, names, cache):
+    """Inserts the categories that are not cached yet and adds their ids to the cache."""
+    neue = {}
+    for name in names:
+        key = name_key(name)
+        if key not in cache and key not in neue:
+            neue[key] = name.strip()
+    if not neue:
+        return
+    connection.execute(text('INSERT INTO category (name) VALUES (:name)'),
+                       [{'name': name} for name in neue.values()])
+    select = text('SELECT id, name FROM category WHERE name IN :names').bindparams(
+        bindparam('names', expanding=True)
+    )
+    for row_id, name in connection.execute(select, {'names': list(neue.values())}):
+        cache[name_key(name)] = row_id
+
+
+def _insert_many(connection, table, columns, rows):
+    """executemany of plain tuples on the driver, without per-row parameter processing."""
+    marker = '?' if connection.dialect.paramstyle == 'qmark' else '%s'
+    connection.exec_driver_sql(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([marker] * len(columns))})",
+        rows
+    )
+
+
+def _write_batch(connection, batch, zutaten_cache, kategorien_cache):
+    """Writes one block of parsed recipes. Returns (links, new ingredients)."""
+    _create_categories(connection, [r['kategorie'] for r in batch if r['kategorie']], kategorien_cache)
+    zutaten, neue_zutaten = zutatnamen.resolve(
+        connection, [z['name'] for r in batch for z in r['zutaten']], zutaten_cache
+    )
+
+    # Explicit ids, read inside the block's transaction: a concurrent writer
+    # makes the commit fail instead of interleaving ids
+    next_id = connection.execute(text('SELECT COALESCE(MAX(id), 0) FROM rezept')).scalar() + 1
+    rezepte, links = [], []
+    for rezept_id, rezept in enumerate(batch, start=next_id):
+        kategorie = rezept['kategorie']
+        rezepte.append((
+            rezept_id, rezept['name'], rezept['beschreibung'], rezept['anleitung'],
+            rezept['kochzeit_minuten'], rezept['portionen'], rezept['quelle'],
+            kategorien_cache[name_key(kategorie)] if kategorie else None
+        ))
+        seen = set()
+        for zutat in rezept['zutaten']:
+            zutat_id = zutaten[zutatnamen.normalize_name(zutat['name'])][0]
+            if zutat_id in seen:
+                continue  # Same ingredient twice in one recipe: keep the first
+            seen.add(zutat_id)
+            links.append((rezept_id, zutat_id, zutat['menge'], zutat['einheit'])
+                         + einheiten.normalize(zutat['menge'], zutat['einheit']))
+
+    # Links first: the search triggers then write each recipe's index row
+    # once on the rezept insert instead of once per ingredient.
+    if links:
+        _insert_many(connection, 'rezept_zutat', ZUORDNUNG_SPALTEN, links)
+    _insert_many(connection, 'rezept', REZEPT_SPALTEN, rezepte)
+    return len(links), neue_zutaten
+
+
+def import_lines(engine, lines, batch_size=BATCH_SIZE, on_batch=None, zutaten_cache=None):
+    """
+    Imports recipes from an iterable of JSON lines (str or bytes) in blocks of
+    batch_size, one transaction per block. Invalid lines are skipped and
+    reported. on_batch(bericht) is called after every committed block.
+    zutaten_cache is the process-wide zutatnamen.NamenCache, if any.
+    Returns a Bericht.
+    """
+    started = time.perf_counter()
+    rezepte = zuordnungen = neue_zutaten = fehler_anzahl = 0
+    fehler = []
+
+    def bericht():
+        return Bericht(rezepte, zuordnungen, neue_zutaten, fehler_anzahl, fehler,
+                       time.perf_counter() - started)
+
+    def parsed():
+        nonlocal fehler_anzahl
+        for line_no, line in enumerate(lines, start=1):
+            try:
+                rezept = parse_line(line)
+            except ValueError as e:
+                fehler_anzahl += 1
+                if len(fehler) < MAX_FEHLER:
+                    fehler.append(f"Zeile {line_no}: {e}")
+                continue
+            if rezept is not None:
+                yield rezept
+
+    if zutaten_cache is None:
+        zutaten_cache = zutatnamen.NamenCache()
+    with engine.connect() as connection:
+        kategorien_cache = _load_categories(connection)
+
+    records = parsed()
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            break
+        # On errors the block is rolled back and the exception ends the import
+        try:
+            with engine.begin() as connection:
+                links, neue = _write_batch(connection, batch, zutaten_cache, kategorien_cache)
+        except Exception:
+            zutaten_cache.clear()  # May hold ids of the rolled back block
+            raise
+        rezepte += len(batch)
+        zuordnungen += links
+        neue_zutaten += neue
+        if on_batch is not None:
+            on_batch(bericht())
+    return bericht()
+
+
+_EXPORT_REZEPTE_SQL = text("""
+    SELECT r.id, r.name, r.beschreibung, r.anleitung, r.kochzeit_minuten, r.portionen,
+           r.quelle, c.name
+    FROM rezept r
+    LEFT JOIN category c ON c.id = r.category_id
+    ORDER BY r.id
+""")
+
+_EXPORT_ZUTATEN_SQL = text("""
+    SELECT rz.rezept_id, z.name, rz.menge, rz.einheit
+    FROM rezept_zutat rz
+    JOIN zutat z ON z.id = rz.zutat_id
+    ORDER BY rz.rezept_id
+""")
+
+
+def export_lines(connection, yield_per=1000):
+    """
+    Yields one JSON line per recipe (with trailing newline), ordered by id.
+    Recipes and their ingredients are streamed from two cursors in id order
+    and merged on the fly, so recipe texts are not repeated per ingredient row.
+    """
+    streamed = connection.execution_options(yield_per=yield_per)
+    rezepte = streamed.execute(_EXPORT_REZEPTE_SQL)
+    zutaten = itertools.groupby(streamed.execute(_EXPORT_ZUTATEN_SQL), key=lambda row: row[0])
+    next_group = next(zutaten, None)
+    for rezept_id, name, beschreibung, anleitung, kochzeit, portionen, quelle, kategorie in rezepte:
+        # Skip links of recipes that no longer exist (no foreign key enforcement)
+        while next_group is not None and next_group[0] < rezept_id:
+            next_group = next(zutaten, None)
+        rezept_zutaten = []
+        if next_group is not None and next_group[0] == rezept_id:
+            rezept_zutaten = [
+                {'name': row[1], 'menge': row[2], 'einheit': row[3]} for row in next_group[1]
+            ]
+            next_group = next(zutaten, None)
+        yield json.dumps({
+            'id': rezept_id,
+            'name': name,
+            'beschreibung': beschreibung,
+            'anleitung': anleitung,
+            'kochzeit_minuten': kochzeit,
+            'portionen': portionen,
+            'quelle': quelle,
+            'kategorie': kategorie,
+            'zutaten': rezept_zutaten,
+        }, ensure_ascii=False) + '\n'
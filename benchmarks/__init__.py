@@ -0,0 +1,9 @@
+"""
+Benchmarks für Rezeptor.
+
+Jeder Benchmark legt eine eigene, synthetische SQLite-Datenbank in einem
+temporären Verzeichnis an; die mitgelieferte ``rezepte.db`` wird nie angefasst.
+Aufruf z.B.::
+
+    python -m benchmarks.bench_suche --rezepte 100000
+"""
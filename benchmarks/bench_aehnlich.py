@@ -0,0 +1,137 @@
+"""
+Benchmark der ähnlichen Rezepte (aehnlichkeit.py).
+
+Auf einer synthetischen Datenbank (Standard: 100.000 Rezepte mit 5–40 Zutaten)
+wird gemessen:
+
+- der komplette Neuaufbau (``flask rezepte rebuild-aehnliche``), getrennt nach
+  Laden der Vektoren, Rechnen und Speichern, mit Spitzen-RSS,
+- die inkrementelle Neuberechnung nach Zutatenänderungen an 1, 10 und 100
+  Rezepten (wie der Auftrag 'aehnliche_rezepte' des Workers),
+- das Nachschlagen für die Detailseite (ein Lesezugriff) im Vergleich zum
+  Berechnen pro Request ohne gespeichertes Ergebnis.
+
+    python -m benchmarks.bench_aehnlich --rezepte 100000 --ausgabe aehnlich.json
+"""
+
+import argparse
+import json
+import random
+import resource
+import sqlite3
+import statistics
+import time
+
+from benchmarks import daten
+
+
+def rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stopwatch(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def change_ingredients(path, rezept_ids, rng):
+    """Swaps one ingredient of each recipe directly in SQL; the triggers mark the recipes."""
+    with sqlite3.connect(path) as connection:
+        zutat_ids = [row[0] for row in connection.execute('SELECT id FROM zutat')]
+        for rezept_id in rezept_ids:
+            connection.execute(
+                'DELETE FROM rezept_zutat WHERE rowid = (SELECT rowid FROM rezept_zutat WHERE rezept_id = ? LIMIT 1)',
+                (rezept_id,)
+            )
+            connection.execute(
+                'INSERT OR IGNORE INTO rezept_zutat (rezept_id, zutat_id) VALUES (?, ?)',
+                (rezept_id, rng.choice(zutat_ids))
+            )
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return {'p50_ms': statistics.median(timings), 'p99_ms': timings[int(len(timings) * 0.99) - 1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rezepte', type=int, default=100000)
+    parser.add_argument('--zutaten', type=int, default=2000)
+    parser.add_argument('-k', type=int, default=8, help='Ähnliche Rezepte pro Rezept.')
+    parser.add_argument('--abfragen', type=int, default=2000)
+    parser.add_argument('--ausgabe', help='Ergebnisse zusätzlich als JSON speichern.')
+    args = parser.parse_args()
+
+    path = daten.create_database()
+    counts = daten.fill(path, rezepte=args.rezepte, min_zutaten=5, max_zutaten=40, zutaten=args.zutaten, kategorien=20)
+    print(f"Daten: {counts}")
+
+    import aehnlichkeit
+    from app import app, db
+
+    if not aehnlichkeit.is_available():
+        raise SystemExit("NumPy ist nicht installiert.")
+    rng = random.Random(1)
+    ergebnisse = {}
+    with app.app_context():
+        rss_vorher = rss_mib()
+        with db.engine.connect() as connection:
+            vektoren, laden_ms = stopwatch(aehnlichkeit.load_vectors, connection)
+            ergebnis, rechnen_ms = stopwatch(aehnlichkeit.compute_all, connection, args.k, vektoren)
+        with db.engine.begin() as connection:
+            paare, speichern_ms = stopwatch(aehnlichkeit.store, connection, ergebnis)
+        ergebnisse['neuaufbau'] = {
+            'laden_ms': laden_ms, 'rechnen_ms': rechnen_ms, 'speichern_ms': speichern_ms,
+            'gesamt_ms': laden_ms + rechnen_ms + speichern_ms, 'paare': paare,
+            'rss_zuwachs_mib': rss_mib() - rss_vorher,
+        }
+        print(
+            f"Neuaufbau: Laden {laden_ms:8.0f} ms  Rechnen {rechnen_ms:8.0f} ms  Speichern {speichern_ms:8.0f} ms  "
+            f"({paare} Paare, Block {vektoren.block_size()} Rezepte, RSS +{ergebnisse['neuaufbau']['rss_zuwachs_mib']:.0f} MiB)"
+        )
+        del vektoren, ergebnis
+
+        ergebnisse['inkrementell'] = {}
+        for anzahl in (1, 10, 100):
+            change_ingredients(path, rng.sample(range(1, args.rezepte + 1), anzahl), rng)
+            with db.engine.connect() as connection:
+                ergebnis, rechnen_ms = stopwatch(aehnlichkeit.compute_pending, connection, args.k)
+            with db.engine.begin() as connection:
+                paare, speichern_ms = stopwatch(aehnlichkeit.store, connection, ergebnis)
+            ergebnisse['inkrementell'][anzahl] = {
+                'rechnen_ms': rechnen_ms, 'speichern_ms': speichern_ms,
+                'listen_neu': len(ergebnis.ersetzt), 'einfuegen': len(ergebnis.einfuegen),
+            }
+            print(
+                f"Inkrementell {anzahl:4} Rezepte: Rechnen {rechnen_ms:8.0f} ms  Speichern {speichern_ms:6.1f} ms  "
+                f"({len(ergebnis.ersetzt)} Listen neu, {len(ergebnis.einfuegen)} Einträge in fremde Listen)"
+            )
+
+        ids = [rng.randint(1, args.rezepte) for _ in range(args.abfragen)]
+        with db.engine.connect() as connection:
+            timings = [stopwatch(aehnlichkeit.similar, connection, rezept_id, args.k)[1] for rezept_id in ids]
+            ergebnisse['nachschlagen'] = percentiles(timings)
+            # Without stored results every request would load the vectors and score one row
+            timings = []
+            for rezept_id in ids[:5]:
+                started = time.perf_counter()
+                vektoren = aehnlichkeit.load_vectors(connection)
+                vektoren.top_k(vektoren.scores(vektoren.rows_of([rezept_id])), args.k)
+                timings.append((time.perf_counter() - started) * 1000)
+            ergebnisse['pro_request'] = percentiles(timings)
+        print(
+            f"Nachschlagen: p50 {ergebnisse['nachschlagen']['p50_ms']:.3f} ms  p99 {ergebnisse['nachschlagen']['p99_ms']:.3f} ms"
+            f"   pro Request berechnet: p50 {ergebnisse['pro_request']['p50_ms']:.0f} ms"
+        )
+
+    if args.ausgabe:
+        with open(args.ausgabe, 'w', encoding='utf-8') as f:
+            json.dump({'parameter': vars(args), 'daten': counts, 'ergebnisse': ergebnisse}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"Ergebnisse geschrieben: {args.ausgabe}")
+
+
+if __name__ == '__main__':
+    main()
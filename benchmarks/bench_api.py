@@ -0,0 +1,81 @@
+"""
+Benchmark der JSON-API v1 gegen das Abgreifen der HTML-Seiten.
+
+Ein "Bildschirm" der Mobil-App braucht N Rezepte. Verglichen werden über den
+Flask-Test-Client:
+
+- N x ``/rezept/<id>`` (HTML, wie bisher abgegriffen),
+- N x ``/api/rezepte/<id>`` (ORM-Objekte, jsonify),
+- 1 x ``/api/v1/rezepte?ids=...`` mit allen Feldern,
+- 1 x ``/api/v1/rezepte?ids=...&fields=name,portionen``,
+
+jeweils Zeit und Bytes pro Bildschirm sowie die CPU-Zeit des Prozesses.
+
+    python -m benchmarks.bench_api --rezepte 10000 --pro-bildschirm 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from benchmarks import daten
+
+
+def measure(client, urls_per_screen, screens):
+    timings, cpu, size = [], 0.0, 0
+    for urls in screens:
+        started, cpu_started = time.perf_counter(), time.process_time()
+        for url in urls_per_screen(urls):
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            size += len(response.data)
+        timings.append((time.perf_counter() - started) * 1000)
+        cpu += time.process_time() - cpu_started
+    timings.sort()
+    return {
+        'p50_ms': statistics.median(timings),
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+        'cpu_ms': cpu * 1000 / len(screens),
+        'kib': size / 1024 / len(screens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rezepte', type=int, default=10000)
+    parser.add_argument('--pro-bildschirm', type=int, default=20)
+    parser.add_argument('--bildschirme', type=int, default=100)
+    args = parser.parse_args()
+
+    # Measure the work per request, not the page cache
+    os.environ['PAGE_CACHE_BACKEND'] = 'aus'
+    path = daten.create_database()
+    counts = daten.fill(path, rezepte=args.rezepte, min_zutaten=5, max_zutaten=40, zutaten=2000, kategorien=20)
+    print(f"Daten: {counts}")
+
+    from app import app
+
+    rng = random.Random(1)
+    screens = [rng.sample(range(1, args.rezepte + 1), args.pro_bildschirm) for _ in range(args.bildschirme)]
+    client = app.test_client()
+    varianten = [
+        ('HTML /rezept/<id>', lambda ids: [f'/rezept/{i}' for i in ids]),
+        ('/api/rezepte/<id>', lambda ids: [f'/api/rezepte/{i}' for i in ids]),
+        ('/api/v1/rezepte?ids=', lambda ids: [f"/api/v1/rezepte?ids={','.join(map(str, ids))}"]),
+        ('  &fields=name,portionen',
+         lambda ids: [f"/api/v1/rezepte?ids={','.join(map(str, ids))}&fields=name,portionen"]),
+    ]
+    print(f"Pro Bildschirm mit {args.pro_bildschirm} Rezepten:")
+    for label, urls in varianten:
+        measure(client, urls, screens[:5])  # warm-up
+        werte = measure(client, urls, screens)
+        print(
+            f"  {label:28} {len(urls(screens[0])):3} Requests  p50 {werte['p50_ms']:7.2f} ms  "
+            f"p95 {werte['p95_ms']:7.2f} ms  CPU {werte['cpu_ms']:7.2f} ms  {werte['kib']:7.1f} KiB"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Lasttest: ASGI-Betrieb (uvicorn asgi:anwendung) gegen den bisherigen Server
+(``python app.py``, Werkzeug mit einem Thread pro Verbindung).
+
+Beide Server laufen nacheinander als eigener Prozess auf derselben
+synthetischen Datenbank. Ein asyncio-Client hält pro Stufe N Verbindungen
+offen (Keep-Alive), die im Wechsel Übersicht, Rezeptdetail und
+``/api/rezepte/<id>`` abrufen; dazu kommen langsame Clients, die einen Upload
+an ``/add`` nur tröpfchenweise senden und nie fertig werden. Gemessen werden
+erfolgreiche Requests pro Sekunde, p50/p95/p99 der Latenz, Fehler
+(Verbindungsabbrüche, Zeitüberschreitungen, Status >= 500) und der höchste
+RSS des Serverprozesses.
+
+    python -m benchmarks.bench_asgi --rezepte 10000 --stufen 10,100,500 --langsame 50
+
+Client und Server teilen sich die CPUs der Maschine; die Zahlen taugen für
+den Vergleich der beiden Server, nicht als absolute Kapazität.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+from benchmarks import daten
+from benchmarks.bench_routen import percentile
+
+BASIS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = {
+    'sync': lambda port: [sys.executable, 'app.py'],
+    'asgi': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:anwendung', '--port', str(port),
+                          '--log-level', 'warning', '--no-access-log', '--backlog', '4096'],
+}
+
+
+def start_server(art, port):
+    env = dict(os.environ, PORT=str(port), FLASK_DEBUG='False')
+    process = subprocess.Popen(SERVER[art](port), cwd=BASIS, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server {art} beendet mit Code {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server {art} antwortet nicht auf Port {port}")
+
+
+def peak_rss_mib(pid):
+    """Highest RSS of a process (VmHWM, Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+async def read_response(reader):
+    """Reads one HTTP/1.x response. Returns (status, keep_alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Verbindung geschlossen')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    keep_alive = status_line.startswith(b'HTTP/1.1') and headers.get('connection') != 'close'
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+class Ergebnis:
+    def __init__(self):
+        self.latenzen = []
+        self.fehler = 0
+        self.zeitueberschreitungen = 0
+
+
+async def leser(port, pfade, rng, ende, ergebnis, timeout):
+    """One keep-alive connection that requests pages until the stage ends."""
+    reader = writer = None
+    while time.perf_counter() < ende:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+            pfad = rng.choice(pfade)
+            started = time.perf_counter()
+            writer.write(f'GET {pfad} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode('ascii'))
+            status, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            if status >= 500:
+                ergebnis.fehler += 1
+            else:
+                ergebnis.latenzen.append(time.perf_counter() - started)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except asyncio.TimeoutError:
+            ergebnis.zeitueberschreitungen += 1
+            writer = _close(writer)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            ergebnis.fehler += 1
+            writer = _close(writer)
+            await asyncio.sleep(0.05)
+    _close(writer)
+
+
+def _close(writer):
+    if writer is not None:
+        writer.close()
+    return None
+
+
+async def langsamer_upload(port, ende, rate_bytes=1024, intervall=0.05):
+    """Sends a multipart upload to /add in small pieces and never finishes it."""
+    grenze = 'rezeptorbenchmark'
+    laenge = 50 * 1024 * 1024
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write((
+            f'POST /add HTTP/1.1\r\nHost: localhost\r\n'
+            f'Content-Type: multipart/form-data; boundary={grenze}\r\n'
+            f'Content-Length: {laenge}\r\n\r\n'
+            f'--{grenze}\r\nContent-Disposition: form-data; name="image"; filename="bild.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'
+        ).encode('ascii'))
+        while time.perf_counter() < ende:
+            writer.write(os.urandom(rate_bytes))
+            await writer.drain()
+            await asyncio.sleep(intervall)
+        writer.close()
+    except OSError:
+        pass
+
+
+async def stufe(port, pfade, verbindungen, langsame, sekunden, timeout, seed):
+    ergebnis = Ergebnis()
+    ende = time.perf_counter() + sekunden
+    uploads = [asyncio.create_task(langsamer_upload(port, ende)) for _ in range(langsame)]
+    await asyncio.sleep(0.5)  # Uploads first, so they hold their connections during the whole stage
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        leser(port, pfade, random.Random(seed + i), ende, ergebnis, timeout) for i in range(verbindungen)
+    ))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*uploads)
+    latenzen = sorted(ergebnis.latenzen)
+    return {
+        'verbindungen': verbindungen,
+        'langsame_uploads': langsame,
+        'requests': len(latenzen),
+        'requests_pro_s': round(len(latenzen) / elapsed, 1),
+        'p50_ms': round(percentile(latenzen, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latenzen, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latenzen, 0.99) * 1000, 2),
+        'fehler': ergebnis.fehler,
+        'zeitueberschreitungen': ergebnis.zeitueberschreitungen,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rezepte', type=int, default=10000)
+    parser.add_argument('--server', default='sync,asgi')
+    parser.add_argument('--stufen', default='10,100,500', help='Gleichzeitige Verbindungen pro Stufe.')
+    parser.add_argument('--langsame', type=int, default=50, help='Langsame Uploads pro Stufe.')
+    parser.add_argument('--sekunden', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=10, help='Zeitlimit pro Request in Sekunden.')
+    parser.add_argument('--port', type=int, default=8731)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ausgabe', help='Ergebnisse zusätzlich als JSON speichern.')
+    args = parser.parse_args()
+
+    path = daten.create_database()
+    counts = daten.fill(path, rezepte=args.rezepte, min_zutaten=5, max_zutaten=40,
+                        zutaten=2000, kategorien=20, seed=args.seed)
+    print(f"Daten: {counts}")
+    with sqlite3.connect(path) as connection:
+        ids = [row[0] for row in connection.execute('SELECT id FROM rezept ORDER BY random() LIMIT 200')]
+    pfade = ['/'] + [f'/rezept/{i}' for i in ids] + [f'/api/rezepte/{i}' for i in ids]
+
+    ergebnisse = {}
+    for art in [name.strip() for name in args.server.split(',') if name.strip()]:
+        process = start_server(art, args.port)
+        try:
+            ergebnisse[art] = []
+            for verbindungen in [int(n) for n in args.stufen.split(',')]:
+                werte = asyncio.run(stufe(args.port, pfade, verbindungen, args.langsame,
+                                          args.sekunden, args.timeout, args.seed))
+                werte['rss_peak_mib'] = peak_rss_mib(process.pid)
+                ergebnisse[art].append(werte)
+                print(
+                    f"{art:5} {verbindungen:5} Verb. + {args.langsame} langsam: "
+                    f"{werte['requests_pro_s']:8.1f}/s  p50 {werte['p50_ms']:8.2f} ms  "
+                    f"p95 {werte['p95_ms']:8.2f} ms  p99 {werte['p99_ms']:8.2f} ms  "
+                    f"Fehler {werte['fehler']}  Timeouts {werte['zeitueberschreitungen']}  "
+                    f"RSS {werte['rss_peak_mib']} MiB"
+                )
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        time.sleep(1)  # Let the port become free
+
+    if args.ausgabe:
+        with open(args.ausgabe, 'w', encoding='utf-8') as f:
+            json.dump({'parameter': vars(args), 'daten': counts, 'server': ergebnisse}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"Ergebnisse geschrieben: {args.ausgabe}")
+
+
+if __name__ == '__main__':
+    main()
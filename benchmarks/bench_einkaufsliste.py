@@ -0,0 +1,116 @@
+"""
+Benchmark der Einkaufslisten-Aggregation: bisheriger ORM-Pfad gegen den
+spaltenbasierten Pfad aus einkaufsliste.py, bei 10, 100 und 1000 Rezepten.
+
+Der ORM-Pfad fasst nur gleich geschriebene Einheiten zusammen, der neue
+Pfad rechnet Einheiten um; verglichen wird deshalb nur die Laufzeit. Die
+Ergebnisgleichheit wird zwischen NumPy- und Python-Reduktion geprüft.
+
+    python -m benchmarks.bench_einkaufsliste
+"""
+
+import argparse
+import math
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from benchmarks import daten
+
+
+def calculate_shopping_list_orm(recipe_ids, desired_portions):
+    """The previous implementation (ORM objects, per-row string work), kept for comparison."""
+    from app import Rezept, RezeptZutat
+    from sqlalchemy.orm import joinedload
+
+    aggregated_list = defaultdict(lambda: defaultdict(float))
+    scaling_warnings = []
+    selected_recipes = Rezept.query.filter(Rezept.id.in_(recipe_ids)).options(
+        joinedload(Rezept.zutaten_association).joinedload(RezeptZutat.zutat)
+    ).all()
+    for rezept in selected_recipes:
+        recipe_portions = rezept.portionen
+        scaling_factor = 1.0
+        if recipe_portions and recipe_portions > 0:
+            scaling_factor = float(desired_portions) / float(recipe_portions)
+        elif desired_portions > 0:
+            scaling_warnings.append(
+                f"Für Rezept '{rezept.name}' konnte keine Skalierung vorgenommen werden "
+                f"(Standardportionen nicht definiert oder 0). Mengen wurden nicht angepasst."
+            )
+        for assoc in rezept.zutaten_association:
+            zutat_name = assoc.zutat.name.strip().capitalize()
+            einheit = (assoc.einheit or '').strip().lower()
+            menge = assoc.menge
+            scaled_menge = menge
+            if isinstance(menge, (int, float)) and scaling_factor != 1.0:
+                scaled_menge = menge * scaling_factor
+            elif not isinstance(menge, (int, float)) and menge is not None:
+                scaled_menge = str(menge)
+            if isinstance(scaled_menge, (int, float)):
+                aggregated_list[zutat_name][einheit] += scaled_menge
+            elif isinstance(scaled_menge, str):
+                string_key = f"{einheit} ({scaled_menge})"
+                aggregated_list[zutat_name][string_key] = aggregated_list[zutat_name].get(string_key, 0) + 1
+            else:
+                aggregated_list[zutat_name][einheit] = aggregated_list[zutat_name].get(einheit, 0.0)
+    return {k: dict(v) for k, v in aggregated_list.items()}, scaling_warnings
+
+
+def same_result(a, b):
+    """Compares two shopping lists, allowing for float summation order."""
+    if a.keys() != b.keys():
+        return False
+    for name in a:
+        if a[name].keys() != b[name].keys():
+            return False
+        for einheit in a[name]:
+            if not math.isclose(a[name][einheit], b[name][einheit], rel_tol=1e-9, abs_tol=1e-9):
+                return False
+    return True
+
+
+def measure(function, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        from app import db
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = function(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rezepte', type=int, default=5000)
+    parser.add_argument('--wiederholungen', type=int, default=5)
+    args = parser.parse_args()
+
+    path = daten.create_database()
+    print(f"Daten: {daten.fill(path, rezepte=args.rezepte)}")
+
+    from app import app, calculate_shopping_list, einkaufsliste
+
+    rng = random.Random(3)
+    numpy = einkaufsliste.load_numpy()
+    print(f"NumPy: {'ja' if numpy is not None else 'nein'}")
+    with app.app_context():
+        for selected in (10, 100, 1000):
+            ids = rng.sample(range(1, args.rezepte + 1), selected)
+            orm_ms, _ = measure(calculate_shopping_list_orm, ids, 4, repeat=args.wiederholungen)
+            new_ms, (new_list, _) = measure(
+                calculate_shopping_list, ids, 4, repeat=args.wiederholungen)
+            load_numpy, einkaufsliste.load_numpy = einkaufsliste.load_numpy, lambda: None
+            python_ms, (python_list, _) = measure(
+                calculate_shopping_list, ids, 4, repeat=args.wiederholungen)
+            einkaufsliste.load_numpy = load_numpy
+            print(
+                f"{selected:5} Rezepte  ORM {orm_ms:8.1f} ms  spaltenbasiert {new_ms:7.1f} ms "
+                f"(ohne NumPy {python_ms:7.1f} ms)  Faktor {orm_ms / new_ms:5.1f}x  "
+                f"NumPy = Python: {same_result(new_list, python_list)}"
+            )
+
+if __name__ == '__main__':
+    main()
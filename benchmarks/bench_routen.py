@@ -0,0 +1,263 @@
+"""
+Benchmark-Suite über die Routen der Anwendung.
+
+Erzeugt eine synthetische Datenbank (siehe daten.py, fester Seed) und treibt
+die Routen über den Flask-Test-Client: lesend Übersicht, Rezeptdetail, Suche,
+"Was kann ich kochen?" und Einkaufsliste, schreibend Anlegen, Bearbeiten,
+Zutaten hinzufügen/entfernen und Löschen. Pro Szenario werden p50/p95/p99 der
+Latenz, Durchsatz und der bis dahin höchste RSS des Prozesses gemessen.
+
+Die Ergebnisse landen als JSON in ``--ausgabe`` (mit Commit, Parametern und
+Datenmengen), ``--vergleich`` stellt sie einem früheren Lauf gegenüber::
+
+    python -m benchmarks.bench_routen --rezepte 100000 --ausgabe neu.json --vergleich alt.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks import daten
+
+SUCHBEGRIFFE = ['tomate', 'omas kuchen', 'kürbis suppe', 'köcheln ofen', 'lachs', 'quark zitrone']
+
+LESEN = ['index', 'index_blaettern', 'recipe_detail', 'suche', 'was_kann_ich_kochen', 'shopping_list']
+SCHREIBEN = ['add_recipe', 'edit_recipe', 'add_ingredient', 'delete_ingredient', 'delete_recipe']
+SZENARIEN = LESEN + SCHREIBEN
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def peak_rss_mib():
+    """Highest resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == 'darwin' else 2**10)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Kontext:
+    """Shared state of the scenarios: test client, recipe ids, cursors and ingredient names."""
+
+    def __init__(self, app, rng):
+        from app import db, encode_cursor, Rezept, RezeptZutat
+
+        self.rng = rng
+        self.client = app.test_client()
+        with app.app_context():
+            self.rezept_ids = db.session.execute(db.select(Rezept.id)).scalars().all()
+            stichprobe = rng.sample(self.rezept_ids, min(200, len(self.rezept_ids)))
+            self.cursors = [
+                encode_cursor(row.name, row.id)
+                for row in db.session.execute(
+                    db.select(Rezept.name, Rezept.id).where(Rezept.id.in_(stichprobe))
+                )
+            ]
+            self.zutat_namen = db.session.execute(
+                db.text('SELECT name FROM zutat ORDER BY id LIMIT 500')
+            ).scalars().all()
+            # (rezept_id, zutat_id) links for delete_ingredient, one per sampled recipe
+            self.links = [
+                tuple(row) for row in db.session.execute(
+                    db.select(RezeptZutat.rezept_id, db.func.min(RezeptZutat.zutat_id))
+                    .where(RezeptZutat.rezept_id.in_(stichprobe))
+                    .group_by(RezeptZutat.rezept_id)
+                )
+            ]
+
+    def flashes_verwerfen(self):
+        """Drops flash messages of unfollowed redirects so the session cookie stays small."""
+        with self.client.session_transaction() as session:
+            session.pop('_flashes', None)
+
+    def rezept_id(self):
+        return self.rng.choice(self.rezept_ids)
+
+
+# --- Szenarien: je ein Request, Rückgabe der Response ---
+def index(k):
+    return k.client.get('/')
+
+def index_blaettern(k):
+    return k.client.get('/', query_string={'nach': k.rng.choice(k.cursors)})
+
+def recipe_detail(k):
+    return k.client.get(f'/rezept/{k.rezept_id()}')
+
+def suche(k):
+    return k.client.get('/suche', query_string={'q': k.rng.choice(SUCHBEGRIFFE)})
+
+def was_kann_ich_kochen(k):
+    vorrat = k.rng.sample(k.zutat_namen, min(8, len(k.zutat_namen)))
+    return k.client.get('/was-kann-ich-kochen', query_string={'zutaten': ','.join(vorrat)})
+
+def shopping_list(k):
+    ids = k.rng.sample(k.rezept_ids, min(5, len(k.rezept_ids)))
+    return k.client.post('/einkaufsliste', data={'recipe_ids': ids, 'desired_portions': 4})
+
+def add_recipe(k):
+    response = k.client.post('/add', data={
+        'name': f'Benchmark-Rezept {k.rng.randint(1, 10**9)}',
+        'anleitung': 'Alles verrühren und backen.',
+        'portionen': k.rng.randint(1, 8),
+    })
+    return response
+
+def edit_recipe(k):
+    rezept_id = k.rezept_id()
+    return k.client.post(f'/edit/{rezept_id}', data={
+        'name': f'Bearbeitetes Rezept {rezept_id}',
+        'anleitung': f'Geändert {k.rng.random()}',
+        'portionen': k.rng.randint(1, 8),
+    })
+
+def add_ingredient(k):
+    return k.client.post(f'/rezept/{k.rezept_id()}/add_ingredient', data={
+        'zutat_name': k.rng.choice(k.zutat_namen),
+        'menge': k.rng.randint(1, 500), 'einheit': k.rng.choice(['g', 'ml', 'EL', 'Stück']),
+    })
+
+def delete_ingredient(k):
+    if not k.links:
+        return None
+    rezept_id, zutat_id = k.links.pop()
+    return k.client.post(f'/rezept/{rezept_id}/delete_ingredient/{zutat_id}')
+
+def delete_recipe(k):
+    # Deletes synthetic recipes from the end so the read scenarios keep their ids
+    if not k.rezept_ids:
+        return None
+    return k.client.post(f'/delete/{k.rezept_ids.pop()}')
+
+
+def run_scenario(name, kontext, anfragen, aufwaermen):
+    function = globals()[name]
+    for _ in range(aufwaermen):
+        function(kontext)
+        kontext.flashes_verwerfen()
+    timings, fehler = [], 0
+    started = time.perf_counter()
+    for _ in range(anfragen):
+        t0 = time.perf_counter()
+        response = function(kontext)
+        if response is None:
+            break  # Nothing left to delete
+        timings.append(time.perf_counter() - t0)
+        if response.status_code >= 400:
+            fehler += 1
+        kontext.flashes_verwerfen()
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'anfragen': len(timings),
+        'fehler': fehler,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        'mittel_ms': round(sum(timings) / len(timings) * 1000, 3) if timings else 0.0,
+        'durchsatz_pro_s': round(len(timings) / elapsed, 1) if elapsed else 0.0,
+        'rss_peak_mib': round(peak_rss_mib(), 1),
+    }
+
+
+def vergleiche(alt, neu):
+    """Prints p50/p95/throughput of two result files side by side."""
+    print(f"\nVergleich mit {alt['meta'].get('commit') or '?'} -> {neu['meta'].get('commit') or '?'}:")
+    for name, werte in neu['szenarien'].items():
+        vorher = alt['szenarien'].get(name)
+        if vorher is None:
+            continue
+        teile = []
+        for feld in ('p50_ms', 'p95_ms', 'durchsatz_pro_s'):
+            a, b = vorher[feld], werte[feld]
+            aenderung = f"{(b - a) / a * 100:+6.1f}%" if a else '   n/a'
+            teile.append(f"{feld} {a:9.2f} -> {b:9.2f} ({aenderung})")
+        print(f"  {name:20} " + '  '.join(teile))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rezepte', type=int, default=1000)
+    parser.add_argument('--min-zutaten', type=int, default=5)
+    parser.add_argument('--max-zutaten', type=int, default=40)
+    parser.add_argument('--zutaten', type=int, default=2000)
+    parser.add_argument('--kategorien', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anfragen', type=int, default=200, help='Gemessene Requests pro Szenario.')
+    parser.add_argument('--aufwaermen', type=int, default=10, help='Ungemessene Requests vorab.')
+    parser.add_argument('--szenarien', default=','.join(SZENARIEN))
+    parser.add_argument('--seitencache', choices=['speicher', 'aus'], default='speicher')
+    parser.add_argument('--ausgabe', default='bench-routen.json')
+    parser.add_argument('--vergleich', help='Früheres Ergebnis (JSON) zum Gegenüberstellen.')
+    args = parser.parse_args()
+
+    namen = [name.strip() for name in args.szenarien.split(',') if name.strip()]
+    unbekannt = set(namen) - set(SZENARIEN)
+    if unbekannt:
+        parser.error(f"Unbekannte Szenarien: {', '.join(sorted(unbekannt))}")
+
+    os.environ['PAGE_CACHE_BACKEND'] = args.seitencache
+    path = daten.create_database()
+    started = time.perf_counter()
+    counts = daten.fill(path, rezepte=args.rezepte, min_zutaten=args.min_zutaten,
+                        max_zutaten=args.max_zutaten, zutaten=args.zutaten,
+                        kategorien=args.kategorien, seed=args.seed)
+    print(f"Daten erzeugt in {time.perf_counter() - started:.1f}s: {counts}")
+
+    import logging
+    from app import app
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.logger.setLevel(logging.ERROR)
+
+    kontext = Kontext(app, random.Random(args.seed))
+    ergebnisse = {}
+    # Reads first, then writes (delete_recipe last: it removes recipes)
+    for name in sorted(namen, key=SZENARIEN.index):
+        werte = ergebnisse[name] = run_scenario(name, kontext, args.anfragen, args.aufwaermen)
+        print(
+            f"{name:20} p50 {werte['p50_ms']:8.2f} ms  p95 {werte['p95_ms']:8.2f} ms  "
+            f"p99 {werte['p99_ms']:8.2f} ms  {werte['durchsatz_pro_s']:8.1f}/s  "
+            f"RSS {werte['rss_peak_mib']:6.1f} MiB  Fehler {werte['fehler']}"
+        )
+
+    ergebnis = {
+        'meta': {
+            'zeitpunkt': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'plattform': platform.platform(),
+            'parameter': vars(args),
+            'daten': counts,
+        },
+        'szenarien': ergebnisse,
+    }
+    with open(args.ausgabe, 'w', encoding='utf-8') as f:
+        json.dump(ergebnis, f, ensure_ascii=False, indent=2)
+    print(f"Ergebnisse geschrieben: {args.ausgabe}")
+
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as f:
+            vergleiche(json.load(f), ergebnis)
+
+
+if __name__ == '__main__':
+    main()
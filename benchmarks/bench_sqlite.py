@@ -0,0 +1,172 @@
+"""
+Nebenläufigkeits-Benchmark der SQLite-Profile (siehe datenbank.py).
+
+Mehrere Prozesse mit je mehreren Threads (wie gunicorn-Worker) lesen und
+schreiben gleichzeitig über den Flask-Test-Client: Rezeptdetails, Übersicht
+und Suche lesend, ``edit_recipe`` und ``add_ingredient`` schreibend. Jedes
+Profil läuft auf einer eigenen Kopie derselben Datenbank.
+
+    python -m benchmarks.bench_sqlite --prozesse 4 --threads 4 --sekunden 10
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import threading
+import time
+
+from benchmarks import daten
+
+SUCHBEGRIFFE = ['tomate', 'kuchen', 'suppe', 'ofen', 'lachs', 'quark']
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class _ErrorCounter(logging.Handler):
+    """Counts the errors that the write routes log instead of raising."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def worker(path, profil, pool_mode, threads, sekunden, schreibanteil, seed, barrier, results):
+    """One process: imports the app with the given profile and runs the mix in threads."""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    os.environ['SQLITE_PROFILE'] = profil
+    os.environ['DB_POOL_MODE'] = pool_mode
+    os.environ['PAGE_CACHE_BACKEND'] = 'aus'  # measure the database, not the page cache
+    from app import app, db, Rezept
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.logger.setLevel(logging.ERROR)
+    app.logger.handlers[:] = []
+    counter = _ErrorCounter()
+    app.logger.addHandler(counter)
+    with app.app_context():
+        max_id = db.session.query(db.func.max(Rezept.id)).scalar()
+
+    barrier.wait()
+    counter.count = 0
+    deadline = time.perf_counter() + sekunden
+    stats = {'lesen': [], 'schreiben': [], 'http_fehler': 0}
+    lock = threading.Lock()
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        client = app.test_client()
+        lesen, schreiben, http_fehler = [], [], 0
+        while time.perf_counter() < deadline:
+            rezept_id = rng.randint(1, max_id)
+            started = time.perf_counter()
+            if rng.random() < schreibanteil:
+                if rng.random() < 0.5:
+                    response = client.post(f'/edit/{rezept_id}', data={
+                        'name': f'Bench-Rezept {rezept_id}',
+                        'anleitung': f'Geändert {rng.random()}',
+                        'portionen': rng.randint(1, 8),
+                    })
+                else:
+                    response = client.post(f'/rezept/{rezept_id}/add_ingredient', data={
+                        'zutat_name': f'Bench-Zutat {rng.randint(1, 500)}',
+                        'menge': rng.randint(1, 500), 'einheit': 'g',
+                    })
+                schreiben.append(time.perf_counter() - started)
+            else:
+                art = rng.random()
+                if art < 0.6:
+                    response = client.get(f'/rezept/{rezept_id}')
+                elif art < 0.8:
+                    response = client.get('/')
+                else:
+                    response = client.get('/suche', query_string={'q': rng.choice(SUCHBEGRIFFE)})
+                lesen.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                http_fehler += 1
+        with lock:
+            stats['lesen'].extend(lesen)
+            stats['schreiben'].extend(schreiben)
+            stats['http_fehler'] += http_fehler
+
+    pool = [threading.Thread(target=run, args=(seed * 1000 + i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    stats['fehler'] = counter.count + stats['http_fehler']
+    results.put(stats)
+
+
+def run_profile(template, profil, args):
+    """Runs the mix for one profile on a fresh copy of the template database."""
+    directory = os.path.dirname(template)
+    path = os.path.join(directory, f'{profil}.db')
+    shutil.copyfile(template, path)
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(args.prozesse)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(
+            path, profil, args.pool, args.threads, args.sekunden,
+            args.schreibanteil, seed, barrier, results
+        ))
+        for seed in range(args.prozesse)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    lesen = [t for stats in collected for t in stats['lesen']]
+    schreiben = [t for stats in collected for t in stats['schreiben']]
+    fehler = sum(stats['fehler'] for stats in collected)
+    total = len(lesen) + len(schreiben)
+    print(
+        f"{profil:11} {total / args.sekunden:8.0f} req/s  "
+        f"lesen {len(lesen) / args.sekunden:7.0f}/s p50 {percentile(lesen, 0.5) * 1000:6.1f} ms "
+        f"p95 {percentile(lesen, 0.95) * 1000:7.1f} ms  "
+        f"schreiben {len(schreiben) / args.sekunden:6.0f}/s p50 {percentile(schreiben, 0.5) * 1000:6.1f} ms "
+        f"p95 {percentile(schreiben, 0.95) * 1000:7.1f} ms  Fehler {fehler}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rezepte', type=int, default=5000)
+    parser.add_argument('--prozesse', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--sekunden', type=float, default=10)
+    parser.add_argument('--schreibanteil', type=float, default=0.2)
+    parser.add_argument('--pool', choices=['threads', 'prozesse'], default='threads')
+    parser.add_argument('--profile', default='standard,produktion')
+    args = parser.parse_args()
+
+    template = daten.create_database()
+    counts = daten.fill(template, rezepte=args.rezepte, min_zutaten=5, max_zutaten=15)
+    # Template in rollback-journal mode; each profile sets its own journal mode
+    connection = sqlite3.connect(template)
+    connection.execute('PRAGMA journal_mode = DELETE')
+    connection.close()
+    print(f"Daten: {counts}; {args.prozesse} Prozesse x {args.threads} Threads, "
+          f"{args.schreibanteil:.0%} Schreibzugriffe, {args.sekunden:.0f} s je Profil")
+
+    for profil in args.profile.split(','):
+        run_profile(template, profil.strip(), args)
+
+
+if __name__ == '__main__':
+    main()
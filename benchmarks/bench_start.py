@@ -0,0 +1,124 @@
+"""
+Startzeit der Anwendung: was jeder Worker und jeder ``flask``-Aufruf bezahlt.
+
+Jede Messung läuft in einem frischen Python-Prozess auf einer fertig
+angelegten synthetischen Datenbank:
+
+- ``import app`` (Zeit und RSS danach),
+- der erste Request (``GET /``) nach dem Import,
+- der ganze Prozess bis dahin (inkl. Interpreterstart),
+- ``flask rezepte --help`` als Beispiel für einen CLI-Aufruf,
+
+dazu die teuersten Module laut ``python -X importtime``. Mit ``--vorher``
+wird derselbe Ablauf für einen zweiten Quellbaum gemessen, z.B. einen
+älteren Stand aus ``git worktree add /tmp/vorher HEAD~1``::
+
+    python -m benchmarks.bench_start --vorher /tmp/vorher --wiederholungen 15
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import daten
+
+BASIS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KIND = '''
+import json, resource, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+status = app.app.test_client().get('/').status_code
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'request_ms': (done - imported) * 1000,
+                  'rss_mib': rss, 'status': status}))
+'''
+
+
+def run(command, baum, env):
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=baum, env=env, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def importtime(baum, env, anzahl=8):
+    """'app' and its most expensive direct imports by cumulative time (python -X importtime)."""
+    _, result = run([sys.executable, '-X', 'importtime', '-c', 'import app'], baum, env)
+    kinder = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        ms = int(cumulative) / 1000
+        tiefe = len(name) - len(name.lstrip())
+        if tiefe == 1:  # Top level: the children listed so far belong to this module
+            if name.strip() == 'app':
+                return [(ms, 'app')] + sorted(kinder, reverse=True)[:anzahl]
+            kinder = []
+        elif tiefe == 3:
+            kinder.append((ms, name.strip()))
+    return []
+
+
+def measure(label, baum, db_path, wiederholungen):
+    # Every tree gets its own copy: older trees still write to the database on import
+    kopie = os.path.join(os.path.dirname(db_path), f'start-{label}.db')
+    shutil.copyfile(db_path, kopie)
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + kopie, PAGE_CACHE_BACKEND='speicher')
+    run([sys.executable, '-c', 'import app'], baum, env)  # warm the bytecode and page cache
+    werte = {'import_ms': [], 'request_ms': [], 'prozess_ms': [], 'rss_mib': [], 'cli_ms': []}
+    for _ in range(wiederholungen):
+        prozess_ms, result = run([sys.executable, '-c', KIND], baum, env)
+        kind = json.loads(result.stdout.strip().splitlines()[-1])
+        assert kind['status'] == 200, kind
+        werte['prozess_ms'].append(prozess_ms)
+        for name in ('import_ms', 'request_ms', 'rss_mib'):
+            werte[name].append(kind[name])
+        cli_ms, _ = run([sys.executable, '-m', 'flask', '--app', 'app', 'rezepte', '--help'], baum, env)
+        werte['cli_ms'].append(cli_ms)
+    ergebnis = {name: round(statistics.median(liste), 1) for name, liste in werte.items()}
+    ergebnis['module'] = importtime(baum, env)
+    return ergebnis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rezepte', type=int, default=1000)
+    parser.add_argument('--wiederholungen', type=int, default=11)
+    parser.add_argument('--vorher', help='Zweiter Quellbaum zum Vergleich (z.B. ein git worktree).')
+    parser.add_argument('--ausgabe', help='Ergebnisse zusätzlich als JSON speichern.')
+    args = parser.parse_args()
+
+    path = daten.create_database()
+    counts = daten.fill(path, rezepte=args.rezepte, zutaten=2000, kategorien=20)
+    print(f"Daten: {counts}  (Median aus {args.wiederholungen} Prozessen)")
+
+    baeume = [('vorher', os.path.abspath(args.vorher))] if args.vorher else []
+    baeume.append(('jetzt', BASIS))
+    ergebnisse = {}
+    for label, baum in baeume:
+        werte = ergebnisse[label] = measure(label, baum, path, args.wiederholungen)
+        print(
+            f"{label:7} import {werte['import_ms']:7.1f} ms  erster Request {werte['request_ms']:7.1f} ms  "
+            f"Prozess {werte['prozess_ms']:7.1f} ms  RSS {werte['rss_mib']:6.1f} MiB  "
+            f"flask rezepte --help {werte['cli_ms']:7.1f} ms"
+        )
+        for ms, name in werte['module']:
+            print(f"        {ms:7.1f} ms  {name}")
+
+    if args.ausgabe:
+        with open(args.ausgabe, 'w', encoding='utf-8') as f:
+            json.dump({'parameter': vars(args), 'daten': counts, 'ergebnisse': ergebnisse}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"Ergebnisse geschrieben: {args.ausgabe}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark der FTS5-Volltextsuche.
+
+    python -m benchmarks.bench_suche --rezepte 100000
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks import daten
+
+ANFRAGEN = ['tomate', 'omas kuchen', 'kürbis suppe', 'köcheln ofen', 'lachs', 'quark zitrone']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rezepte', type=int, default=100_000)
+    parser.add_argument('--wiederholungen', type=int, default=50)
+    args = parser.parse_args()
+
+    path = daten.create_database()
+    started = time.perf_counter()
+    counts = daten.fill(path, rezepte=args.rezepte, min_zutaten=5, max_zutaten=15)
+    print(f"Daten erzeugt in {time.perf_counter() - started:.1f}s: {counts}")
+
+    import suche
+    from app import app, db
+
+    with app.app_context():
+        with db.engine.begin() as connection:
+            started = time.perf_counter()
+            suche.rebuild(connection)
+            print(f"Index-Neuaufbau: {time.perf_counter() - started:.2f}s")
+
+        with db.engine.connect() as connection:
+            for anfrage in ANFRAGEN:
+                timings = []
+                for _ in range(args.wiederholungen):
+                    started = time.perf_counter()
+                    treffer = suche.search(connection, anfrage, limit=20)
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                print(
+                    f"{anfrage!r:20} {len(treffer):3} Treffer  "
+                    f"p50 {statistics.median(timings):7.2f} ms  "
+                    f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms"
+                )
+
+
+if __name__ == '__main__':
+    main()
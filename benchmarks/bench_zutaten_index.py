@@ -0,0 +1,58 @@
+"""
+Benchmark des invertierten Zutaten-Index ("Was kann ich kochen?").
+
+    python -m benchmarks.bench_zutaten_index --rezepte 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from benchmarks import daten
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rezepte', type=int, default=100_000)
+    parser.add_argument('--wiederholungen', type=int, default=50)
+    args = parser.parse_args()
+
+    path = daten.create_database()
+    counts = daten.fill(path, rezepte=args.rezepte, min_zutaten=5, max_zutaten=15, zutaten=500)
+    print(f"Daten: {counts}")
+
+    from app import app, db, load_zutaten_index, zutaten_index, Zutat
+
+    with app.app_context():
+        started = time.perf_counter()
+        load_zutaten_index()
+        build_time = time.perf_counter() - started
+        # Second build only for the memory figure (tracemalloc slows it down)
+        tracemalloc.start()
+        load_zutaten_index()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Aufbau: {build_time:.2f}s, Speicher-Peak {peak / 2**20:.1f} MiB")
+
+        zutat_ids = [row[0] for row in db.session.query(Zutat.id)]
+
+    rng = random.Random(7)
+    for vorrat_size in (3, 8, 15, 40):
+        timings = []
+        for _ in range(args.wiederholungen):
+            vorrat = rng.sample(zutat_ids, vorrat_size)
+            started = time.perf_counter()
+            zutaten_index.query(vorrat, limit=20)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(
+            f"Vorrat {vorrat_size:3} Zutaten  "
+            f"p50 {statistics.median(timings):7.2f} ms  "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
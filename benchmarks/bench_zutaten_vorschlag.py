@@ -0,0 +1,95 @@
+"""
+Benchmark der Zutaten-Vorschläge (Präfix- und Trigramm-Index).
+
+Misst Aufbau und Speicher des Index sowie die Antwortzeit für Präfixe,
+Tippfehler und Varianten wie "Tomaten" oder "tomaten, passiert" - direkt am
+Index und über ``/api/zutaten/vorschlag`` mit dem Flask-Test-Client.
+
+    python -m benchmarks.bench_zutaten_vorschlag --zutaten 50000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from benchmarks import daten
+
+
+def eingaben(names, rng, count):
+    """Typed texts: prefixes, plural forms, typos and extra words."""
+    result = []
+    for _ in range(count):
+        name = rng.choice(names)
+        art = rng.random()
+        if art < 0.4:
+            result.append(name[:rng.randint(1, min(len(name), 8))])
+        elif art < 0.6:
+            result.append(name.split()[0] + 'n')
+        elif art < 0.8:
+            i = rng.randrange(1, len(name))
+            result.append(name[:i] + name[i + 1:])
+        else:
+            result.append(name.split()[0].lower() + ', ' + rng.choice(['passiert', 'frisch', 'gehackt']))
+    return result
+
+
+def report(label, timings):
+    timings.sort()
+    print(
+        f"{label:28} p50 {statistics.median(timings):6.2f} ms  "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:6.2f} ms  "
+        f"max {timings[-1]:6.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--zutaten', type=int, default=50_000)
+    parser.add_argument('--abfragen', type=int, default=2000)
+    args = parser.parse_args()
+
+    path = daten.create_database()
+    counts = daten.fill(path, rezepte=1000, min_zutaten=3, max_zutaten=8, zutaten=args.zutaten)
+    print(f"Daten: {counts}")
+
+    from app import app, db, load_zutat_vorschlaege, zutat_vorschlaege, Zutat
+
+    with app.app_context():
+        started = time.perf_counter()
+        load_zutat_vorschlaege()
+        build_time = time.perf_counter() - started
+        # Second build only for the memory figure (tracemalloc slows it down)
+        tracemalloc.start()
+        load_zutat_vorschlaege()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Aufbau: {build_time:.2f}s, Speicher {current / 2**20:.1f} MiB (Peak {peak / 2**20:.1f} MiB)")
+        names = [row[0] for row in db.session.query(Zutat.name)]
+
+    rng = random.Random(7)
+    texte = eingaben(names, rng, args.abfragen)
+    timings = []
+    for text in texte:
+        started = time.perf_counter()
+        zutat_vorschlaege.suggest(text, limit=10)
+        timings.append((time.perf_counter() - started) * 1000)
+    report("Index", timings)
+
+    client = app.test_client()
+    timings = []
+    for text in texte:
+        started = time.perf_counter()
+        response = client.get('/api/zutaten/vorschlag', query_string={'q': text})
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200
+    report("/api/zutaten/vorschlag", timings)
+
+    for text in ('Tomaten', 'tomaten, passiert', 'Zwibel', 'kartof'):
+        vorschlaege = zutat_vorschlaege.suggest(text, limit=3)
+        print(f"  {text!r:22} -> {', '.join(f'{v.name} ({v.aehnlichkeit})' for v in vorschlaege)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Synthetische Testdaten für Benchmarks.
+
+Die Daten werden mit einem festen Seed erzeugt, damit Messungen zwischen
+Commits vergleichbar bleiben. Eine Datenbank für eigene Messungen lässt sich
+auch direkt erzeugen::
+
+    python -m benchmarks.daten /tmp/bench.db --rezepte 100000 --min-zutaten 5 --max-zutaten 40
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+
+import einheiten
+import zutatnamen
+
+GERICHTE = [
+    'Suppe', 'Eintopf', 'Auflauf', 'Salat', 'Kuchen', 'Torte', 'Pfanne', 'Braten',
+    'Gratin', 'Risotto', 'Curry', 'Pasta', 'Brot', 'Quiche', 'Bowl', 'Strudel',
+]
+ADJEKTIVE = [
+    'Omas', 'Schneller', 'Würziger', 'Bunter', 'Herbstlicher', 'Sommerlicher',
+    'Veganer', 'Deftiger', 'Leichter', 'Cremiger', 'Knuspriger', 'Schwäbischer',
+]
+ZUTATEN = [
+    'Tomate', 'Zwiebel', 'Knoblauch', 'Kartoffel', 'Karotte', 'Paprika', 'Zucchini',
+    'Mehl', 'Zucker', 'Butter', 'Ei', 'Milch', 'Sahne', 'Quark', 'Käse', 'Reis',
+    'Nudeln', 'Linsen', 'Kichererbsen', 'Spinat', 'Lauch', 'Sellerie', 'Apfel',
+    'Birne', 'Zitrone', 'Petersilie', 'Basilikum', 'Thymian', 'Salz', 'Pfeffer',
+    'Olivenöl', 'Hähnchen', 'Rindfleisch', 'Lachs', 'Tofu', 'Pilze', 'Kürbis',
+]
+EINHEITEN = ['g', 'kg', 'ml', 'l', 'EL', 'TL', 'Stück', 'Prise', 'Bund', None]
+WOERTER = [
+    'schneiden', 'anbraten', 'köcheln', 'abschmecken', 'würzen', 'backen',
+    'rühren', 'pürieren', 'servieren', 'ziehen', 'lassen', 'Minuten', 'Hitze',
+    'Ofen', 'Topf', 'Pfanne', 'Schüssel', 'vorsichtig', 'langsam', 'heiß',
+]
+
+
+def create_database(path=None):
+    """
+    Creates an empty Rezeptor database (schema via the app models) and returns its path.
+    Must run before app.py is imported anywhere else in the process.
+    """
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='rezeptor-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    import app
+    with app.app.app_context():
+        app.init_db()  # tables, indexes and search triggers
+        # Close the pooled connection so the file is complete without its WAL (copies, other processes)
+        app.db.engine.dispose()
+    return path
+
+
+def zutat_names(count, rng):
+    """Returns count distinct ingredient names built from the base vocabulary."""
+    names = list(ZUTATEN)
+    i = 0
+    while len(names) < count:
+        base = ZUTATEN[i % len(ZUTATEN)]
+        names.append(f'{base} {rng.choice(ADJEKTIVE).lower()} {i}')
+        i += 1
+    return names[:count]
+
+
+def fill(path, rezepte=1000, min_zutaten=5, max_zutaten=40, zutaten=2000,
+         kategorien=None, seed=42, batch_size=5000):
+    """
+    Fills the database at path with synthetic recipes, ingredients and links.
+    kategorien tops the categories up to that many (default: keep the standard ones).
+    Returns a dict with the generated row counts.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    try:
+        vorhanden = connection.execute('SELECT COUNT(*) FROM category').fetchone()[0]
+        if kategorien is not None and kategorien > vorhanden:
+            connection.executemany(
+                'INSERT INTO category (name) VALUES (?)',
+                [(f'Kategorie {i}',) for i in range(vorhanden + 1, kategorien + 1)]
+            )
+        category_ids = [row[0] for row in connection.execute('SELECT id FROM category')]
+        offset = connection.execute('SELECT COALESCE(MAX(id), 0) FROM zutat').fetchone()[0]
+        names = zutat_names(zutaten, rng)
+        existing = {row[0] for row in connection.execute('SELECT name FROM zutat')}
+        connection.executemany(
+            'INSERT INTO zutat (id, name, name_norm) VALUES (?, ?, ?)',
+            [(offset + i + 1, n, zutatnamen.normalize_name(n))
+             for i, n in enumerate(names) if n not in existing]
+        )
+        zutat_ids = [row[0] for row in connection.execute('SELECT id FROM zutat')]
+
+        start = connection.execute('SELECT COALESCE(MAX(id), 0) FROM rezept').fetchone()[0] + 1
+        links = 0
+        for batch_start in range(start, start + rezepte, batch_size):
+            batch_end = min(batch_start + batch_size, start + rezepte)
+            rows, assoc = [], []
+            for rezept_id in range(batch_start, batch_end):
+                name = f'{rng.choice(ADJEKTIVE)} {rng.choice(ZUTATEN)}-{rng.choice(GERICHTE)} {rezept_id}'
+                anleitung = ' '.join(rng.choices(WOERTER, k=rng.randint(20, 80)))
+                rows.append((
+                    rezept_id, name, ' '.join(rng.choices(WOERTER, k=8)), anleitung,
+                    rng.choice([None, 15, 30, 45, 60, 90, 120]), rng.randint(1, 8),
+                    rng.choice(category_ids) if category_ids else None
+                ))
+                for zutat_id in rng.sample(zutat_ids, rng.randint(min_zutaten, max_zutaten)):
+                    menge = rng.choice([None, round(rng.uniform(0.5, 500), 1)])
+                    einheit = rng.choice(EINHEITEN)
+                    assoc.append((rezept_id, zutat_id, menge, einheit) + einheiten.normalize(menge, einheit))
+            # Links first: the search triggers then write each recipe's index row
+            # once on the rezept insert instead of once per ingredient.
+            connection.executemany(
+                'INSERT INTO rezept_zutat (rezept_id, zutat_id, menge, einheit, menge_basis, dimension) '
+                'VALUES (?, ?, ?, ?, ?, ?)', assoc
+            )
+            connection.executemany(
+                'INSERT INTO rezept (id, name, beschreibung, anleitung, kochzeit_minuten, '
+                'portionen, category_id) VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+            )
+            connection.commit()
+            links += len(assoc)
+        connection.execute('ANALYZE')
+        connection.commit()
+    finally:
+        connection.close()
+    return {'rezepte': rezepte, 'zutaten': len(zutat_ids), 'rezept_zutat': links,
+            'kategorien': len(category_ids)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Erzeugt eine synthetische Rezeptor-Datenbank.')
+    parser.add_argument('pfad')
+    parser.add_argument('--rezepte', type=int, default=1000)
+    parser.add_argument('--min-zutaten', type=int, default=5)
+    parser.add_argument('--max-zutaten', type=int, default=40)
+    parser.add_argument('--zutaten', type=int, default=2000)
+    parser.add_argument('--kategorien', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.pfad):
+        parser.error(f"{args.pfad} existiert bereits")
+    path = create_database(os.path.abspath(args.pfad))
+    print(fill(path, rezepte=args.rezepte, min_zutaten=args.min_zutaten, max_zutaten=args.max_zutaten,
+               zutaten=args.zutaten, kategorien=args.kategorien, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Ablage und Bildvarianten für hochgeladene Rezeptbilder.
+
+Uploads werden inhaltsadressiert gespeichert: Der Dateiname ist der
+SHA-256-Hash des Inhalts. Dasselbe Foto liegt so nur einmal auf der Platte,
+und eine URL zeigt immer auf denselben Inhalt (unbegrenzt cachebar).
+
+Aus jedem Upload werden verkleinerte WebP-Varianten erzeugt (Vorschaubild für
+die Übersicht, Titelbild für die Detailseite). Das Original bleibt unverändert
+liegen und dient als Fallback, solange (oder falls) keine Varianten existieren.
+
+Die Umrechnung übernimmt der Auftrags-Worker außerhalb des Requests
+(Auftrag 'bild_varianten', siehe auftraege.py). Pillow ist optional; ohne
+Pillow werden keine Varianten erzeugt. Es wird erst bei der ersten
+Verwendung importiert.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+import nachladen
+
+Variante = namedtuple('Variante', ['name', 'breite', 'hoehe'])
+
+# hoehe=None: proportional skalieren; sonst auf das Format zuschneiden
+VARIANTEN = {
+    'liste': [Variante('thumb-50', 50, 50), Variante('thumb-100', 100, 100)],
+    'detail': [Variante('hero-640', 640, None), Variante('hero-1280', 1280, None)],
+}
+# Dateiendungen, die als Rezeptbild angenommen werden
+ERLAUBTE_ENDUNGEN = {'png', 'jpg', 'jpeg', 'gif'}
+WEBP_QUALITY = 80
+CHUNK_SIZE = 64 * 1024
+
+# mkstemp creates files with mode 0600; published files get the mode a plain
+# open() would give them, so a web server running as another user can read them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _publish(temp, path):
+    """Moves a finished temp file to its final name, readable like a normally created file."""
+    os.chmod(temp, 0o644 & ~_UMASK)
+    os.replace(temp, path)
+
+
+def store_upload(stream, folder, ext):
+    """
+    Streams an upload to disk in chunks while hashing it and stores it as
+    <sha256>.<ext>. If a file with that content exists already, the new copy
+    is discarded. Returns the file name.
+    """
+    digest = hashlib.sha256()
+    fd, temp = tempfile.mkstemp(dir=folder, suffix='.upload')
+    try:
+        with os.fdopen(fd, 'wb') as target:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                target.write(chunk)
+        filename = digest.hexdigest() + ext.lower()
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            os.remove(temp)  # Deduplicated: same content already stored
+            # Fresh mtime: a queued deletion of the old copy keeps it (see app.delete_image)
+            os.utime(path)
+        else:
+            _publish(temp, path)
+        return filename
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def move_folder(source, target):
+    """
+    Moves all files of an old upload folder into target; a name that exists
+    there already is left in place. Returns the number of moved files.
+    """
+    if not os.path.isdir(source) or os.path.abspath(source) == os.path.abspath(target):
+        return 0
+    moved = 0
+    for entry in os.scandir(source):
+        if not entry.is_file() or entry.name.startswith('.'):
+            continue
+        path = os.path.join(target, entry.name)
+        if not os.path.exists(path):
+            shutil.move(entry.path, path)
+            moved += 1
+    return moved
+
+
+def is_content_addressed(filename):
+    """True if the file name is a SHA-256 hash (plus extension)."""
+    stem = filename.split('.', 1)[0]
+    return len(stem) == 64 and all(c in '0123456789abcdef' for c in stem)
+
+
+def is_servable(filename):
+    """
+    True for a stored upload (<sha256>.<ext>) or one of its variants; false for
+    temp files of uploads in progress and anything else in the folder.
+    """
+    for variante in all_variants():
+        suffix = f'.{variante.name}.webp'
+        if filename.endswith(suffix):
+            stem, sep, ext = filename[:-len(suffix)].rpartition('-')
+            filename = stem + '.' + ext if sep else ''
+            break
+    stem, ext = os.path.splitext(filename)
+    return len(stem) == 64 and is_content_addressed(filename) and ext[1:] in ERLAUBTE_ENDUNGEN
+
+
+def is_available():
+    """True if Pillow is installed and can write WebP."""
+    features = nachladen.optional_import('PIL.features')
+    return features is not None and features.check('webp')
+
+
+def variant_filename(filename, variante):
+    """File name of a variant, e.g. 'abc.jpg' -> 'abc-jpg.thumb-100.webp'."""
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}{ext.replace(".", "-")}.{variante.name}.webp'
+
+
+def all_variants():
+    return [variante for varianten in VARIANTEN.values() for variante in varianten]
+
+
+def existing_variants(folder, filename, art):
+    """Returns the variants of one kind ('liste', 'detail') that exist on disk."""
+    return [
+        variante for variante in VARIANTEN[art]
+        if os.path.exists(os.path.join(folder, variant_filename(filename, variante)))
+    ]
+
+
+def generate_variants(folder, filename):
+    """
+    Writes all variants of an image next to it (write to temp file, then rename).
+    Returns the number of written variants.
+    """
+    Image = nachladen.optional_import('PIL.Image')
+    ImageOps = nachladen.optional_import('PIL.ImageOps')
+    source = os.path.join(folder, filename)
+    written = 0
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for variante in all_variants():
+            if variante.hoehe is None:
+                resized = image.copy()
+                resized.thumbnail((variante.breite, variante.breite * 4), Image.LANCZOS)
+            else:
+                resized = ImageOps.fit(image, (variante.breite, variante.hoehe), Image.LANCZOS)
+            target = os.path.join(folder, variant_filename(filename, variante))
+            fd, temp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as output:
+                    resized.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+                _publish(temp, target)
+            except BaseException:
+                os.remove(temp)
+                raise
+            written += 1
+    return written
+
+
+def delete_variants(folder, filename):
+    """Removes all variants of an image. Missing files are ignored."""
+    for variante in all_variants():
+        try:
+            os.remove(os.path.join(folder, variant_filename(filename, variante)))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,131 @@
+"""
+SQLite-Einstellungen für den Betrieb mit mehreren Threads und Prozessen.
+
+Ein Profil legt die PRAGMAs fest, die auf jeder neuen Verbindung gesetzt
+werden, und ob schreibende Requests ihre Transaktion mit ``BEGIN IMMEDIATE``
+beginnen:
+
+- ``produktion``: WAL (Leser und Schreiber blockieren sich nicht gegenseitig),
+  ``busy_timeout`` (warten statt sofort "database is locked"), größerer
+  Seitencache, Memory-Mapped I/O, temporäre Tabellen im Speicher.
+- ``standard``: die Voreinstellungen von SQLite (Rollback-Journal), also das
+  frühere Verhalten.
+
+``BEGIN IMMEDIATE`` holt die Schreibsperre zu Beginn der Transaktion. Eine
+zunächst lesende Transaktion, die später schreibt, kann sonst in WAL nicht
+auf die Sperre warten, sondern scheitert sofort, wenn inzwischen ein anderer
+Prozess geschrieben hat.
+
+Der Verbindungspool wird nach Betriebsart eingestellt: ``threads`` (ein
+Prozess, viele Threads) bekommt einen großen Pool, ``prozesse`` (z.B.
+gunicorn sync workers, ein Request pro Prozess) einen kleinen. Für den
+ASGI-Betrieb (asgi.py) liefern ``async_url`` und ``async_engine_options`` die
+asynchrone Engine (aiosqlite) mit begrenztem Pool.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+Profil = namedtuple('Profil', ['pragmas', 'begin_immediate'])
+
+PROFILE = {
+    'standard': Profil(
+        pragmas={'journal_mode': 'DELETE'},
+        begin_immediate=False
+    ),
+    'produktion': Profil(
+        pragmas={
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',   # in WAL sicher bei Absturz der Anwendung, fsync beim Checkpoint
+            'busy_timeout': 5000,      # ms
+            'cache_size': -65536,      # negativ = KiB, also 64 MiB pro Verbindung
+            'mmap_size': 268435456,    # 256 MiB
+            'temp_store': 'MEMORY',
+        },
+        begin_immediate=True
+    ),
+}
+
+POOL_MODI = ('threads', 'prozesse')
+
+
+def parse_pragmas(text):
+    """Parses overrides like 'cache_size=-32000, mmap_size=0' into a dict."""
+    pragmas = {}
+    for item in (text or '').split(','):
+        if item.strip():
+            name, _, value = item.partition('=')
+            pragmas[name.strip().lower()] = value.strip()
+    return pragmas
+
+
+def get_profil(name, overrides=None):
+    """Returns the named profile with pragma overrides applied."""
+    try:
+        profil = PROFILE[name]
+    except KeyError:
+        raise ValueError(f"Unbekanntes SQLite-Profil: {name} (erlaubt: {', '.join(PROFILE)})")
+    return profil._replace(pragmas={**profil.pragmas, **(overrides or {})})
+
+
+def is_sqlite_file(uri):
+    return uri.startswith('sqlite') and ':memory:' not in uri and uri.rstrip('/') not in ('sqlite:', 'sqlite:/')
+
+
+def engine_options(uri, pool_mode='threads', pool_size=10):
+    """SQLALCHEMY_ENGINE_OPTIONS for a SQLite file database; other databases keep the defaults."""
+    if not is_sqlite_file(uri):
+        return {}
+    if pool_mode not in POOL_MODI:
+        raise ValueError(f"Unbekannte Pool-Betriebsart: {pool_mode} (erlaubt: {', '.join(POOL_MODI)})")
+    if pool_mode == 'prozesse':
+        # One request at a time per process; a spare connection for streamed responses
+        return {'pool_size': 1, 'max_overflow': 1, 'pool_timeout': 30}
+    return {'pool_size': pool_size, 'max_overflow': pool_size, 'pool_timeout': 30}
+
+
+def async_url(uri):
+    """The URL of a SQLite database for SQLAlchemy's asyncio extension (driver aiosqlite)."""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or not is_sqlite_file(uri):
+        raise ValueError(f"Der asynchrone Betrieb unterstützt nur SQLite-Dateien, nicht {url.drivername}")
+    return url.set(drivername='sqlite+aiosqlite')
+
+
+def async_engine_options(pool_size=10):
+    """
+    Engine options for the asynchronous engine: a bounded pool, requests wait
+    up to pool_timeout for a free connection instead of opening more.
+    """
+    return {'poolclass': AsyncAdaptedQueuePool, 'pool_size': pool_size, 'max_overflow': 0, 'pool_timeout': 30}
+
+
+def install(engine, profil, wants_write_lock=None):
+    """
+    Registers the profile on a SQLite engine: pragmas on every new connection
+    and, if the profile asks for it, BEGIN IMMEDIATE whenever
+    wants_write_lock() is true (e.g. in a request of a view that writes).
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    begin_immediate = profil.begin_immediate and wants_write_lock is not None
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        if begin_immediate:
+            # Let SQLAlchemy emit BEGIN itself (see begin below) instead of pysqlite
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in profil.pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+    if begin_immediate:
+        @event.listens_for(engine, 'begin')
+        def begin(connection):
+            connection.exec_driver_sql('BEGIN IMMEDIATE' if wants_write_lock() else 'BEGIN')
@@ -0,0 +1,131 @@
+"""
+Einheiten-Register für Zutatenmengen.
+
+Jede bekannte Einheit gehört zu einer Dimension mit einer Basiseinheit
+(Masse -> g, Volumen -> ml, Zähleinheiten wie Stück, Prise, Bund) und hat
+einen Umrechnungsfaktor auf diese Basis. Mengen werden beim Schreiben einmal
+normalisiert (``normalize``), so dass die Einkaufsliste nur noch Zahlen pro
+Dimension summieren muss und "500 g" und "1 kg" Mehl zusammenfallen.
+
+Unbekannte Einheiten bilden jeweils eine eigene Dimension ``einheit:<name>``
+und werden wie bisher nur mit sich selbst zusammengefasst.
+"""
+
+from collections import namedtuple
+
+Einheit = namedtuple('Einheit', ['symbol', 'dimension', 'faktor'])
+
+MASSE = 'masse'
+VOLUMEN = 'volumen'
+OHNE = 'ohne'
+UNBEKANNT_PREFIX = 'einheit:'
+
+# Basiseinheit (Anzeige) je Dimension
+BASIS = {
+    MASSE: 'g',
+    VOLUMEN: 'ml',
+    OHNE: '',
+    'stueck': 'Stück',
+    'prise': 'Prise',
+    'bund': 'Bund',
+    'messerspitze': 'Msp.',
+    'dose': 'Dose',
+    'packung': 'Packung',
+    'becher': 'Becher',
+    'zehe': 'Zehe',
+    'scheibe': 'Scheibe',
+}
+
+# Größere Anzeigeeinheit ab einer Schwelle (in Basiseinheiten)
+_GROSS = {
+    MASSE: (1000.0, 'kg'),
+    VOLUMEN: (1000.0, 'l'),
+}
+
+_EINHEITEN = {
+    # Masse
+    'mg': Einheit('mg', MASSE, 0.001),
+    'g': Einheit('g', MASSE, 1.0),
+    'gr': Einheit('g', MASSE, 1.0),
+    'gramm': Einheit('g', MASSE, 1.0),
+    'kg': Einheit('kg', MASSE, 1000.0),
+    'kilo': Einheit('kg', MASSE, 1000.0),
+    'kilogramm': Einheit('kg', MASSE, 1000.0),
+    'pfund': Einheit('Pfund', MASSE, 500.0),
+    # Volumen
+    'ml': Einheit('ml', VOLUMEN, 1.0),
+    'milliliter': Einheit('ml', VOLUMEN, 1.0),
+    'cl': Einheit('cl', VOLUMEN, 10.0),
+    'dl': Einheit('dl', VOLUMEN, 100.0),
+    'l': Einheit('l', VOLUMEN, 1000.0),
+    'liter': Einheit('l', VOLUMEN, 1000.0),
+    'el': Einheit('EL', VOLUMEN, 15.0),
+    'essl': Einheit('EL', VOLUMEN, 15.0),
+    'esslöffel': Einheit('EL', VOLUMEN, 15.0),
+    'tl': Einheit('TL', VOLUMEN, 5.0),
+    'teel': Einheit('TL', VOLUMEN, 5.0),
+    'teelöffel': Einheit('TL', VOLUMEN, 5.0),
+    # Ohne Einheit ("2 Eier")
+    '': Einheit('', OHNE, 1.0),
+    # Zähleinheiten der Küche
+    'stück': Einheit('Stück', 'stueck', 1.0),
+    'stk': Einheit('Stück', 'stueck', 1.0),
+    'st': Einheit('Stück', 'stueck', 1.0),
+    'stck': Einheit('Stück', 'stueck', 1.0),
+    'prise': Einheit('Prise', 'prise', 1.0),
+    'prisen': Einheit('Prise', 'prise', 1.0),
+    'bund': Einheit('Bund', 'bund', 1.0),
+    'bd': Einheit('Bund', 'bund', 1.0),
+    'msp': Einheit('Msp.', 'messerspitze', 1.0),
+    'messerspitze': Einheit('Msp.', 'messerspitze', 1.0),
+    'dose': Einheit('Dose', 'dose', 1.0),
+    'dosen': Einheit('Dose', 'dose', 1.0),
+    'packung': Einheit('Packung', 'packung', 1.0),
+    'packungen': Einheit('Packung', 'packung', 1.0),
+    'pck': Einheit('Packung', 'packung', 1.0),
+    'pkg': Einheit('Packung', 'packung', 1.0),
+    'becher': Einheit('Becher', 'becher', 1.0),
+    'zehe': Einheit('Zehe', 'zehe', 1.0),
+    'zehen': Einheit('Zehe', 'zehe', 1.0),
+    'scheibe': Einheit('Scheibe', 'scheibe', 1.0),
+    'scheiben': Einheit('Scheibe', 'scheibe', 1.0),
+}
+
+
+def _key(einheit):
+    """Lookup key: lower case, no surrounding blanks or trailing dot."""
+    return (einheit or '').strip().lower().rstrip('.')
+
+
+def lookup(einheit):
+    """Returns the Einheit for a raw unit string; unknown units get their own dimension."""
+    key = _key(einheit)
+    einheit_info = _EINHEITEN.get(key)
+    if einheit_info is None:
+        einheit_info = Einheit((einheit or '').strip(), UNBEKANNT_PREFIX + key, 1.0)
+    return einheit_info
+
+
+def normalize(menge, einheit):
+    """
+    Converts a quantity into the base unit of its dimension.
+    Returns a tuple: (menge_basis or None, dimension)
+    """
+    einheit_info = lookup(einheit)
+    menge_basis = None
+    if isinstance(menge, (int, float)):
+        menge_basis = float(menge) * einheit_info.faktor
+    return menge_basis, einheit_info.dimension
+
+
+def display(menge_basis, dimension):
+    """
+    Picks a readable unit for a summed base quantity.
+    Returns a tuple: (menge, einheit_symbol)
+    """
+    if dimension.startswith(UNBEKANNT_PREFIX):
+        return menge_basis, dimension[len(UNBEKANNT_PREFIX):]
+    gross = _GROSS.get(dimension)
+    if gross is not None and menge_basis >= gross[0]:
+        return menge_basis / gross[0], gross[1]
+    return menge_basis, BASIS.get(dimension, dimension)
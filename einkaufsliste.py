@@ -0,0 +1,118 @@
+"""
+Aggregation der Einkaufsliste.
+
+Arbeitet auf flachen Spalten statt auf ORM-Objekten: Namen werden einmal pro
+unterschiedlicher Zutat normalisiert, nicht einmal pro Zeile. Die Mengen
+liegen bereits normalisiert in der Basiseinheit ihrer Dimension vor
+(siehe einheiten.py), so dass Skalieren und Summieren reine Zahlenarbeit
+sind: NumPy ``bincount``, falls installiert, sonst eine gleichwertige
+Reduktion in reinem Python. NumPy wird erst bei der ersten Einkaufsliste
+importiert, nicht beim Start jedes Workers.
+"""
+
+import einheiten
+import nachladen
+
+
+def load_numpy():
+    """Returns the numpy module, imported on the first call, or None if it is not installed."""
+    return nachladen.optional_import('numpy')
+
+
+def normalize_name(name):
+    """Display key of an ingredient on the shopping list."""
+    return name.strip().capitalize()
+
+
+def sort_items(aggregated):
+    """
+    {zutat_name: {einheit: menge}} -> [(zutat_name, [(einheit, menge), ...])]
+    sorted by name and unit: the order of the page and of every export.
+    """
+    return [(name, sorted(mengen.items())) for name, mengen in sorted(aggregated.items())]
+
+
+class _Codes(dict):
+    """
+    Maps raw values to dense numbers of their normalised form.
+    The normaliser only runs in __missing__, i.e. once per distinct raw value.
+    """
+
+    def __init__(self, normalize):
+        super().__init__()
+        self.normalize = normalize
+        self.values = []
+        self._code_by_value = {}
+
+    def __missing__(self, raw):
+        value = self.normalize(raw)
+        code = self._code_by_value.get(value)
+        if code is None:
+            code = self._code_by_value[value] = len(self.values)
+            self.values.append(value)
+        self[raw] = code
+        return code
+
+
+def scaling_factors(recipes, desired_portions):
+    """
+    Computes the scaling factor per recipe from (rezept_id, name, portionen) tuples.
+    Returns a tuple: ({rezept_id: factor}, warnings_list)
+    """
+    factors = {}
+    warnings = []
+    for rezept_id, name, portionen in recipes:
+        factor = 1.0
+        if portionen and portionen > 0:
+            factor = float(desired_portions) / float(portionen)
+        elif desired_portions > 0:
+            warnings.append(
+                f"Für Rezept '{name}' konnte keine Skalierung vorgenommen werden "
+                f"(Standardportionen nicht definiert oder 0). Mengen wurden nicht angepasst."
+            )
+        factors[rezept_id] = factor
+    return factors, warnings
+
+
+def aggregate(rezept_ids, zutat_ids, mengen_basis, dimensionen, factors, zutat_names):
+    """
+    Sums scaled base quantities per (ingredient, dimension).
+
+    The first four arguments are parallel columns, one entry per recipe
+    ingredient row; factors maps rezept_id to its scaling factor and
+    zutat_names maps zutat_id to the ingredient name.
+    Rows without a quantity still create their (ingredient, unit) entry with 0.0.
+    Returns {zutat_name: {einheit: menge}} with a readable unit per dimension.
+    """
+    if not zutat_ids:
+        return {}
+
+    names = _Codes(lambda zutat_id: normalize_name(zutat_names[zutat_id]))
+    dims = _Codes(lambda dimension: dimension)
+    name_codes = list(map(names.__getitem__, zutat_ids))
+    dim_codes = list(map(dims.__getitem__, dimensionen))
+    row_factors = list(map(factors.__getitem__, rezept_ids))
+    dim_count = len(dims.values)
+
+    np = load_numpy()
+    if np is not None:
+        values = np.array(mengen_basis, dtype=float)  # None -> nan
+        values *= np.array(row_factors, dtype=float)
+        values[np.isnan(values)] = 0.0
+        pair_codes = np.array(name_codes, dtype=np.int64) * dim_count + dim_codes
+        groups, codes = np.unique(pair_codes, return_inverse=True)
+        totals = np.bincount(codes, weights=values, minlength=len(groups))
+        sums = zip(groups.tolist(), totals.tolist())
+    else:
+        sums = {}
+        for name_code, dim_code, menge, factor in zip(name_codes, dim_codes, mengen_basis, row_factors):
+            pair_code = name_code * dim_count + dim_code
+            sums[pair_code] = sums.get(pair_code, 0.0) + (menge * factor if menge is not None else 0.0)
+        sums = sums.items()
+
+    result = {}
+    for pair_code, total in sums:
+        name_code, dim_code = divmod(pair_code, dim_count)
+        menge, einheit = einheiten.display(total, dims.values[dim_code])
+        result.setdefault(names.values[name_code], {})[einheit] = menge
+    return result
@@ -0,0 +1,71 @@
+"""
+Formulare (WTForms) der Anwendung.
+
+Eigenes Modul, damit Flask-WTF/WTForms erst mit dem ersten Formular geladen
+werden: Die Views importieren ihre Formulare lokal. Start, CLI, Übersicht,
+Suche und JSON-API kommen ohne aus.
+"""
+
+from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed # FileRequired entfernt, da optional
+from wtforms import (
+    StringField, TextAreaField, IntegerField, SubmitField,
+    FloatField, SelectField
+)
+from wtforms.validators import DataRequired, Optional, Length, NumberRange
+
+import bilder
+import wochenplan
+
+
+class RecipeForm(FlaskForm):
+    """Form for adding or editing recipes."""
+    name = StringField(
+        'Rezeptname',
+        validators=[DataRequired(), Length(min=3, max=150)]
+    )
+    beschreibung = TextAreaField('Beschreibung (optional)')
+    anleitung = TextAreaField('Anleitung', validators=[DataRequired()])
+    kochzeit_minuten = IntegerField('Kochzeit (Minuten)', validators=[Optional()])
+    portionen = IntegerField('Portionen', validators=[Optional()])
+    quelle = StringField(
+        'Quelle (z.B. URL)',
+        validators=[Optional(), Length(max=255)]
+    )
+    image = FileField(
+        'Rezeptbild (optional, max. 16MB)',
+        validators=[
+            FileAllowed(bilder.ERLAUBTE_ENDUNGEN, 'Nur Bilder sind erlaubt! (png, jpg, jpeg, gif)')
+        ]
+    )
+    # Choices are set dynamically in the route
+    # coerce=int entfernt! Die Verarbeitung erfolgt in der Route.
+    category = SelectField('Kategorie', validators=[Optional()])
+    submit = SubmitField('Rezept Speichern')
+
+class IngredientForm(FlaskForm):
+    """Form for adding ingredients to a recipe."""
+    zutat_name = StringField(
+        'Zutat',
+        validators=[DataRequired(), Length(min=1, max=100)]
+    )
+    # Menge can be float (e.g., 0.5) or omitted
+    menge = FloatField('Menge', validators=[Optional()])
+    einheit = StringField(
+        'Einheit',
+        validators=[Optional(), Length(max=50)] # e.g., g, ml, Stück, Prise
+    )
+    submit = SubmitField('Zutat hinzufügen')
+
+class PlanForm(FlaskForm):
+    """Form for creating a weekly meal plan."""
+    name = StringField('Name des Plans', validators=[DataRequired(), Length(min=1, max=100)])
+    submit = SubmitField('Plan anlegen')
+
+class PlanEintragForm(FlaskForm):
+    """Form for adding a recipe to a weekly meal plan (on the recipe page)."""
+    plan = SelectField('Wochenplan', coerce=int)
+    tag = SelectField('Tag', coerce=int, choices=list(enumerate(wochenplan.TAGE)))
+    mahlzeit = SelectField('Mahlzeit', choices=list(wochenplan.MAHLZEITEN.items()))
+    portionen = IntegerField('Portionen', default=2, validators=[DataRequired(), NumberRange(min=1, max=100)])
+    submit = SubmitField('Einplanen')
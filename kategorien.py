@@ -0,0 +1,149 @@
+"""
+Facetten der Rezeptübersicht: Rezepte pro Kategorie und Kochzeit-Stufe.
+
+Die Anzahlen liegen fertig gezählt in ``kategorie_zaehler``: eine Zeile pro
+(Kategorie, Kochzeit-Stufe), Rezepte ohne Kategorie (NULL oder '' aus dem
+Formular) unter ``category_id = 0``.
+Trigger auf ``rezept`` buchen jedes Anlegen, Löschen und jede Änderung von
+Kategorie oder Kochzeit als +1/-1, d.h. jede schreibende Route (und der
+Import) pflegt die Zähler in ihrer eigenen Transaktion mit. Die Seitenleiste
+liest nur diese kleine Tabelle, nie ein COUNT über ``rezept``.
+
+Das Modul kennt die Flask-App nicht; alle Funktionen bekommen eine
+SQLAlchemy-Connection übergeben.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import and_, text
+
+Kochzeit = namedtuple('Kochzeit', ['stufe', 'schluessel', 'titel', 'von', 'bis'])
+
+# Stufen der Kochzeit in Minuten: von < kochzeit_minuten <= bis (None: offen)
+KOCHZEITEN = (
+    Kochzeit(1, 'bis-15', 'bis 15 Min.', None, 15),
+    Kochzeit(2, 'bis-30', '16–30 Min.', 15, 30),
+    Kochzeit(3, 'bis-60', '31–60 Min.', 30, 60),
+    Kochzeit(4, 'ueber-60', 'über 60 Min.', 60, None),
+    Kochzeit(0, 'ohne-angabe', 'ohne Angabe', None, None),
+)
+_KOCHZEIT_NACH_SCHLUESSEL = {kochzeit.schluessel: kochzeit for kochzeit in KOCHZEITEN}
+
+Kategorie = namedtuple('Kategorie', ['id', 'name', 'anzahl', 'kochzeiten'])
+Facetten = namedtuple('Facetten', ['kategorien', 'gesamt'])
+
+
+def _stufe_sql(spalte):
+    """CASE expression mapping a kochzeit_minuten column to its stufe."""
+    zweige = []
+    for kochzeit in KOCHZEITEN:
+        if kochzeit.stufe == 0:
+            zweige.insert(0, f'WHEN {spalte} IS NULL THEN 0')
+        elif kochzeit.bis is not None:
+            zweige.append(f'WHEN {spalte} <= {kochzeit.bis} THEN {kochzeit.stufe}')
+        else:
+            sonst = f'ELSE {kochzeit.stufe}'
+    return f"(CASE {' '.join(zweige)} {sonst} END)"
+
+
+def _kategorie_sql(spalte):
+    return f"COALESCE(NULLIF({spalte}, ''), 0)"
+
+
+def _buchen(zeile, delta):
+    kategorie = _kategorie_sql(f'{zeile}.category_id')
+    stufe = _stufe_sql(f'{zeile}.kochzeit_minuten')
+    return f"""
+        INSERT INTO kategorie_zaehler (category_id, kochzeit, anzahl) VALUES ({kategorie}, {stufe}, {delta})
+        ON CONFLICT (category_id, kochzeit) DO UPDATE SET anzahl = anzahl + excluded.anzahl;
+    """
+
+
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_kategorie_zaehler_ai AFTER INSERT ON rezept BEGIN
+        {_buchen('new', 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_kategorie_zaehler_ad AFTER DELETE ON rezept BEGIN
+        {_buchen('old', -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_kategorie_zaehler_au
+    AFTER UPDATE OF category_id, kochzeit_minuten ON rezept
+    WHEN {_kategorie_sql('old.category_id')} != {_kategorie_sql('new.category_id')}
+      OR {_stufe_sql('old.kochzeit_minuten')} != {_stufe_sql('new.kochzeit_minuten')}
+    BEGIN
+        {_buchen('old', -1)}
+        {_buchen('new', 1)}
+    END
+    """,
+]
+
+
+def install(connection):
+    """
+    Creates the counting triggers if they do not exist yet. Fills the counts
+    from the existing recipes if the table is still empty.
+    Returns True if the counts were filled.
+    """
+    for trigger in _TRIGGERS:
+        connection.execute(text(trigger))
+    leer = connection.execute(text(
+        'SELECT NOT EXISTS (SELECT 1 FROM kategorie_zaehler) AND EXISTS (SELECT 1 FROM rezept)'
+    )).scalar()
+    if leer:
+        rebuild(connection)
+    return bool(leer)
+
+
+def rebuild(connection):
+    """Recounts all recipes per category and stufe. Returns the number of counter rows."""
+    connection.execute(text('DELETE FROM kategorie_zaehler'))
+    return connection.execute(text(f"""
+        INSERT INTO kategorie_zaehler (category_id, kochzeit, anzahl)
+        SELECT {_kategorie_sql('category_id')}, {_stufe_sql('kochzeit_minuten')}, COUNT(*)
+        FROM rezept
+        GROUP BY 1, 2
+    """)).rowcount
+
+
+def parse_kochzeit(schluessel):
+    """The Kochzeit for a URL key such as 'bis-30'. Raises ValueError for unknown keys."""
+    try:
+        return _KOCHZEIT_NACH_SCHLUESSEL[schluessel]
+    except KeyError:
+        raise ValueError(f"Unbekannte Kochzeit: {schluessel}")
+
+
+def kochzeit_filter(spalte, kochzeit):
+    """SQLAlchemy condition selecting the recipes of one stufe on a kochzeit_minuten column."""
+    if kochzeit.stufe == 0:
+        return spalte.is_(None)
+    bedingungen = []
+    if kochzeit.von is not None:
+        bedingungen.append(spalte > kochzeit.von)
+    if kochzeit.bis is not None:
+        bedingungen.append(spalte <= kochzeit.bis)
+    return and_(*bedingungen)
+
+
+def facets(connection):
+    """
+    All categories ordered by name with their recipe count and their non-empty
+    stufen as [(Kochzeit, anzahl)], plus the total number of recipes. Two
+    queries on small tables, independent of the number of recipes.
+    """
+    zaehler = {}
+    for category_id, stufe, anzahl in connection.execute(
+        text('SELECT category_id, kochzeit, anzahl FROM kategorie_zaehler WHERE anzahl > 0')
+    ):
+        zaehler.setdefault(category_id, {})[stufe] = anzahl
+    kategorien = []
+    for category_id, name in connection.execute(text('SELECT id, name FROM category ORDER BY name, id')):
+        stufen = zaehler.get(category_id, {})
+        kochzeiten = [(kochzeit, stufen[kochzeit.stufe]) for kochzeit in KOCHZEITEN if kochzeit.stufe in stufen]
+        kategorien.append(Kategorie(category_id, name, sum(stufen.values()), kochzeiten))
+    return Facetten(kategorien, sum(sum(stufen.values()) for stufen in zaehler.values()))
@@ -0,0 +1,239 @@
+"""
+Leistungsmessung pro Request (zuschaltbar).
+
+Für jeden Request werden erfasst: Anzahl und Gesamtdauer der SQL-Statements
+(Engine-Events ``before/after_cursor_execute``), die Renderzeit der Templates
+(Flask-Signale ``before_render_template``/``template_rendered``) und die
+Gesamtzeit des Handlers. Die Werte gehen
+
+- als ``Server-Timing``-Header an die Antwort (sichtbar in den Entwicklertools
+  des Browsers),
+- in Histogramme pro Route, die ``Profiler.metrics_text`` im Textformat von
+  Prometheus ausgibt (``/metrics``).
+
+Wird dasselbe Statement in einem Request mindestens ``n_plus_1`` Mal
+ausgeführt (nur die Parameter unterscheiden sich), ist das typischerweise
+ein N+1-Muster, z.B. ein Lazy Load pro Zeile einer Liste. Solche Requests
+werden geloggt und pro Route gezählt.
+
+Ist die Messung aus, wird nichts registriert: keine Events, keine Signale,
+keine Request-Hooks. Die Histogramme gelten pro Prozess.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import before_render_template, request, template_rendered
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+# Obergrenzen der Histogramm-Eimer
+ZEIT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ANZAHL_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+class Histogramm:
+    """Prometheus-style histogram per label tuple (cumulated when rendered)."""
+
+    def __init__(self, name, hilfe, buckets, label_names=('route', 'methode')):
+        self.name = name
+        self.hilfe = hilfe
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self._werte = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            entry = self._werte.get(labels)
+            if entry is None:
+                # One count per bucket plus +Inf, then sum
+                entry = self._werte[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[bisect_left(self.buckets, value)] += 1
+            entry[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.hilfe}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            werte = sorted((labels, list(entry)) for labels, entry in self._werte.items())
+        for labels, entry in werte:
+            base = _labels(self.label_names, labels)
+            total = 0
+            for grenze, count in zip(self.buckets + ('+Inf',), entry[:-1]):
+                total += count
+                lines.append(f'{self.name}_bucket{{{base},le="{grenze}"}} {total}')
+            lines.append(f'{self.name}_sum{{{base}}} {entry[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {total}')
+        return lines
+
+
+class Zaehler:
+    """Prometheus-style counter per label tuple."""
+
+    def __init__(self, name, hilfe, label_names=('route', 'methode')):
+        self.name = name
+        self.hilfe = hilfe
+        self.label_names = label_names
+        self._werte = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._werte[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.hilfe}', f'# TYPE {self.name} counter']
+        with self._lock:
+            werte = sorted(self._werte.items())
+        for labels, count in werte:
+            lines.append(f'{self.name}{{{_labels(self.label_names, labels)}}} {count}')
+        return lines
+
+
+class Anfrage:
+    """Measurements of the running request."""
+
+    __slots__ = ('start', 'sql_anzahl', 'sql_zeit', 'render_zeit', 'statements',
+                 '_render_start', '_render_tiefe')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_anzahl = 0
+        self.sql_zeit = 0.0
+        self.render_zeit = 0.0
+        self.statements = Counter()
+        self._render_start = 0.0
+        self._render_tiefe = 0
+
+    def haeufigstes_statement(self):
+        """Returns (statement, count) of the most repeated statement, or (None, 0)."""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+class Profiler:
+    """Collects per-request SQL, render and handler times of one Flask app."""
+
+    def __init__(self, n_plus_1=5, prefix='rezeptor'):
+        self.n_plus_1 = n_plus_1
+        self._aktuell = ContextVar('messung_anfrage', default=None)
+        self.dauer = Histogramm(
+            f'{prefix}_request_seconds', 'Gesamtdauer des Handlers in Sekunden.', ZEIT_BUCKETS)
+        self.db_dauer = Histogramm(
+            f'{prefix}_request_db_seconds', 'Summe der SQL-Ausführungszeit pro Request in Sekunden.',
+            ZEIT_BUCKETS)
+        self.render_dauer = Histogramm(
+            f'{prefix}_request_render_seconds', 'Renderzeit der Templates pro Request in Sekunden.',
+            ZEIT_BUCKETS)
+        self.sql_anzahl = Histogramm(
+            f'{prefix}_request_sql_statements', 'Anzahl SQL-Statements pro Request.', ANZAHL_BUCKETS)
+        self.n_plus_1_treffer = Zaehler(
+            f'{prefix}_n_plus_1_total',
+            f'Requests, die dasselbe SQL-Statement mindestens {n_plus_1} Mal ausgeführt haben.')
+
+    def install(self, app, engine):
+        """Registers the engine events, template signals and request hooks."""
+        self.watch_engine(engine)
+        before_render_template.connect(self._before_render, app, weak=False)
+        template_rendered.connect(self._after_render, app, weak=False)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def watch_engine(self, engine):
+        """Counts the statements of another engine too (e.g. the sync_engine of an async one)."""
+        event.listen(engine, 'before_cursor_execute', self._before_sql)
+        event.listen(engine, 'after_cursor_execute', self._after_sql)
+
+    # --- Hooks ---
+    def _start(self):
+        self._aktuell.set(Anfrage())
+
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        anfrage = self._aktuell.get()
+        if anfrage is not None:
+            conn.info.setdefault('messung_start', []).append(time.perf_counter())
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        anfrage = self._aktuell.get()
+        starts = conn.info.get('messung_start')
+        if anfrage is None or not starts:
+            return
+        anfrage.sql_zeit += time.perf_counter() - starts.pop()
+        anfrage.sql_anzahl += 1
+        anfrage.statements[statement] += 1
+
+    def _before_render(self, *args, **extra):
+        anfrage = self._aktuell.get()
+        if anfrage is not None:
+            if anfrage._render_tiefe == 0:
+                anfrage._render_start = time.perf_counter()
+            anfrage._render_tiefe += 1
+
+    def _after_render(self, *args, **extra):
+        anfrage = self._aktuell.get()
+        if anfrage is not None and anfrage._render_tiefe:
+            anfrage._render_tiefe -= 1
+            if anfrage._render_tiefe == 0:
+                anfrage.render_zeit += time.perf_counter() - anfrage._render_start
+
+    @contextmanager
+    def rendering(self):
+        """Counts rendering that bypasses render_template (e.g. macros) as render time."""
+        self._before_render()
+        try:
+            yield
+        finally:
+            self._after_render()
+
+    def _finish(self, response):
+        anfrage = self._aktuell.get()
+        if anfrage is None:
+            return response
+        self._aktuell.set(None)  # Statements of a streamed body are not counted
+        dauer = time.perf_counter() - anfrage.start
+        labels = (request.url_rule.rule if request.url_rule is not None else '<unbekannt>',
+                  request.method)
+        self.dauer.observe(labels, dauer)
+        self.db_dauer.observe(labels, anfrage.sql_zeit)
+        self.render_dauer.observe(labels, anfrage.render_zeit)
+        self.sql_anzahl.observe(labels, anfrage.sql_anzahl)
+
+        statement, count = anfrage.haeufigstes_statement()
+        if count >= self.n_plus_1:
+            self.n_plus_1_treffer.inc(labels)
+            log.warning("Mögliches N+1-Muster in %s %s: %d x %s",
+                        request.method, request.path, count, ' '.join(statement.split())[:300])
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={anfrage.sql_zeit * 1000:.2f};desc="{anfrage.sql_anzahl} SQL", '
+            f'render;dur={anfrage.render_zeit * 1000:.2f}, '
+            f'app;dur={dauer * 1000:.2f}'
+        )
+        return response
+
+    def _teardown(self, exc):
+        self._aktuell.set(None)
+
+    def metrics_text(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metrik in (self.dauer, self.db_dauer, self.render_dauer, self.sql_anzahl,
+                       self.n_plus_1_treffer):
+            lines.extend(metrik.render())
+        return '\n'.join(lines) + '\n'
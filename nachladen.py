@@ -0,0 +1,20 @@
+"""
+Optionale Abhängigkeiten, erst bei der ersten Verwendung importiert.
+
+NumPy und Pillow kosten beim Import spürbar Zeit; Worker und ``flask``-Befehle
+sollen ohne sie starten. Module, die sie brauchen, holen sie mit
+optional_import() direkt vor der Arbeit. Fehlt ein Paket, liefert der Aufruf
+None und der Aufrufer nimmt seinen Fallback.
+"""
+
+import functools
+import importlib
+
+
+@functools.cache
+def optional_import(name):
+    """The module `name`, imported on the first call, or None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
@@ -0,0 +1,193 @@
+"""
+Lesende JSON-API (Version 1) für Rezepte, Zutaten und Kategorien.
+
+Gedacht für Clients, die pro Bildschirm viele Datensätze brauchen:
+
+- ``fields=name,portionen`` wählt die Felder (``id`` ist immer dabei). Gelesen
+  werden nur die zugehörigen Spalten, Joins nur wenn nötig, die Zutaten eines
+  Rezepts nur mit ``zutaten``.
+- ``ids=1,2,3`` liefert mehrere Datensätze mit einer Abfrage; die Zutaten aller
+  Rezepte kommen mit einer weiteren.
+- Listen werden per Keyset-Cursor über (name, id) geblättert, wie die Übersicht.
+
+Die Antwort wird direkt aus den Zeilentupeln gebaut (keine ORM-Objekte) und
+mit orjson serialisiert, falls installiert, sonst mit json.
+
+Alle Funktionen arbeiten auf der Verbindung des Aufrufers. Feldnamen kommen
+nur aus den festen Tabellen unten in das SQL.
+"""
+
+import json
+from collections import namedtuple
+
+from sqlalchemy import bindparam, text
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+Ressource = namedtuple('Ressource', ['tabelle', 'felder', 'standard', 'joins', 'schluessel'])
+
+# Feld -> SQL-Ausdruck (None: wird nachgeladen, siehe _attach_ingredients)
+REZEPTE = Ressource(
+    tabelle='rezept r',
+    felder={
+        'id': 'r.id',
+        'name': 'r.name',
+        'beschreibung': 'r.beschreibung',
+        'anleitung': 'r.anleitung',
+        'kochzeit_minuten': 'r.kochzeit_minuten',
+        'portionen': 'r.portionen',
+        'quelle': 'r.quelle',
+        'kategorie_id': 'r.category_id',
+        'kategorie': 'c.name',
+        'bild': 'r.image_file',
+        'zutaten': None,
+    },
+    # Für Listen; einzelne Rezepte und ids= liefern ohne fields= alle Felder
+    standard=('id', 'name', 'kategorie', 'kochzeit_minuten', 'portionen', 'bild'),
+    joins={'kategorie': 'LEFT JOIN category c ON c.id = r.category_id'},
+    schluessel=('r.name', 'r.id'),
+)
+
+ZUTATEN = Ressource(
+    tabelle='zutat z',
+    felder={'id': 'z.id', 'name': 'z.name'},
+    standard=('id', 'name'),
+    joins={},
+    schluessel=('z.name', 'z.id'),
+)
+
+KATEGORIEN = Ressource(
+    tabelle='category k',
+    felder={
+        'id': 'k.id',
+        'name': 'k.name',
+        # Aus den trigger-gepflegten Zählern (siehe kategorien.py), kein COUNT über rezept
+        'anzahl_rezepte': '(SELECT COALESCE(SUM(kz.anzahl), 0) FROM kategorie_zaehler kz WHERE kz.category_id = k.id)',
+    },
+    standard=('id', 'name'),
+    joins={},
+    schluessel=('k.name', 'k.id'),
+)
+
+_ZUTATEN_SQL = text("""
+    SELECT rz.rezept_id, z.id, z.name, rz.menge, rz.einheit
+    FROM rezept_zutat rz
+    JOIN zutat z ON z.id = rz.zutat_id
+    WHERE rz.rezept_id IN :ids
+    ORDER BY rz.rezept_id, rz.zutat_id
+""").bindparams(bindparam('ids', expanding=True))
+
+
+def dumps(data):
+    """Serialises to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def parse_fields(value, ressource, standard=None):
+    """
+    Parses ?fields=a,b into a tuple of field names starting with 'id'.
+    Without a value, standard (default: the resource's list fields) is used.
+    Raises ValueError for unknown fields.
+    """
+    if not value:
+        return standard or ressource.standard
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in ressource.felder]
+    if unknown:
+        raise ValueError(
+            f"Unbekannte Felder: {', '.join(unknown)} (erlaubt: {', '.join(ressource.felder)})"
+        )
+    return ('id',) + tuple(dict.fromkeys(name for name in names if name != 'id'))
+
+
+def parse_ids(value, max_ids):
+    """Parses ?ids=1,2,3 into a list of distinct ints (in the given order). Raises ValueError."""
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError("ids muss eine kommagetrennte Liste ganzer Zahlen sein")
+    # Larger values do not fit into an SQLite INTEGER and would fail at bind time
+    if any(not 1 <= i < 2 ** 63 for i in ids):
+        raise ValueError("ids müssen zwischen 1 und 2^63-1 liegen")
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError("ids ist leer")
+    if len(ids) > max_ids:
+        raise ValueError(f"Höchstens {max_ids} ids pro Anfrage")
+    return ids
+
+
+def _select(ressource, felder, extra=()):
+    """SELECT ... FROM ... for the chosen fields; returns (sql, names of the selected fields)."""
+    columns = [name for name in felder if ressource.felder[name] is not None]
+    joins = sorted({ressource.joins[name] for name in felder if name in ressource.joins})
+    expressions = [ressource.felder[name] for name in columns] + list(extra)
+    return f"SELECT {', '.join(expressions)} FROM {ressource.tabelle} {' '.join(joins)}", columns
+
+
+def _attach_ingredients(connection, items, felder):
+    """Adds 'zutaten' to recipe items with one query for all of them."""
+    if 'zutaten' not in felder or not items:
+        return
+    by_id = {}
+    for item in items:
+        item['zutaten'] = by_id[item['id']] = []
+    for rezept_id, zutat_id, name, menge, einheit in connection.execute(
+        _ZUTATEN_SQL, {'ids': list(by_id)}
+    ):
+        by_id[rezept_id].append({'id': zutat_id, 'name': name, 'menge': menge, 'einheit': einheit})
+
+
+def page(connection, ressource, felder, limit, after=None):
+    """
+    One page ordered by (name, id), starting after the keyset values `after`.
+    Returns (items, keyset values of the last item or None if no page follows).
+    """
+    name_sql, id_sql = ressource.schluessel
+    sql, columns = _select(ressource, felder, extra=ressource.schluessel)
+    params = {'limit': limit + 1}
+    if after is not None:
+        sql += f' WHERE ({name_sql}, {id_sql}) > (:nach_name, :nach_id)'
+        params.update(nach_name=after[0], nach_id=after[1])
+    sql += f' ORDER BY {name_sql}, {id_sql} LIMIT :limit'
+    rows = connection.execute(text(sql), params).all()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    # zip stops before the trailing keyset columns
+    items = [dict(zip(columns, row)) for row in rows]
+    if ressource is REZEPTE:
+        _attach_ingredients(connection, items, felder)
+    return items, (tuple(rows[-1][-2:]) if rows and has_next else None)
+
+
+def by_ids(connection, ressource, felder, ids):
+    """
+    The records with the given ids in one query, in the order of ids.
+    Returns (items, ids that do not exist).
+    """
+    sql, columns = _select(ressource, felder)
+    statement = text(sql + f' WHERE {ressource.felder["id"]} IN :ids') \
+        .bindparams(bindparam('ids', expanding=True))
+    found = {
+        item['id']: item
+        for item in (dict(zip(columns, row)) for row in connection.execute(statement, {'ids': ids}))
+    }
+    items = [found[i] for i in ids if i in found]
+    if ressource is REZEPTE:
+        _attach_ingredients(connection, items, felder)
+    return items, [i for i in ids if i not in found]
+
+
+def all_items(connection, ressource, felder):
+    """All records ordered by name (for small tables such as categories)."""
+    sql, columns = _select(ressource, felder)
+    name_sql, id_sql = ressource.schluessel
+    return [
+        dict(zip(columns, row))
+        for row in connection.execute(text(sql + f' ORDER BY {name_sql}, {id_sql}'))
+    ]
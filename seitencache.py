@@ -0,0 +1,268 @@
+"""
+Cache für gerenderte Seitenteile (Rezeptdetail, Rezeptübersicht).
+
+Die Schlüssel enthalten die Version der Daten, z.B. ``rezept:42:v7``. Die
+Schreib-Routen erhöhen die Version eines Rezepts; danach zeigt jeder Lesezugriff
+auf einen neuen Schlüssel, ohne dass etwas aktiv gelöscht werden muss. Alte
+Einträge werden nie mehr gelesen und fallen per LRU (bzw. Ablaufzeit) heraus.
+
+Gecacht werden nur die datenabhängigen Teile einer Seite. Flash-Nachrichten
+und das CSRF-Token der Sitzung werden bei jedem Request frisch gerendert.
+
+Backends (austauschbar, gleiche Schnittstelle ``get``/``set``/``delete``/``stats``):
+
+- ``SpeicherBackend``: im Prozess, LRU mit Speicherbudget in Bytes (Standard).
+- ``RedisBackend``: geteilt zwischen allen Worker-Prozessen, für jeden
+  redis-py-kompatiblen Client.
+- ``SQLiteStore``: lokaler Ersatz für einen Redis-Server in einer SQLite-Datei,
+  damit der geteilte Betrieb ohne Redis entwickelt und getestet werden kann.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class SpeicherBackend:
+    """In-process LRU store for bytes values, bounded by max_bytes (keys + values)."""
+
+    name = 'speicher'
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return  # Larger than the whole budget, never cached
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(key) + len(old)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._bytes -= len(old_key) + len(old_value)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(key) + len(old)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'eintraege': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'verdraengt': self.evictions
+            }
+
+
+class RedisBackend:
+    """
+    Shared store on a Redis-compatible client. Eviction is the server's job
+    (e.g. maxmemory with allkeys-lru); ttl bounds the lifetime of entries whose
+    version is outdated.
+    """
+
+    name = 'geteilt'
+
+    def __init__(self, client, prefix='rezeptor:seite:', ttl=24 * 3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def stats(self):
+        stats = getattr(self.client, 'stats', None)
+        return stats() if stats else {}
+
+
+class SQLiteStore:
+    """
+    Local stand-in for a Redis server: get/set(ex=)/delete on a SQLite file that
+    all processes of the machine share. Evicts the least recently used entries
+    once the stored values exceed max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS seitencache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " zugriff REAL NOT NULL, ablauf REAL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_seitencache_zugriff ON seitencache (zugriff)")
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value FROM seitencache WHERE key = ? AND (ablauf IS NULL OR ablauf > ?)",
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE seitencache SET zugriff = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, value, ex=None):
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO seitencache (key, value, size, zugriff, ablauf) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value), now, now + ex if ex else None)
+        )
+        self._trim(connection, now)
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM seitencache WHERE key = ?", (key,))
+
+    def _trim(self, connection, now):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM seitencache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        connection.execute("DELETE FROM seitencache WHERE ablauf <= ?", (now,))
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM seitencache").fetchone()[0]
+        oldest = []
+        for key, size in connection.execute("SELECT key, size FROM seitencache ORDER BY zugriff"):
+            if total <= self.max_bytes:
+                break
+            oldest.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM seitencache WHERE key = ?", oldest)
+
+    def stats(self):
+        eintraege, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM seitencache"
+        ).fetchone()
+        return {'eintraege': eintraege, 'bytes': size, 'max_bytes': self.max_bytes}
+
+
+def create_backend(art, url=None, max_bytes=32 * 1024 * 1024, ttl=24 * 3600):
+    """
+    Creates the configured backend: 'speicher' (in-process), 'geteilt'
+    (redis://... URL, or the path of a SQLite file as local stand-in) or 'aus'.
+    """
+    if art == 'aus':
+        return None
+    if art == 'speicher':
+        return SpeicherBackend(max_bytes)
+    if art == 'geteilt':
+        if url.startswith(('redis://', 'rediss://', 'unix://')):
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("Für den geteilten Seitencache mit Redis wird das Paket 'redis' benötigt.")
+            client = redis.Redis.from_url(url)
+        else:
+            client = SQLiteStore(url, max_bytes)
+        return RedisBackend(client, ttl=ttl)
+    raise ValueError(f"Unbekanntes Seitencache-Backend: {art}")
+
+
+class SeitenCache:
+    """
+    Versioned cache for rendered page fragments ({name: html}) with hit and
+    miss counters. Backend errors are logged and treated as misses.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Returns the cached fragments for key, or None."""
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            log.exception("Seitencache nicht erreichbar (get %s)", key)
+            value = None
+        self._count(value is not None)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, fragments):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, json.dumps(fragments).encode('utf-8'))
+        except Exception:
+            log.exception("Seitencache nicht erreichbar (set %s)", key)
+
+    def delete(self, key):
+        if self.backend is None:
+            return
+        try:
+            self.backend.delete(key)
+        except Exception:
+            log.exception("Seitencache nicht erreichbar (delete %s)", key)
+
+    def stats(self):
+        """Counters of this process plus what the backend reports about its size."""
+        total = self.hits + self.misses
+        stats = {
+            'backend': self.backend.name if self.backend is not None else 'aus',
+            'treffer': self.hits,
+            'fehlversuche': self.misses,
+            'trefferquote': round(self.hits / total, 4) if total else None
+        }
+        if self.backend is not None:
+            try:
+                stats.update(self.backend.stats())
+            except Exception:
+                log.exception("Seitencache nicht erreichbar (stats)")
+        return stats
@@ -0,0 +1,167 @@
+"""
+Volltextsuche über Rezepte mit SQLite FTS5.
+
+Die virtuelle Tabelle ``rezept_fts`` enthält pro Rezept (rowid = rezept.id)
+Name, Beschreibung, Anleitung und die Namen der verknüpften Zutaten.
+Sie wird über Trigger auf ``rezept``, ``rezept_zutat`` und ``zutat`` aktuell
+gehalten, d.h. jeder Commit einer Route (oder eines anderen Schreibers) pflegt
+den Index inkrementell mit.
+
+Das Modul kennt die Flask-App nicht; alle Funktionen bekommen eine
+SQLAlchemy-Connection übergeben.
+"""
+
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+FTS_TABLE = 'rezept_fts'
+
+# Gewichte für bm25() in Spaltenreihenfolge: name, beschreibung, anleitung, zutaten
+BM25_WEIGHTS = (10.0, 2.0, 1.0, 5.0)
+
+# Steuerzeichen als Markierung im Snippet; werden nach dem HTML-Escaping ersetzt
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_ZUTATEN_SQL = (
+    "(SELECT group_concat(z.name, ' ') FROM rezept_zutat rz "
+    "JOIN zutat z ON z.id = rz.zutat_id WHERE rz.rezept_id = {ref})"
+)
+
+_CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    name, beschreibung, anleitung, zutaten,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_fts_ai AFTER INSERT ON rezept BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, beschreibung, anleitung, zutaten)
+        VALUES (new.id, new.name, new.beschreibung, new.anleitung,
+                {_ZUTATEN_SQL.format(ref='new.id')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_fts_au
+    AFTER UPDATE OF name, beschreibung, anleitung ON rezept BEGIN
+        UPDATE {FTS_TABLE}
+        SET name = new.name, beschreibung = new.beschreibung, anleitung = new.anleitung
+        WHERE rowid = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_fts_ad AFTER DELETE ON rezept BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_zutat_fts_ai AFTER INSERT ON rezept_zutat BEGIN
+        UPDATE {FTS_TABLE} SET zutaten = {_ZUTATEN_SQL.format(ref='new.rezept_id')}
+        WHERE rowid = new.rezept_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS rezept_zutat_fts_ad AFTER DELETE ON rezept_zutat BEGIN
+        UPDATE {FTS_TABLE} SET zutaten = {_ZUTATEN_SQL.format(ref='old.rezept_id')}
+        WHERE rowid = old.rezept_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS zutat_fts_au AFTER UPDATE OF name ON zutat BEGIN
+        UPDATE {FTS_TABLE} SET zutaten = {_ZUTATEN_SQL.format(ref=f'{FTS_TABLE}.rowid')}
+        WHERE rowid IN (SELECT rezept_id FROM rezept_zutat WHERE zutat_id = new.id);
+    END
+    """,
+]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def install(connection):
+    """
+    Creates the FTS table and its triggers if they do not exist yet.
+    Fills the index from the existing data when the table is new.
+    Returns True if the table was created.
+    """
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first() is not None
+    connection.execute(text(_CREATE_TABLE))
+    for trigger in _TRIGGERS:
+        connection.execute(text(trigger))
+    if not exists:
+        rebuild(connection)
+    return not exists
+
+
+def rebuild(connection):
+    """Rebuilds the whole index from rezept/rezept_zutat/zutat. Returns the row count."""
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    result = connection.execute(text(f"""
+        INSERT INTO {FTS_TABLE} (rowid, name, beschreibung, anleitung, zutaten)
+        SELECT r.id, r.name, r.beschreibung, r.anleitung, {_ZUTATEN_SQL.format(ref='r.id')}
+        FROM rezept r
+    """))
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+    return result.rowcount
+
+
+def build_match_query(user_input):
+    """
+    Turns free user input into a safe FTS5 MATCH expression.
+    Every word becomes a quoted prefix term; all terms must match.
+    Returns None if the input contains no searchable word.
+    """
+    tokens = _TOKEN_RE.findall(user_input or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def highlight(snippet):
+    """Escapes a raw snippet and turns the match markers into <mark> tags."""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search(connection, user_input, limit=20, offset=0):
+    """
+    Runs a BM25-ranked full-text search.
+    Returns a list of dicts with id, name, image_file, rank and a highlighted snippet.
+    """
+    match_query = build_match_query(user_input)
+    if match_query is None:
+        return []
+
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    rows = connection.execute(text(f"""
+        SELECT r.id, r.name, r.image_file, {FTS_TABLE}.rank AS rank,
+               snippet({FTS_TABLE}, -1, :start, :end, '…', 16) AS snippet
+        FROM {FTS_TABLE}
+        JOIN rezept r ON r.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :query AND {FTS_TABLE}.rank MATCH 'bm25({weights})'
+        ORDER BY {FTS_TABLE}.rank
+        LIMIT :limit OFFSET :offset
+    """), {
+        'query': match_query,
+        'start': _MARK_START,
+        'end': _MARK_END,
+        'limit': limit,
+        'offset': offset,
+    }).all()
+
+    return [
+        {
+            'id': row.id,
+            'name': row.name,
+            'image_file': row.image_file,
+            'rank': row.rank,
+            'snippet': highlight(row.snippet),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,38 @@
+"""
+Gemeinsame Fixtures: eine frische SQLite-Datenbank und ein Upload-Ordner im
+temporären Verzeichnis. app.py liest DATABASE_URL beim Import, deshalb wird
+die Umgebung gesetzt, bevor die App importiert wird.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_ORDNER = tempfile.mkdtemp(prefix='rezeptor-test-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_ORDNER, 'test.db')
+
+from app import app as flask_app, db, init_db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config.update(
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        UPLOAD_FOLDER=os.path.join(_ORDNER, 'uploads'),
+    )
+    with flask_app.app_context():
+        init_db()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def engine(app):
+    with app.app_context():
+        yield db.engine
@@ -0,0 +1,65 @@
+"""Ungültige Zeilen beim JSON-Lines-Import werden übersprungen und gemeldet, nie der ganze Import abgebrochen."""
+
+import json
+
+import pytest
+from sqlalchemy import text
+
+import austausch
+
+GUT = {'name': 'Pfannkuchen', 'anleitung': 'Backen.', 'zutaten': [{'name': 'Mehl', 'menge': 250, 'einheit': 'g'}]}
+
+
+def zeile(**felder):
+    return json.dumps(dict(GUT, **felder))
+
+
+@pytest.mark.parametrize('line, feld', [
+    (zeile(name=['Kuchen']), 'name'),
+    (zeile(name={'de': 'Kuchen'}), 'name'),
+    (zeile(anleitung=5), 'anleitung'),
+    (zeile(kategorie=7), 'kategorie'),
+    (zeile(kategorie={'name': 'Dessert'}), 'kategorie'),
+    (zeile(beschreibung={'kurz': 'lecker'}), 'beschreibung'),
+    (zeile(beschreibung=['lecker']), 'beschreibung'),
+    (zeile(quelle=42), 'quelle'),
+    (zeile().replace('"Backen."', '"Backen.", "portionen": Infinity'), 'portionen'),
+    (zeile().replace('"Backen."', '"Backen.", "portionen": NaN'), 'portionen'),
+    (zeile(portionen=10 ** 30), 'portionen'),
+    (zeile(kochzeit_minuten=1e300), 'kochzeit_minuten'),
+    (zeile(kochzeit_minuten='30'), 'kochzeit_minuten'),
+    (zeile(zutaten=5), 'zutaten'),
+    (zeile(zutaten={'name': 'Mehl'}), 'zutaten'),
+    (zeile(zutaten=['Mehl']), 'Zutat'),
+    (zeile(zutaten=[{'name': ['Mehl']}]), 'zutaten.name'),
+    (zeile(zutaten=[{'name': 'Mehl', 'einheit': 5}]), 'zutaten.einheit'),
+    (zeile(zutaten=[{'name': 'Mehl', 'menge': 10 ** 400}]), 'Menge'),
+    (zeile(zutaten=[{'name': 'Mehl', 'menge': '1e400'}]), 'Menge'),
+])
+def test_invalid_field_is_a_value_error(line, feld):
+    with pytest.raises(ValueError, match=feld):
+        austausch.parse_line(line)
+
+
+def test_valid_line():
+    rezept = austausch.parse_line(zeile(portionen=4.0, kategorie=' Dessert ', beschreibung=''))
+    assert rezept['portionen'] == 4 and rezept['kategorie'] == 'Dessert' and rezept['beschreibung'] is None
+    assert rezept['zutaten'] == [{'name': 'Mehl', 'menge': 250.0, 'einheit': 'g'}]
+
+
+def test_import_skips_bad_lines(engine):
+    lines = [
+        zeile(name='Import eins'),
+        zeile(name={'x': 1}),
+        zeile().replace('"Backen."', '"Backen.", "portionen": Infinity'),
+        zeile(name='Import zwei', beschreibung={'x': 1}),
+        '',
+        zeile(name='Import drei', kategorie='Import-Kategorie'),
+    ]
+    bericht = austausch.import_lines(engine, lines, batch_size=2)
+    assert bericht.rezepte == 2
+    assert bericht.fehler_anzahl == 3
+    assert [fehler.split(':')[0] for fehler in bericht.fehler] == ['Zeile 2', 'Zeile 3', 'Zeile 4']
+    with engine.connect() as connection:
+        names = connection.execute(text("SELECT name FROM rezept WHERE name LIKE 'Import %' ORDER BY name")).scalars()
+        assert list(names) == ['Import drei', 'Import eins']
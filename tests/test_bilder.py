@@ -0,0 +1,70 @@
+"""Hochgeladene Bilder sind nur über /bilder erreichbar, und nur fertige, inhaltsadressierte Dateien."""
+
+import os
+
+import bilder
+
+HASH = 'ab' * 32
+
+
+def write(folder, name, inhalt=b'bild'):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, name), 'wb') as f:
+        f.write(inhalt)
+
+
+def test_only_finished_uploads_are_served(app, client):
+    folder = app.config['UPLOAD_FOLDER']
+    for name in (f'{HASH}.jpg', f'{HASH}-jpg.thumb-50.webp', 'zz_probe.upload', 'zz_probe.tmp'):
+        write(folder, name)
+    response = client.get(f'/bilder/{HASH}.jpg')
+    assert response.status_code == 200 and 'immutable' in response.headers['Cache-Control']
+    assert client.get(f'/bilder/{HASH}-jpg.thumb-50.webp').status_code == 200
+    for name in ('zz_probe.upload', 'zz_probe.tmp'):
+        assert client.get(f'/bilder/{name}').status_code == 404
+        assert client.get(f'/static/uploads/{name}').status_code == 404
+
+
+def test_upload_folder_is_not_static(app):
+    from app import UPLOAD_FOLDER
+    static = os.path.abspath(app.static_folder) + os.sep
+    assert not os.path.abspath(UPLOAD_FOLDER).startswith(static)
+
+
+def test_move_folder(tmp_path):
+    alt, neu = str(tmp_path / 'static' / 'uploads'), str(tmp_path / 'instance' / 'uploads')
+    write(alt, f'{HASH}.jpg', b'alt')
+    write(alt, 'schon-da.png', b'alt')
+    write(alt, '.gitkeep', b'')
+    write(neu, 'schon-da.png', b'neu')
+    assert bilder.move_folder(alt, neu) == 1
+    assert sorted(os.listdir(neu)) == [f'{HASH}.jpg', 'schon-da.png']
+    with open(os.path.join(neu, 'schon-da.png'), 'rb') as f:
+        assert f.read() == b'neu'
+    assert bilder.move_folder(alt, neu) == 0
+
+
+def test_init_db_renames_legacy_images(app, client, engine):
+    from sqlalchemy import text
+
+    from app import init_db
+    folder = app.config['UPLOAD_FOLDER']
+    alt = 'f' * 32 + '.png'  # uuid4().hex name of older versions
+    write(folder, alt, b'altes bild')
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO rezept (name, anleitung, image_file) VALUES ('Altes Bild', 'Backen.', :datei)"
+        ), {'datei': alt})
+    assert client.get(f'/bilder/{alt}').status_code == 404
+
+    with app.app_context():
+        init_db()
+        init_db()  # Idempotent
+    with engine.connect() as connection:
+        neu = connection.execute(text("SELECT image_file FROM rezept WHERE name = 'Altes Bild'")).scalar()
+        jobs = connection.execute(text(
+            "SELECT COUNT(*) FROM auftrag WHERE art = 'bild_varianten' AND daten LIKE :datei"
+        ), {'datei': f'%{neu}%'}).scalar()
+    assert bilder.is_servable(neu) and jobs == 1
+    assert not os.path.exists(os.path.join(folder, alt))
+    assert client.get(f'/bilder/{neu}').get_data() == b'altes bild'
@@ -0,0 +1,27 @@
+"""Blätter-Cursor (?nach=, ?vor=) werden vor der Datenbank geprüft: nur (Name, id) ist gültig."""
+
+import base64
+
+import pytest
+
+from app import encode_cursor
+
+URLS = ('/?nach=', '/?vor=', '/kategorie/1?nach=', '/api/v1/rezepte?nach=')
+
+
+@pytest.mark.parametrize('cursor', [
+    encode_cursor({'a': 1}, 2),
+    encode_cursor('x', 2 ** 70),
+    encode_cursor('x', True),
+    encode_cursor('x'),
+    base64.urlsafe_b64encode(b'{"x": 1}').decode('ascii'),
+    'kein-cursor',
+])
+def test_malformed_cursor_is_a_bad_request(client, cursor):
+    for url in URLS:
+        assert client.get(url + cursor).status_code == 400, url
+
+
+def test_valid_cursor(client):
+    for url in URLS:
+        assert client.get(url + encode_cursor('M', 1)).status_code == 200, url
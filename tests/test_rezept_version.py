@@ -0,0 +1,42 @@
+"""Seiten-ETags und Fragment-Cache dürfen ein gelöschtes Rezept nie einem neuen mit derselben id zuordnen."""
+
+from sqlalchemy import text
+
+
+def create_recipe(client, engine, name):
+    response = client.post('/add', data={'name': name, 'anleitung': 'Alles verrühren.', 'category': ''})
+    assert response.status_code == 302
+    with engine.connect() as connection:
+        return connection.execute(text('SELECT MAX(id) FROM rezept')).scalar()
+
+
+def test_recreated_id_gets_a_new_version(client, engine):
+    old_id = create_recipe(client, engine, 'Alter Kuchen')
+    client.get(f'/rezept/{old_id}')  # Takes the flash message of /add
+    old_page = client.get(f'/rezept/{old_id}')
+    assert old_page.status_code == 200 and 'Alter Kuchen' in old_page.get_data(as_text=True)
+    old_etag = old_page.headers['ETag']
+
+    assert client.post(f'/delete/{old_id}').status_code == 302
+    new_id = create_recipe(client, engine, 'Neue Suppe')
+    assert new_id == old_id  # SQLite hands out the deleted id again
+    client.get('/')  # Takes the pending flash messages
+
+    response = client.get(f'/rezept/{new_id}', headers={'If-None-Match': old_etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != old_etag
+    body = response.get_data(as_text=True)
+    assert 'Neue Suppe' in body and 'Alter Kuchen' not in body
+
+
+def test_edit_bumps_the_version(client, engine):
+    rezept_id = create_recipe(client, engine, 'Gemüsepfanne')
+    with engine.connect() as connection:
+        before = connection.execute(text('SELECT version FROM rezept WHERE id = :id'), {'id': rezept_id}).scalar()
+    response = client.post(f'/edit/{rezept_id}', data={
+        'name': 'Gemüsepfanne scharf', 'anleitung': 'Alles anbraten.', 'category': ''
+    })
+    assert response.status_code == 302
+    with engine.connect() as connection:
+        after = connection.execute(text('SELECT version FROM rezept WHERE id = :id'), {'id': rezept_id}).scalar()
+    assert after > before
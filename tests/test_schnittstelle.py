@@ -0,0 +1,25 @@
+"""Eingaben der JSON-API, die vor der Datenbank abgewiesen werden müssen (400 statt 500)."""
+
+import pytest
+
+import schnittstelle
+
+
+@pytest.mark.parametrize('value', ['99999999999999999999999', str(2 ** 63), '0', '-1', '1,2,x'])
+def test_parse_ids_rejects(value):
+    with pytest.raises(ValueError):
+        schnittstelle.parse_ids(value, 100)
+
+
+def test_parse_ids_keeps_order_without_duplicates():
+    assert schnittstelle.parse_ids(f'3, 1,3,{2 ** 63 - 1}', 100) == [3, 1, 2 ** 63 - 1]
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/rezepte?ids=99999999999999999999999',
+    '/api/v1/zutaten?ids=1,99999999999999999999999',
+    '/einkaufsliste/export.csv?ids=99999999999999999999999',
+])
+def test_out_of_range_ids_are_a_bad_request(client, url):
+    assert client.get(url).status_code == 400
+
@@ -0,0 +1,57 @@
+"""Die Schreibsperre (BEGIN IMMEDIATE) nehmen nur Views, die schreiben."""
+
+import io
+
+import pytest
+from sqlalchemy import event
+
+import app as rezeptor
+
+
+@pytest.fixture
+def begins(engine):
+    """Records the BEGIN statements the engine emits."""
+    gesehen = []
+
+    def mitschreiben(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('BEGIN'):
+            gesehen.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', mitschreiben)
+    yield gesehen
+    event.remove(engine, 'before_cursor_execute', mitschreiben)
+
+
+def test_read_only_post_takes_no_write_lock(client, begins):
+    client.post('/einkaufsliste', data={'recipe_ids': [1], 'desired_portions': 2})
+    client.post('/einkaufsliste/export.csv', data={'recipe_ids': [1], 'desired_portions': 2})
+    assert begins
+    assert 'BEGIN IMMEDIATE' not in begins
+
+
+def test_upload_is_stored_outside_a_transaction(client, begins, monkeypatch):
+    beim_speichern = []
+    store_upload = rezeptor.bilder.store_upload
+
+    def beobachten(*args, **kwargs):
+        beim_speichern.append((rezeptor.db.session().get_transaction(), list(begins)))
+        return store_upload(*args, **kwargs)
+
+    monkeypatch.setattr(rezeptor.bilder, 'store_upload', beobachten)
+    antwort = client.post('/add', data={
+        'name': 'Sperrkuchen', 'anleitung': 'Backen.', 'portionen': 4, 'category': '',
+        'image': (io.BytesIO(b'bild'), 'kuchen.jpg'),
+    }, content_type='multipart/form-data')
+    assert antwort.status_code == 302
+    [(transaktion, davor)] = beim_speichern
+    assert transaktion is None
+    assert 'BEGIN IMMEDIATE' not in davor
+    assert 'BEGIN IMMEDIATE' in begins[len(davor):]
+
+
+def test_writing_view_takes_write_lock(client, engine, begins):
+    with engine.connect() as conn:
+        rezept_id = conn.exec_driver_sql('SELECT max(id) FROM rezept').scalar()
+    begins.clear()
+    client.post(f'/rezept/{rezept_id}/add_ingredient', data={'zutat_name': 'Mehl', 'menge': 200, 'einheit': 'g'})
+    assert begins and set(begins) == {'BEGIN IMMEDIATE'}
@@ -0,0 +1,98 @@
+"""Die als Delta gebuchte Einkaufsliste eines Plans stimmt nach jedem Schritt mit einer Neuberechnung überein."""
+
+import pytest
+from sqlalchemy import text
+
+import wochenplan
+from app import db
+
+
+@pytest.fixture
+def engine(app):
+    """The engine without a pushed app context, so every request gets its own session."""
+    with app.app_context():
+        return db.engine
+
+
+def posten(connection, plan_id):
+    return {
+        (zutat_id, dimension): (pytest.approx(menge_basis), anzahl)
+        for zutat_id, dimension, menge_basis, anzahl in connection.execute(
+            text('SELECT zutat_id, dimension, menge_basis, anzahl FROM plan_posten WHERE plan_id = :id'),
+            {'id': plan_id}
+        )
+    }
+
+
+def assert_matches_rebuild(engine, plan_id):
+    """The booked list equals the one rebuild() computes from the entries."""
+    with engine.connect() as connection:
+        gebucht = posten(connection, plan_id)
+        wochenplan.rebuild(connection, [plan_id])
+        neu = posten(connection, plan_id)
+        connection.rollback()
+    assert gebucht == neu
+    return gebucht
+
+
+def add_recipe(client, engine, name, portionen, zutaten):
+    client.post('/add', data={'name': name, 'anleitung': 'Kochen.', 'portionen': portionen, 'category': ''})
+    with engine.connect() as connection:
+        rezept_id = connection.execute(text('SELECT id FROM rezept WHERE name = :n'), {'n': name}).scalar_one()
+    for zutat_name, menge, einheit in zutaten:
+        client.post(f'/rezept/{rezept_id}/add_ingredient',
+                    data={'zutat_name': zutat_name, 'menge': menge, 'einheit': einheit})
+    return rezept_id
+
+
+def zutat_id(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text('SELECT id FROM zutat WHERE name = :n'), {'n': name}).scalar_one()
+
+
+def eintrag_ids(engine, plan_id):
+    with engine.connect() as connection:
+        return connection.execute(
+            text('SELECT id FROM plan_eintrag WHERE plan_id = :id ORDER BY id'), {'id': plan_id}
+        ).scalars().all()
+
+
+def test_deltas_match_rebuild(client, engine):
+    auflauf = add_recipe(client, engine, 'Planauflauf', 4, [
+        ('Plannudeln', 500, 'g'), ('Plansahne', 200, 'ml'), ('Planeier', 2, 'Stück'),
+    ])
+    kuchen = add_recipe(client, engine, 'Plankuchen', 8, [
+        ('Plannudeln', 0.25, 'kg'), ('Planeier', 3, 'Stück'), ('Planzucker', None, ''),
+    ])
+    antwort = client.post('/wochenplan', data={'name': 'Testwoche'})
+    plan_id = int(antwort.headers['Location'].rsplit('/', 1)[1])
+
+    def einplanen(rezept_id, tag, portionen):
+        client.post(f'/rezept/{rezept_id}/einplanen',
+                    data={'plan': plan_id, 'tag': tag, 'mahlzeit': 'abend', 'portionen': portionen})
+        return assert_matches_rebuild(engine, plan_id)
+
+    einplanen(auflauf, 0, 2)
+    einplanen(auflauf, 1, 3)
+    assert len(einplanen(kuchen, 2, 4)) == 4
+
+    erster, zweiter, dritter = eintrag_ids(engine, plan_id)
+    client.post(f'/wochenplan/{plan_id}/eintrag/{zweiter}/portionen', data={'portionen': 6})
+    assert_matches_rebuild(engine, plan_id)
+
+    client.post(f'/wochenplan/{plan_id}/eintrag/{erster}/loeschen')
+    assert eintrag_ids(engine, plan_id) == [zweiter, dritter]
+    assert_matches_rebuild(engine, plan_id)
+
+    client.post(f'/edit/{auflauf}', data={'name': 'Planauflauf', 'anleitung': 'Kochen.', 'portionen': 3, 'category': ''})
+    assert_matches_rebuild(engine, plan_id)
+
+    client.post(f'/rezept/{auflauf}/add_ingredient', data={'zutat_name': 'Plankäse', 'menge': 150, 'einheit': 'g'})
+    assert len(assert_matches_rebuild(engine, plan_id)) == 5
+
+    client.post(f'/rezept/{auflauf}/delete_ingredient/{zutat_id(engine, "Plansahne")}')
+    assert len(assert_matches_rebuild(engine, plan_id)) == 4
+
+    client.post(f'/delete/{kuchen}')
+    assert eintrag_ids(engine, plan_id) == [zweiter]
+    assert len(assert_matches_rebuild(engine, plan_id)) == 3
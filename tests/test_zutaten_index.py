@@ -0,0 +1,35 @@
+"""Rangfolge von "Was kann ich kochen?": weniger fehlende Zutaten, dann mehr vorhandene, dann kleinere id."""
+
+import random
+
+from zutaten_index import ZutatenIndex
+
+
+def index(rezepte):
+    zutaten_index = ZutatenIndex()
+    zutaten_index.build([(rezept_id, zutat_id) for rezept_id, zutaten in rezepte.items() for zutat_id in zutaten], 1)
+    return zutaten_index
+
+
+def test_ties_go_to_the_lower_id():
+    # Four 2-ingredient recipes with one match each
+    zutaten_index = index({1: [100, 1], 2: [200, 2], 3: [100, 3], 4: [200, 4]})
+    assert [t.rezept_id for t in zutaten_index.query([100, 200], limit=2)] == [1, 2]
+    assert [t.rezept_id for t in zutaten_index.query([200, 100], limit=3)] == [1, 2, 3]
+
+
+def test_matches_a_full_sort():
+    rng = random.Random(7)
+    rezepte = {rezept_id: rng.sample(range(30), rng.randint(1, 6)) for rezept_id in range(1, 400)}
+    zutaten_index = index(rezepte)
+    for _ in range(50):
+        vorrat = set(rng.sample(range(30), rng.randint(1, 10)))
+        erwartet = sorted(
+            (len(set(zutaten) - vorrat), -len(set(zutaten) & vorrat), rezept_id)
+            for rezept_id, zutaten in rezepte.items() if set(zutaten) & vorrat
+        )
+        for limit in (1, 5, 20):
+            treffer = zutaten_index.query(vorrat, limit=limit)
+            assert [t.rezept_id for t in treffer] == [rezept_id for _, _, rezept_id in erwartet[:limit]]
+        treffer = zutaten_index.query(vorrat, limit=20, max_fehlend=1)
+        assert [t.rezept_id for t in treffer] == [r for f, _, r in erwartet if f <= 1][:20]
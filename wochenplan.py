@@ -0,0 +1,262 @@
+"""
+Wochenpläne mit materialisierter Einkaufsliste.
+
+Ein Plan besteht aus Einträgen (Tag x Mahlzeit x Rezept x Portionen). Seine
+Einkaufsliste liegt fertig summiert in ``plan_posten``: eine Zeile pro
+(Plan, Zutat, Dimension) mit der Menge in der Basiseinheit (siehe einheiten.py)
+und der Anzahl der Rezeptzeilen, die dazu beitragen.
+
+Jede Änderung wird als Delta gebucht, nie durch Neuberechnung der ganzen
+Liste: Ein Eintrag addiert den skalierten Beitrag seines Rezepts, Entfernen
+zieht ihn wieder ab, eine Portionsänderung bucht nur die Differenz. Das kostet
+O(Zutaten eines Rezepts), egal wie viele Einträge der Plan hat. Ändert sich
+ein Rezept selbst (Zutaten, Portionen), ziehen die Schreib-Routen seinen
+Beitrag vor der Änderung ab (``subtract_recipe``) und buchen ihn danach neu
+(``add_recipe``). Fällt der Zähler einer Zeile auf 0, wird sie gelöscht, so
+dass sich keine Rundungsreste ansammeln.
+
+Alle Funktionen arbeiten auf der Verbindung (und Transaktion) des Aufrufers.
+"""
+
+from sqlalchemy import text
+
+import einheiten
+import einkaufsliste
+
+TAGE = ('Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag')
+MAHLZEITEN = {
+    'fruehstueck': 'Frühstück',
+    'mittag': 'Mittagessen',
+    'abend': 'Abendessen',
+}
+
+_UPSERT_SQL = text("""
+    INSERT INTO plan_posten (plan_id, zutat_id, dimension, menge_basis, anzahl)
+    VALUES (:plan_id, :zutat_id, :dimension, :menge, :anzahl)
+    ON CONFLICT (plan_id, zutat_id, dimension) DO UPDATE SET
+        menge_basis = plan_posten.menge_basis + excluded.menge_basis,
+        anzahl = plan_posten.anzahl + excluded.anzahl
+""")
+
+_DELETE_EMPTY_SQL = text("""
+    DELETE FROM plan_posten
+    WHERE plan_id = :plan_id AND zutat_id = :zutat_id AND dimension = :dimension AND anzahl <= 0
+""")
+
+
+def _recipe_rows(connection, rezept_id):
+    """
+    Returns (portionen, [(zutat_id, dimension, menge_basis)]) of a recipe,
+    normalising rows that predate the menge_basis/dimension columns.
+    """
+    portionen = connection.execute(
+        text('SELECT portionen FROM rezept WHERE id = :id'), {'id': rezept_id}
+    ).scalar()
+    rows = []
+    for zutat_id, menge_basis, dimension, menge, einheit in connection.execute(
+        text('SELECT zutat_id, menge_basis, dimension, menge, einheit '
+             'FROM rezept_zutat WHERE rezept_id = :id'),
+        {'id': rezept_id}
+    ):
+        if dimension is None:
+            menge_basis, dimension = einheiten.normalize(menge, einheit)
+        rows.append((zutat_id, dimension, menge_basis))
+    return portionen, rows
+
+
+def _factor(rezept_id, rezept_portionen, portionen):
+    """Scaling factor of a recipe for the planned portions (same rule as the one-shot list)."""
+    factors, _ = einkaufsliste.scaling_factors([(rezept_id, '', rezept_portionen)], portionen)
+    return factors[rezept_id]
+
+
+def _book(connection, plan_id, rows, factor, anzahl):
+    """Adds factor times the recipe rows to the plan's list and anzahl to their counters."""
+    if not rows:
+        return
+    connection.execute(_UPSERT_SQL, [
+        {
+            'plan_id': plan_id, 'zutat_id': zutat_id, 'dimension': dimension,
+            'menge': menge_basis * factor if menge_basis is not None else 0.0,
+            'anzahl': anzahl
+        }
+        for zutat_id, dimension, menge_basis in rows
+    ])
+    if anzahl < 0:
+        connection.execute(_DELETE_EMPTY_SQL, [
+            {'plan_id': plan_id, 'zutat_id': zutat_id, 'dimension': dimension}
+            for zutat_id, dimension, _ in rows
+        ])
+
+
+def add_entry(connection, plan_id, tag, mahlzeit, rezept_id, portionen):
+    """Plans a recipe and books its contribution. Returns the new entry id."""
+    eintrag_id = connection.execute(
+        text('INSERT INTO plan_eintrag (plan_id, tag, mahlzeit, rezept_id, portionen) '
+             'VALUES (:plan_id, :tag, :mahlzeit, :rezept_id, :portionen)'),
+        {'plan_id': plan_id, 'tag': tag, 'mahlzeit': mahlzeit,
+         'rezept_id': rezept_id, 'portionen': portionen}
+    ).lastrowid
+    rezept_portionen, rows = _recipe_rows(connection, rezept_id)
+    _book(connection, plan_id, rows, _factor(rezept_id, rezept_portionen, portionen), 1)
+    return eintrag_id
+
+
+def _get_entry(connection, plan_id, eintrag_id):
+    return connection.execute(
+        text('SELECT rezept_id, portionen FROM plan_eintrag WHERE id = :id AND plan_id = :plan_id'),
+        {'id': eintrag_id, 'plan_id': plan_id}
+    ).first()
+
+
+def remove_entry(connection, plan_id, eintrag_id):
+    """Removes an entry and takes its contribution back. Returns False if it does not exist."""
+    entry = _get_entry(connection, plan_id, eintrag_id)
+    if entry is None:
+        return False
+    rezept_portionen, rows = _recipe_rows(connection, entry.rezept_id)
+    _book(connection, plan_id, rows, -_factor(entry.rezept_id, rezept_portionen, entry.portionen), -1)
+    connection.execute(text('DELETE FROM plan_eintrag WHERE id = :id'), {'id': eintrag_id})
+    return True
+
+
+def change_portions(connection, plan_id, eintrag_id, portionen):
+    """Changes the portions of an entry, booking only the difference. Returns False if missing."""
+    entry = _get_entry(connection, plan_id, eintrag_id)
+    if entry is None:
+        return False
+    if portionen != entry.portionen:
+        rezept_portionen, rows = _recipe_rows(connection, entry.rezept_id)
+        delta = (_factor(entry.rezept_id, rezept_portionen, portionen)
+                 - _factor(entry.rezept_id, rezept_portionen, entry.portionen))
+        _book(connection, plan_id, rows, delta, 0)
+        connection.execute(
+            text('UPDATE plan_eintrag SET portionen = :portionen WHERE id = :id'),
+            {'portionen': portionen, 'id': eintrag_id}
+        )
+    return True
+
+
+def _entries_of_recipe(connection, rezept_id):
+    return connection.execute(
+        text('SELECT id, plan_id, portionen FROM plan_eintrag WHERE rezept_id = :id'),
+        {'id': rezept_id}
+    ).all()
+
+
+def subtract_recipe(connection, rezept_id):
+    """
+    Takes the contribution of a recipe out of every plan that contains it.
+    Call before changing the recipe's ingredients or portions, and call
+    add_recipe after the change has been flushed.
+    """
+    entries = _entries_of_recipe(connection, rezept_id)
+    if entries:
+        rezept_portionen, rows = _recipe_rows(connection, rezept_id)
+        for _, plan_id, portionen in entries:
+            _book(connection, plan_id, rows, -_factor(rezept_id, rezept_portionen, portionen), -1)
+    return len(entries)
+
+
+def add_recipe(connection, rezept_id):
+    """Books the (changed) recipe again into every plan that contains it."""
+    entries = _entries_of_recipe(connection, rezept_id)
+    if entries:
+        rezept_portionen, rows = _recipe_rows(connection, rezept_id)
+        for _, plan_id, portionen in entries:
+            _book(connection, plan_id, rows, _factor(rezept_id, rezept_portionen, portionen), 1)
+    return len(entries)
+
+
+def remove_recipe(connection, rezept_id):
+    """Removes a recipe that is about to be deleted from all plans."""
+    subtract_recipe(connection, rezept_id)
+    connection.execute(text('DELETE FROM plan_eintrag WHERE rezept_id = :id'), {'id': rezept_id})
+
+
+def delete_plan(connection, plan_id):
+    for table in ('plan_posten', 'plan_eintrag'):
+        connection.execute(text(f'DELETE FROM {table} WHERE plan_id = :id'), {'id': plan_id})
+    connection.execute(text('DELETE FROM wochenplan WHERE id = :id'), {'id': plan_id})
+
+
+def rebuild(connection, plan_ids=None):
+    """
+    Recomputes the materialised lists from the entries (repair, e.g. after
+    changes that bypassed the application). Returns the number of plans.
+    """
+    if plan_ids is None:
+        plan_ids = connection.execute(text('SELECT id FROM wochenplan')).scalars().all()
+    for plan_id in plan_ids:
+        connection.execute(text('DELETE FROM plan_posten WHERE plan_id = :id'), {'id': plan_id})
+        entries = connection.execute(
+            text('SELECT rezept_id, portionen FROM plan_eintrag WHERE plan_id = :id'), {'id': plan_id}
+        ).all()
+        recipes = {}
+        for rezept_id, portionen in entries:
+            if rezept_id not in recipes:
+                recipes[rezept_id] = _recipe_rows(connection, rezept_id)
+            rezept_portionen, rows = recipes[rezept_id]
+            _book(connection, plan_id, rows, _factor(rezept_id, rezept_portionen, portionen), 1)
+    return len(plan_ids)
+
+
+def shopping_list(connection, plan_id):
+    """
+    Reads the materialised list of a plan in the format of the one-shot list:
+    {zutat_name: {einheit: menge}}.
+    """
+    totals = {}
+    for name, dimension, menge_basis in connection.execute(
+        text('SELECT z.name, p.dimension, p.menge_basis FROM plan_posten p '
+             'JOIN zutat z ON z.id = p.zutat_id WHERE p.plan_id = :id'),
+        {'id': plan_id}
+    ):
+        key = (einkaufsliste.normalize_name(name), dimension)
+        totals[key] = totals.get(key, 0.0) + menge_basis
+    result = {}
+    for (name, dimension), total in totals.items():
+        # Deltas may leave float noise such as -1e-14 behind
+        menge, einheit = einheiten.display(total if abs(total) > 1e-9 else 0.0, dimension)
+        result.setdefault(name, {})[einheit] = menge
+    return result
+
+
+def entries(connection, plan_id):
+    """Entries of a plan with recipe names, ordered by day and meal."""
+    order = {mahlzeit: i for i, mahlzeit in enumerate(MAHLZEITEN)}
+    rows = connection.execute(
+        text('SELECT e.id, e.tag, e.mahlzeit, e.rezept_id, r.name, e.portionen '
+             'FROM plan_eintrag e JOIN rezept r ON r.id = e.rezept_id '
+             'WHERE e.plan_id = :id ORDER BY e.tag, e.id'),
+        {'id': plan_id}
+    ).all()
+    return sorted(rows, key=lambda row: (row.tag, order.get(row.mahlzeit, len(order)), row.id))
+
+
+def export_plan(connection, plan_id):
+    """The plan with its entries and shopping list as a JSON-ready dict, or None."""
+    name = connection.execute(
+        text('SELECT name FROM wochenplan WHERE id = :id'), {'id': plan_id}
+    ).scalar()
+    if name is None:
+        return None
+    return {
+        'id': plan_id,
+        'name': name,
+        'eintraege': [
+            {
+                'tag': TAGE[row.tag],
+                'mahlzeit': MAHLZEITEN.get(row.mahlzeit, row.mahlzeit),
+                'rezept_id': row.rezept_id,
+                'rezept': row.name,
+                'portionen': row.portionen,
+            }
+            for row in entries(connection, plan_id)
+        ],
+        'einkaufsliste': [
+            {'zutat': zutat, 'menge': round(menge, 3), 'einheit': einheit}
+            for zutat, mengen in sorted(shopping_list(connection, plan_id).items())
+            for einheit, menge in sorted(mengen.items())
+        ],
+    }
@@ -0,0 +1,170 @@
+"""
+Invertierter Zutaten-Index für "Was kann ich mit diesen Zutaten kochen?".
+
+Hält im Prozess für jede Zutat sortierte ``array('I')``-Postings der
+Rezept-IDs, die sie verwenden, sowie pro Rezept die IDs seiner Zutaten.
+Die Postings sind zusätzlich nach der Zutatenanzahl des Rezepts aufgeteilt:
+innerhalb eines solchen Eimers bedeutet "mehr Zutaten vorhanden" auch
+"weniger fehlt", so dass die besten Treffer pro Eimer mit
+``Counter.most_common`` (in C) gefunden werden und Python nur noch wenige
+Kandidaten vergleichen muss. Gezählt wird in aufsteigender ID-Reihenfolge,
+damit bei Gleichstand die kleinere ID gewinnt. Eine Abfrage braucht keinen Datenbankzugriff.
+
+Der Index wird aus der Tabelle ``rezept_zutat`` aufgebaut und von den
+Schreib-Routen inkrementell nachgeführt. Über die Versionsnummer
+(``datenstand``) erkennt er Änderungen anderer Prozesse und wird dann beim
+nächsten Zugriff neu aufgebaut.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from itertools import chain
+
+Treffer = namedtuple('Treffer', ['rezept_id', 'vorhanden', 'gesamt', 'fehlend'])
+
+ADD = 'add'
+REMOVE = 'remove'
+
+
+class ZutatenIndex:
+    """Inverted index zutat_id -> {recipe size -> sorted recipe ids}, plus recipe -> zutat ids."""
+
+    def __init__(self):
+        self._postings = {}
+        self._rezept_zutaten = {}
+        self._lock = threading.Lock()
+        self.version = None
+
+    @property
+    def is_loaded(self):
+        return self.version is not None
+
+    def build(self, rows, version):
+        """Builds the index from (rezept_id, zutat_id) rows in any order."""
+        rezept_zutaten = {}
+        for rezept_id, zutat_id in rows:
+            zutaten = rezept_zutaten.get(rezept_id)
+            if zutaten is None:
+                zutaten = rezept_zutaten[rezept_id] = array('I')
+            zutaten.append(zutat_id)
+
+        # Ascending recipe ids, so every posting comes out sorted
+        postings = {}
+        for rezept_id in sorted(rezept_zutaten):
+            zutaten = rezept_zutaten[rezept_id]
+            size = len(zutaten)
+            for zutat_id in zutaten:
+                buckets = postings.get(zutat_id)
+                if buckets is None:
+                    buckets = postings[zutat_id] = {}
+                posting = buckets.get(size)
+                if posting is None:
+                    posting = buckets[size] = array('I')
+                posting.append(rezept_id)
+
+        with self._lock:
+            self._postings = postings
+            self._rezept_zutaten = rezept_zutaten
+            self.version = version
+
+    def zutaten_of(self, rezept_id):
+        """Returns the ingredient ids of a recipe known to the index."""
+        return tuple(self._rezept_zutaten.get(rezept_id, ()))
+
+    def apply(self, changes, new_version):
+        """
+        Applies committed link changes [(ADD|REMOVE, rezept_id, zutat_id), ...].
+        new_version is the datenstand after the commit. If it does not match
+        the own version plus the number of changes, another writer was involved
+        and the index is marked stale instead.
+        """
+        with self._lock:
+            if self.version is None or new_version - self.version != len(changes):
+                self.version = None
+                return False
+            for action, rezept_id, zutat_id in changes:
+                if action == ADD:
+                    self._add(rezept_id, zutat_id)
+                else:
+                    self._remove(rezept_id, zutat_id)
+            self.version = new_version
+            return True
+
+    def _insert(self, zutat_id, size, rezept_id):
+        posting = self._postings.setdefault(zutat_id, {}).setdefault(size, array('I'))
+        posting.insert(bisect_left(posting, rezept_id), rezept_id)
+
+    def _delete(self, zutat_id, size, rezept_id):
+        buckets = self._postings[zutat_id]
+        posting = buckets[size]
+        del posting[bisect_left(posting, rezept_id)]
+        if not posting:
+            del buckets[size]
+            if not buckets:
+                del self._postings[zutat_id]
+
+    def _resize(self, rezept_id, zutaten, old_size, new_size):
+        """Moves a recipe into the bucket of its new ingredient count."""
+        for zutat_id in zutaten:
+            self._delete(zutat_id, old_size, rezept_id)
+            self._insert(zutat_id, new_size, rezept_id)
+
+    def _add(self, rezept_id, zutat_id):
+        zutaten = self._rezept_zutaten.setdefault(rezept_id, array('I'))
+        if zutat_id in zutaten:
+            return
+        size = len(zutaten)
+        self._resize(rezept_id, zutaten, size, size + 1)
+        self._insert(zutat_id, size + 1, rezept_id)
+        zutaten.append(zutat_id)
+
+    def _remove(self, rezept_id, zutat_id):
+        zutaten = self._rezept_zutaten.get(rezept_id)
+        if zutaten is None or zutat_id not in zutaten:
+            return
+        size = len(zutaten)
+        self._delete(zutat_id, size, rezept_id)
+        zutaten.remove(zutat_id)
+        if zutaten:
+            self._resize(rezept_id, zutaten, size, size - 1)
+        else:
+            del self._rezept_zutaten[rezept_id]
+
+    def query(self, zutat_ids, limit=20, max_fehlend=None):
+        """
+        Ranks recipes by how many of their ingredients are missing from zutat_ids
+        (fewest first), then by how many are covered, then by id.
+        Returns a list of Treffer with the missing ingredient ids.
+        """
+        vorrat = set(zutat_ids)
+        with self._lock:
+            # Postings of the pantry's ingredients, separately per recipe size
+            postings_by_size = {}
+            for zutat_id in vorrat:
+                for size, posting in self._postings.get(zutat_id, {}).items():
+                    postings_by_size.setdefault(size, []).append(posting)
+
+            candidates = []
+            for size, postings in postings_by_size.items():
+                # Covered ingredients per recipe, counted in ascending id order: most_common()
+                # keeps that order among equal counts, so a tie at the limit goes to the lower id
+                counts = Counter(sorted(chain.from_iterable(postings)))
+                for rezept_id, vorhanden in counts.most_common(limit):
+                    fehlend = size - vorhanden
+                    if max_fehlend is not None and fehlend > max_fehlend:
+                        break
+                    candidates.append((fehlend, -vorhanden, rezept_id))
+            candidates.sort()
+
+            rezept_zutaten = self._rezept_zutaten
+            return [
+                Treffer(
+                    rezept_id=rezept_id,
+                    vorhanden=-minus_vorhanden,
+                    gesamt=len(rezept_zutaten[rezept_id]),
+                    fehlend=tuple(z for z in rezept_zutaten[rezept_id] if z not in vorrat)
+                )
+                for _, minus_vorhanden, rezept_id in candidates[:limit]
+            ]
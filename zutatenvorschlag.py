@@ -0,0 +1,174 @@
+"""
+Vorschläge für Zutatennamen beim Tippen (Autovervollständigung).
+
+Damit aus "Tomate", "Tomaten" und "tomaten, passiert" nicht jedes Mal eine
+neue Zutat wird, schlägt das Formular bestehende Zutaten vor. Grundlage ist
+ein Index im Prozess über die normalisierten Namen (``zutatnamen.normalize_name``):
+
+- eine sortierte Liste der Namen für Präfixtreffer (``bisect``), die zuerst
+  kommen;
+- Trigramm-Postings (``array('I')`` mit Positionen, aufsteigend) für
+  unscharfe Treffer, gerankt nach Dice-Ähnlichkeit der Trigrammmengen.
+
+Namen und Trigramme werden interniert, IDs und Längen liegen in Arrays. Zutaten
+werden nie gelöscht oder umbenannt, der Index wächst daher nur: ``add`` hängt
+neue Zeilen an, ``max_id`` sagt, ab welcher ID nachgeladen werden muss (auch
+wenn ein anderer Prozess Zutaten angelegt hat).
+"""
+
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from zutatnamen import normalize_name
+
+Vorschlag = namedtuple('Vorschlag', ['zutat_id', 'name', 'aehnlichkeit'])
+
+# Mindest-Ähnlichkeit (Dice-Koeffizient der Trigramme) für unscharfe Treffer
+MIN_AEHNLICHKEIT = 0.3
+# Höchstzahl an Postings, die pro Abfrage vollständig gezählt werden
+SCAN_BUDGET = 10000
+# Kandidaten (nach seltenen Trigrammen) pro gewünschtem Vorschlag, die exakt bewertet werden
+KANDIDATEN_FAKTOR = 20
+
+_NICHT_WORT = re.compile(r'[^\w]+')
+
+
+def trigrams(key):
+    """Set of padded trigrams of a normalised name, e.g. 'ei' -> {'  e', ' ei', 'ei '}."""
+    words = _NICHT_WORT.sub(' ', key).split()
+    if not words:
+        return set()
+    padded = '  ' + ' '.join(words) + ' '
+    return {sys.intern(padded[i:i + 3]) for i in range(len(padded) - 2)}
+
+
+class VorschlagIndex:
+    """Append-only suggestion index over ingredient names (prefix + trigram)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._ids = array('I')
+        self._names = []
+        self._keys = []
+        self._trigram_counts = array('H')
+        self._postings = {}
+        self._sorted_keys = []
+        self._sorted_positions = array('I')
+        self.max_id = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def is_loaded(self):
+        return self.max_id > 0
+
+    def build(self, rows):
+        """Rebuilds the index from (zutat_id, name) rows."""
+        with self._lock:
+            self._reset()
+            for zutat_id, name in rows:
+                self._append(zutat_id, name)
+            order = sorted(range(len(self._keys)), key=self._keys.__getitem__)
+            self._sorted_keys = [self._keys[position] for position in order]
+            self._sorted_positions = array('I', order)
+
+    def add(self, rows):
+        """Adds newly created (zutat_id, name) rows; ids at or below max_id are skipped."""
+        with self._lock:
+            for zutat_id, name in rows:
+                if zutat_id <= self.max_id:
+                    continue
+                position = self._append(zutat_id, name)
+                key = self._keys[position]
+                at = bisect_left(self._sorted_keys, key)
+                self._sorted_keys.insert(at, key)
+                self._sorted_positions.insert(at, position)
+
+    def _append(self, zutat_id, name):
+        position = len(self._ids)
+        key = sys.intern(normalize_name(name))
+        grams = trigrams(key)
+        self._ids.append(zutat_id)
+        self._names.append(sys.intern(name))
+        self._keys.append(key)
+        self._trigram_counts.append(min(len(grams), 0xFFFF))
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('I')
+            posting.append(position)
+        self.max_id = max(self.max_id, zutat_id)
+        return position
+
+    def suggest(self, text, limit=10):
+        """
+        Returns up to limit Vorschlag tuples for the typed text: names starting
+        with it first (alphabetically), then similar names by trigram similarity.
+        """
+        query = normalize_name(text or '')
+        if not query or limit <= 0:
+            return []
+        with self._lock:
+            results = []
+            seen = set()
+            at = bisect_left(self._sorted_keys, query)
+            while at < len(self._sorted_keys) and len(results) < limit:
+                if not self._sorted_keys[at].startswith(query):
+                    break
+                position = self._sorted_positions[at]
+                results.append(Vorschlag(self._ids[position], self._names[position], 1.0))
+                seen.add(position)
+                at += 1
+            if len(results) < limit:
+                results.extend(self._similar(query, limit - len(results), seen))
+            return results
+
+    def _similar(self, query, limit, seen):
+        query_grams = trigrams(query)
+        grams = [gram for gram in query_grams if gram in self._postings]
+        if not grams:
+            return []
+        # Rare trigrams first: they are counted for all names that contain them
+        # (Counter in C) until the budget is used up. The frequent rest (e.g.
+        # common word endings) is only checked for the best candidates, by
+        # bisecting their sorted postings.
+        grams.sort(key=lambda gram: len(self._postings[gram]))
+        counts = Counter()
+        scanned = 0
+        for split, gram in enumerate(grams):
+            posting = self._postings[gram]
+            if split and scanned + len(posting) > SCAN_BUDGET:
+                break
+            counts.update(posting)
+            scanned += len(posting)
+        else:
+            split = len(grams)
+        frequent = [self._postings[gram] for gram in grams[split:]]
+
+        total = len(query_grams)
+        trigram_counts = self._trigram_counts
+        candidates = []
+        for position, common in counts.most_common(max(limit * KANDIDATEN_FAKTOR, 100)):
+            if position in seen:
+                continue
+            for posting in frequent:
+                at = bisect_left(posting, position)
+                if at < len(posting) and posting[at] == position:
+                    common += 1
+            # Dice coefficient of the trigram sets
+            score = 2 * common / (total + trigram_counts[position])
+            if score >= MIN_AEHNLICHKEIT:
+                candidates.append((-score, len(self._keys[position]), position))
+        candidates.sort()
+        return [
+            Vorschlag(self._ids[position], self._names[position], round(-minus_score, 3))
+            for minus_score, _, position in candidates[:limit]
+        ]
@@ -0,0 +1,117 @@
+"""
+Auflösung von Zutatennamen zu ``zutat.id``.
+
+Jede Zutat trägt neben dem Anzeigenamen einen normalisierten Namen
+(``zutat.name_norm``, indiziert): Unicode-normalisiert, casefold, Umlaute als
+ae/oe/ue, ß als ss, Leerraum zusammengefasst. "Äpfel", " äpfel " und "Aepfel"
+sind damit dieselbe Zutat, und die Suche danach nutzt den Index statt die
+ganze Tabelle mit ``lower(name)`` zu durchlaufen.
+
+Davor sitzt ein Cache im Prozess (normalisierter Name -> (id, name)).
+Zutaten werden von der Anwendung nie gelöscht oder umbenannt, ein Eintrag
+kann also nur durch einen zurückgerollten Schreibzugriff falsch werden; wer
+Zutaten anlegt und zurückrollt, leert den Cache (``NamenCache.clear``).
+
+``resolve`` ist der einzige Weg, Zutaten anzulegen: für einzelne Namen
+(Formular) wie für ganze Blöcke (Import).
+"""
+
+import threading
+import unicodedata
+
+from sqlalchemy import bindparam, text
+
+# Schlüssel pro IN-Liste (SQLite erlaubt höchstens 32766 Variablen)
+IN_CHUNK = 500
+
+_UMLAUTE = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue'})
+
+
+def normalize_name(name):
+    """Lookup key of an ingredient name, e.g. ' Äpfel  grün' -> 'aepfel gruen'."""
+    key = unicodedata.normalize('NFKC', name).casefold().translate(_UMLAUTE)
+    return ' '.join(key.split())
+
+
+def display_name(name):
+    """Name under which a new ingredient is stored (capitalised as before)."""
+    return ' '.join(name.split()).capitalize()
+
+
+class NamenCache:
+    """Thread-safe in-process map normalised name -> (zutat_id, name)."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def update(self, entries):
+        with self._lock:
+            self._entries.update(entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _load(connection, keys):
+    """Reads {normalised name: (zutat_id, name)} for keys via the name_norm index."""
+    select = text(
+        'SELECT name_norm, id, name FROM zutat WHERE name_norm IN :keys ORDER BY id'
+    ).bindparams(bindparam('keys', expanding=True))
+    loaded = {}
+    for start in range(0, len(keys), IN_CHUNK):
+        for key, zutat_id, name in connection.execute(select, {'keys': keys[start:start + IN_CHUNK]}):
+            loaded.setdefault(key, (zutat_id, name))  # Oldest row wins for legacy duplicates
+    return loaded
+
+
+def lookup(connection, names, cache):
+    """
+    Resolves raw names without creating anything.
+    Returns {normalised name: (zutat_id, name)} for the known ones.
+    """
+    found = {}
+    missing = []
+    for key in {normalize_name(name) for name in names if name and name.strip()}:
+        entry = cache.get(key)
+        if entry is None:
+            missing.append(key)
+        else:
+            found[key] = entry
+    if missing:
+        loaded = _load(connection, missing)
+        cache.update(loaded)
+        found.update(loaded)
+    return found
+
+
+def resolve(connection, names, cache):
+    """
+    Resolves raw names to ingredients and inserts the unknown ones (one
+    executemany) in the caller's transaction. Returns a tuple:
+    ({normalised name: (zutat_id, name)}, number of created ingredients).
+    If the transaction is rolled back, the caller must clear the cache.
+    """
+    names = [name for name in names if name and name.strip()]
+    found = lookup(connection, names, cache)
+    neue = {}
+    for name in names:
+        key = normalize_name(name)
+        if key not in found and key not in neue:
+            neue[key] = display_name(name)
+    if neue:
+        connection.execute(
+            text('INSERT INTO zutat (name, name_norm) VALUES (:name, :name_norm)'),
+            [{'name': name, 'name_norm': key} for key, name in neue.items()]
+        )
+        created = _load(connection, list(neue))
+        cache.update(created)
+        found.update(created)
+    return found, len(neue)